@@ -0,0 +1,221 @@
+import os, threading
+import numpy as np
+from ring import SAMPLE_COLUMNS
+
+# On-disk layout: <root>/<sensor>/<tier>/<t_first>_<t_last>[_<k>].npz (k when the name is
+# taken), one compressed column per array. "raw" holds samples as published by the readers; the rollup tiers hold one row
+# per bucket (bucket start t, sample count n, and <col>_min/_mean/_max per feature).
+# Rows are buffered in memory and written as one segment once a tier's buffer spans
+# SEGMENT_S seconds, so the steady-state cost is one savez per segment, not per sample.
+TIERS = (("raw", None), ("1s", 1.0), ("1m", 60.0))
+SEGMENT_S = {"raw": 60.0, "1s": 600.0, "1m": 3600.0}
+RETENTION_S = {"raw": 86400.0, "1s": 7 * 86400.0, "1m": 365 * 86400.0}
+
+def rollup_columns(columns):
+    return ("t", "n") + tuple(f"{c}_{s}" for c in columns if c != "t" for s in ("min", "mean", "max"))
+
+class _Rollup:
+    """Incremental fixed-width min/mean/max buckets; the newest bucket stays open until a
+       later sample arrives (or drain, on close), so emitted rows are always complete.
+       Samples older than the open bucket belong to a row already emitted: they are
+       counted in `late` and left out, so a tier's rows stay in time order, one per key."""
+    def __init__(self, width, features):
+        self.width = float(width); self.features = features
+        self.key = None; self.n = 0; self.sum = self.min = self.max = None; self.late = 0
+
+    def _row(self):
+        out = {"t": np.array([self.key * self.width]), "n": np.array([float(self.n)])}
+        for i, c in enumerate(self.features):
+            out[f"{c}_min"] = self.min[i:i+1]; out[f"{c}_mean"] = self.sum[i:i+1] / self.n; out[f"{c}_max"] = self.max[i:i+1]
+        return out
+
+    def add(self, t, X):
+        """t: (N,) times, X: (features, N). Returns the buckets closed by this block, or None."""
+        if not len(t): return None
+        b = np.floor(t / self.width).astype(np.int64)
+        if self.key is not None and b.min() < self.key:
+            keep = b >= self.key; self.late += int(len(b) - keep.sum()); b = b[keep]; X = X[:, keep]
+            if not len(b): return None
+        if np.any(b[1:] < b[:-1]):
+            o = np.argsort(b, kind="stable"); b = b[o]; X = X[:, o]
+        starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+        keys = b[starts]; n = np.diff(np.r_[starts, len(b)])
+        s = np.add.reduceat(X, starts, axis=1); lo = np.minimum.reduceat(X, starts, axis=1); hi = np.maximum.reduceat(X, starts, axis=1)
+        if self.key is not None and keys[0] == self.key:
+            s[:, 0] += self.sum; lo[:, 0] = np.minimum(lo[:, 0], self.min); hi[:, 0] = np.maximum(hi[:, 0], self.max); n[0] += self.n
+        elif self.key is not None:
+            # the open bucket is closed by this block: emit it ahead of the new ones
+            keys = np.r_[self.key, keys]; n = np.r_[self.n, n]
+            s = np.c_[self.sum, s]; lo = np.c_[self.min, lo]; hi = np.c_[self.max, hi]
+        self.key = int(keys[-1]); self.n = int(n[-1]); self.sum = s[:, -1].copy(); self.min = lo[:, -1].copy(); self.max = hi[:, -1].copy()
+        if len(keys) == 1: return None
+        out = {"t": keys[:-1] * self.width, "n": n[:-1].astype(np.float64)}
+        for i, c in enumerate(self.features):
+            out[f"{c}_min"] = lo[i, :-1]; out[f"{c}_mean"] = s[i, :-1] / n[:-1]; out[f"{c}_max"] = hi[i, :-1]
+        return out
+
+    def open_row(self):
+        """The open bucket as a one-row block (still growing), or None."""
+        return None if self.key is None else self._row()
+
+    def drain(self):
+        """Close the open bucket (possibly partial) and return it."""
+        if self.key is None: return None
+        out = self._row(); self.key = None
+        return out
+
+class _Series:
+    """One sensor+tier: in-memory tail plus the sorted list of segments on disk."""
+    def __init__(self, path, columns):
+        self.path = path; self.columns = columns
+        os.makedirs(path, exist_ok=True)
+        self.buf = []; self.rows = 0; self.t_first = None; self.t_last = None
+        self.segs = []  # (t_first, t_last, filename), time order
+        for fn in os.listdir(path):
+            if not fn.endswith(".npz"): continue
+            try: a, b = fn[:-4].split("_")[:2]; self.segs.append((float(a), float(b), fn))
+            except ValueError: pass
+        self.segs.sort()
+
+    def add(self, cols):
+        t = cols["t"]
+        if not len(t): return
+        self.buf.append(cols); self.rows += len(t)
+        lo, hi = float(t.min()), float(t.max())
+        self.t_first = lo if self.t_first is None else min(self.t_first, lo)
+        self.t_last = hi if self.t_last is None else max(self.t_last, hi)
+
+    def pending(self):
+        if not self.buf: return None
+        if len(self.buf) > 1: self.buf = [{c: np.concatenate([b[c] for b in self.buf]) for c in self.columns}]
+        return self.buf[0]
+
+    def flush(self, compress=True):
+        block = self.pending()
+        if block is None: return
+        base = f"{self.t_first:.6f}_{self.t_last:.6f}"; fn = base + ".npz"; k = 0; tmp = os.path.join(self.path, ".tmp.npz")
+        while os.path.exists(os.path.join(self.path, fn)): k += 1; fn = f"{base}_{k}.npz"  # rows stamped with one poll's t
+        (np.savez_compressed if compress else np.savez)(tmp, **block)
+        os.replace(tmp, os.path.join(self.path, fn))
+        self.segs.append((self.t_first, self.t_last, fn))
+        self.buf = []; self.rows = 0; self.t_first = self.t_last = None
+
+    def expire(self, before):
+        keep = []
+        for seg in self.segs:
+            if seg[1] < before:
+                try: os.unlink(os.path.join(self.path, seg[2]))
+                except FileNotFoundError: pass
+            else: keep.append(seg)
+        self.segs = keep
+
+class Archive:
+    """Tiered per-sensor sample archive.
+
+    append() takes blocks in SampleRing column layout; query() returns {column: array} for
+    one sensor, tier and time range, loading only the segments that overlap it (plus rows
+    still buffered in memory). Segments older than the tier's retention, measured from the
+    newest sample seen, are deleted as new segments are written."""
+    def __init__(self, root="captures/archive", columns=SAMPLE_COLUMNS, segment_s=None, retention_s=None, compress=True):
+        self.root = root; self.columns = tuple(columns); self.compress = compress
+        self.features = tuple(c for c in self.columns if c != "t")
+        self.segment_s = dict(SEGMENT_S, **(segment_s or {})); self.retention_s = dict(RETENTION_S, **(retention_s or {}))
+        self._series = {}; self._rollups = {}; self._lock = threading.Lock()
+        self.rows = 0; self.segments_written = 0
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _safe(sensor): return str(sensor).replace(os.sep, "_")
+
+    def _get(self, sensor, tier):
+        key = (sensor, tier); s = self._series.get(key)
+        if s is None:
+            cols = self.columns if tier == "raw" else rollup_columns(self.columns)
+            s = self._series[key] = _Series(os.path.join(self.root, self._safe(sensor), tier), cols)
+        return s
+
+    def _add(self, sensor, tier, cols):
+        s = self._get(sensor, tier); s.add(cols)
+        if s.t_first is not None and s.t_last - s.t_first >= self.segment_s[tier]:
+            s.flush(self.compress); self.segments_written += 1
+            s.expire(s.segs[-1][1] - self.retention_s[tier])
+
+    def append(self, sensor, cols):
+        t = np.asarray(cols["t"], dtype=np.float64)
+        if not len(t): return
+        block = {c: np.asarray(cols[c], dtype=np.float64) for c in self.columns}
+        with self._lock:
+            self.rows += len(t)
+            self._add(sensor, "raw", block)
+            X = np.stack([block[c] for c in self.features]) if self.features else np.empty((0, len(t)))
+            for tier, width in TIERS:
+                if width is None: continue
+                r = self._rollups.get((sensor, tier))
+                if r is None: r = self._rollups[(sensor, tier)] = _Rollup(width, self.features)
+                closed = r.add(t, X)
+                if closed is not None: self._add(sensor, tier, closed)
+
+    def flush(self):
+        """Write every buffered row to disk. Open rollup buckets stay in memory (query() still
+           sees them) so later samples of the same second/minute don't write a second row."""
+        with self._lock: self._flush()
+
+    def _flush(self):
+        for s in self._series.values():
+            if s.buf: s.flush(self.compress); self.segments_written += 1
+
+    def sensors(self):
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def query(self, sensor, t0=None, t1=None, tier="raw", columns=None):
+        """Rows of `sensor` with t0 <= t < t1 from `tier` ("raw", "1s" or "1m")."""
+        if tier not in dict(TIERS): raise ValueError(f"unknown tier {tier!r}; choose from {[k for k, _ in TIERS]}")
+        lo = -np.inf if t0 is None else float(t0); hi = np.inf if t1 is None else float(t1)
+        with self._lock:
+            s = self._series.get((sensor, tier))
+            if s is None and os.path.isdir(os.path.join(self.root, self._safe(sensor), tier)): s = self._get(sensor, tier)  # written by an earlier run
+            cols = tuple(columns) if columns else (s.columns if s else self.columns if tier == "raw" else rollup_columns(self.columns))
+            if "t" not in cols: cols = ("t",) + cols
+            segs = [seg for seg in s.segs if seg[1] >= lo and seg[0] < hi] if s else []
+            tail = s.pending() if s else None
+            r = self._rollups.get((sensor, tier)); row = r.open_row() if r else None
+        parts = []
+        for _, _, fn in segs:
+            try:
+                with np.load(os.path.join(s.path, fn)) as z:  # columns added since a segment was written read as NaN
+                    parts.append({c: z[c] if c in z.files else np.full(len(z["t"]), np.nan) for c in cols})
+            except FileNotFoundError: pass  # expired while we were reading
+        for block in (tail, row):
+            if block is not None: parts.append({c: block[c] for c in cols})
+        if not parts: return {c: np.empty(0) for c in cols}
+        out = {c: np.concatenate([p[c] for p in parts]) for c in cols}
+        m = (out["t"] >= lo) & (out["t"] < hi)
+        return {c: v[m] for c, v in out.items()}
+
+    def close(self):
+        """Close the open rollup buckets and write everything out."""
+        with self._lock:
+            for (sensor, tier), r in self._rollups.items():
+                row = r.drain()
+                if row is not None: self._get(sensor, tier).add(row)
+            self._flush()
+
+class Archiver(threading.Thread):
+    """Feeds an Archive from SampleRings with its own cursors, off the GUI thread."""
+    def __init__(self, archive, rings, interval=1.0):
+        super().__init__(daemon=True, name="archiver")
+        self.archive = archive; self.rings = rings; self.interval = interval
+        self.cursors = {}; self.overruns = 0; self._stop_event = threading.Event()
+
+    def drain(self):
+        for name, ring in self.rings.items():
+            cols, self.cursors[name], over = ring.read(self.cursors.get(name, 0))
+            self.overruns += over
+            self.archive.append(name, cols)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval): self.drain()
+
+    def stop(self):
+        self._stop_event.set(); self.join(timeout=5.0)
+        self.drain(); self.archive.close()
@@ -0,0 +1,88 @@
+import json, os, queue, threading, time
+import numpy as np
+
+# Baseline snapshots for warm starts. A reader copies its feature state (state(), a dict
+# of scalars and small arrays) every few tens of seconds and hands it to a BaselineStore,
+# whose thread writes it to <root>/<key>.npz (temp file + rename, so a crash never
+# leaves half a snapshot). On start the reader load()s the snapshot for its key
+# (sensor, channel, bandwidth) and, when it is recent enough and its parameters match,
+# scores the first frame against the saved baseline instead of an empty window.
+
+VERSION = 1
+MAX_AGE = 6 * 3600.0  # older snapshots describe a different RF environment; start cold
+
+def key(kind, sensor, channel, bw):
+    """File key of one baseline: kind ("spectral"/"rssi"), sensor (phy.iface, or the sensor
+       name for streams and pcaps), channel and bandwidth."""
+    k = f"{kind}-{sensor}-ch{channel if channel is not None else 'x'}-{bw}"
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in k)
+
+class BaselineStore:
+    """Snapshots in `root`, one file per key; save() never blocks on disk."""
+    def __init__(self, root="captures/baselines", max_age=MAX_AGE):
+        self.root = root; self.max_age = max_age
+        self.q = queue.Queue(64); self.saved = 0; self.dropped = 0; self.errors = 0; self.last_error = None
+        self._lock = threading.Lock(); self._thread = None
+
+    def path(self, k): return os.path.join(self.root, k + ".npz")
+
+    def save(self, k, state):
+        """Queue `state` for writing under key `k`; dropped (and counted) if the writer is behind."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="baseline-writer"); self._thread.start()
+        try: self.q.put_nowait((k, state, time.time()))
+        except queue.Full: self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self.q.get()
+            try:
+                pending = {item[0]: item}  # a burst of snapshots for one key: only the newest is written
+                while True:
+                    try: nxt = self.q.get_nowait()
+                    except queue.Empty: break
+                    pending[nxt[0]] = nxt; self.q.task_done()
+                for k, state, t in pending.values():
+                    try: self._write(k, state, t)
+                    except (OSError, ValueError, TypeError) as e: self.errors += 1; self.last_error = f"{k}: {e}"
+            finally: self.q.task_done()
+
+    def _write(self, k, state, t):
+        os.makedirs(self.root, exist_ok=True)
+        meta = {"version": VERSION, "key": k, "saved": t}
+        meta.update({n: v for n, v in state.items() if not isinstance(v, np.ndarray)})
+        arrays = {n: v for n, v in state.items() if isinstance(v, np.ndarray)}
+        path = self.path(k); tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path); self.saved += 1
+
+    def load(self, k, max_age=None):
+        """(state, None) for a usable snapshot under `k` (state["saved"]: when it was taken),
+           else (None, reason)."""
+        path = self.path(k); max_age = self.max_age if max_age is None else max_age
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                meta = json.loads(str(z["meta"])); state = {n: z[n] for n in z.files if n != "meta"}
+        except FileNotFoundError: return None, "no snapshot"
+        except (OSError, ValueError, KeyError) as e: return None, f"unreadable snapshot: {e}"
+        if meta.get("version") != VERSION or meta.get("key") != k: return None, "snapshot from another version or sensor"
+        age = time.time() - float(meta.get("saved", 0.0))
+        if not 0.0 <= age <= max_age: return None, f"snapshot is {age / 60:.0f} min old"
+        for n in ("version", "key"): meta.pop(n)
+        state.update(meta)
+        return state, None
+
+    def flush(self, timeout=2.0):
+        """Wait (up to `timeout` s) until every queued snapshot is on disk."""
+        end = time.monotonic() + timeout
+        while self.q.unfinished_tasks and time.monotonic() < end: time.sleep(0.01)
+
+_stores = {}; _stores_lock = threading.Lock()
+def store(root):
+    """Process-wide BaselineStore for `root` (readers of one process share its writer thread)."""
+    with _stores_lock:
+        s = _stores.get(root)
+        if s is None: s = _stores[root] = BaselineStore(root)
+        return s
@@ -0,0 +1,60 @@
+"""Macro benchmark: MultiManager fed through FIFOs by a paced writer process.
+
+Reports sustained frames/s delivered to the sample rings, p50/p99 latency from the
+write of a burst to its first sample in the ring, and peak RSS of the run.
+"""
+import os, resource, tempfile, time
+import multiprocessing as mp
+import numpy as np
+from bench import synth
+from multi import MultiManager
+
+def _writer(paths, rate, seconds, burst, sent_q):
+    fds = [os.open(p, os.O_WRONLY) for p in paths]
+    data = [synth.tlv_stream(int(rate * seconds) + burst, pattern="square", rate=rate, seed=i) for i in range(len(paths))]
+    fb = synth.HT20_FRAME_BYTES; sent = [[] for _ in paths]; k = 0; t0 = time.time()
+    while time.time() - t0 < seconds:
+        for i, fd in enumerate(fds):
+            sent[i].append(time.time()); os.write(fd, data[i][k*fb:(k+burst)*fb])
+        k += burst
+        time.sleep(max(0.0, t0 + k / rate - time.time()))
+    sent_q.put(sent)
+    for fd in fds: os.close(fd)
+
+def _peak_rss_mb():
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024.0
+
+def run(sensors=2, rate=2000.0, seconds=5.0, burst=16, io="select"):
+    tmp = tempfile.mkdtemp(prefix="ar9271_macro_"); paths = []
+    for i in range(sensors):
+        p = os.path.join(tmp, f"s{i}"); os.mkfifo(p); paths.append(p)
+    cfg = [{"name": f"s{i}", "phy": None, "iface": None, "stream": p} for i, p in enumerate(paths)]
+    mgr = MultiManager(cfg, io=io); mgr.start()
+    ctx = mp.get_context("spawn"); sent_q = ctx.Queue()
+    w = ctx.Process(target=_writer, args=(paths, rate, seconds, burst, sent_q)); w.start()
+    cur = {}; rows = {c["name"]: [] for c in cfg}; t0 = time.time()
+    while w.is_alive() or sent_q.empty():
+        for name, ring in mgr.rings.items():
+            cols, cur[name], _ = ring.read(cur.get(name, 0)); rows[name].append(cols["t"])
+        time.sleep(0.005)
+        if time.time() - t0 > seconds + 30: break
+    time.sleep(0.2)
+    for name, ring in mgr.rings.items():
+        cols, cur[name], _ = ring.read(cur.get(name, 0)); rows[name].append(cols["t"])
+    sent = sent_q.get(timeout=5); w.join()
+    overruns = sum(r.overruns for r in mgr.rings.values())
+    mgr.stop()
+    for p in paths: os.unlink(p)
+    os.rmdir(tmp)
+    lat = []; total = 0; span = [np.inf, -np.inf]
+    for i, c in enumerate(cfg):
+        t = np.concatenate(rows[c["name"]]); total += len(t)
+        if not len(t): continue
+        span = [min(span[0], t[0]), max(span[1], t[-1])]
+        s = np.asarray(sent[i]); k = np.searchsorted(s, t) - 1
+        first = np.unique(k[k >= 0], return_index=True)[1]  # first sample after each burst
+        lat.append(t[k >= 0][first] - s[np.unique(k[k >= 0])])
+    lat = np.concatenate(lat) * 1e3 if lat else np.zeros(1)
+    return {"io": io, "sensors": sensors, "target_fps_per_sensor": rate, "frames": int(total),
+            "fps": total / max(1e-9, span[1] - span[0]), "latency_ms_p50": float(np.percentile(lat, 50)),
+            "latency_ms_p99": float(np.percentile(lat, 99)), "overruns": int(overruns), "peak_rss_mb": _peak_rss_mb()}
@@ -0,0 +1,161 @@
+"""Micro-benchmarks for the per-frame hot path: parsing, features, the breathing detector, fusion, events, archiving,
+the cost of the reader instrumentation, test-mode profiling and RSSI capture parsing."""
+import contextlib, io, os, shutil, tempfile, time, tracemalloc
+import numpy as np
+from bench import synth
+from spectral_parser import parse_frames, decode_frames
+from features import SpectralFeatures, RSSIFeatures, SlidingDFT
+from fusion import ZoneFusion, FusionEngine
+from events import EventWriter
+from archive import Archive
+from ring import SAMPLE_COLUMNS
+from multi import SensorReader, RSSIReader
+from radiotap import parse as parse_radiotap, write_pcap
+from metrics import StageMetrics
+
+def _time(fn, repeat=5):
+    """Best-of-`repeat` wall time of fn() in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
+
+def bench_parse(frames=862):
+    # one 64 KiB debugfs read worth of HT20 frames
+    raw = synth.tlv_stream(frames, pattern="square", rate=1000)
+    return {"parse_frames_us_per_frame": 1e6 * _time(lambda: sum(1 for _ in parse_frames(raw))) / frames,
+            "decode_frames_us_per_frame": 1e6 * _time(lambda: decode_frames(raw)) / frames}
+
+def bench_features(frames=2000, history=300):
+    bins = decode_frames(synth.tlv_stream(frames, pattern="square", rate=1000))["HT20"]["bins"]
+    def per_frame():
+        f = SpectralFeatures(history=history)
+        for row in bins: f.update(row)
+    def batched():
+        f = SpectralFeatures(history=history)
+        for i in range(0, frames, 862): f.update_batch(bins[i:i+862])
+    return {"features_update_us_per_frame": 1e6 * _time(per_frame, 3) / frames,
+            "features_update_batch_us_per_frame": 1e6 * _time(batched, 3) / frames}
+
+def bench_rhythm(frames=100000, rate=1000.0, block=860):
+    # SlidingDFT alone (per-band energies in reader-sized blocks), at a short and a long window
+    rng = np.random.default_rng(0); t = np.arange(frames) / rate; E = rng.random((frames, 4))
+    def run(w):
+        d = SlidingDFT(window=w)
+        for i in range(0, frames, block): d.update(t[i:i+block], E[i:i+block])
+    return {"rhythm_us_per_frame": 1e6 * _time(lambda: run(32.0), 3) / frames,
+            "rhythm_long_window_us_per_frame": 1e6 * _time(lambda: run(512.0), 3) / frames}
+
+def bench_fusion(updates=20000, sensors=4):
+    cfg = [{"name": f"s{i}", "label": f"z{i}"} for i in range(sensors)]
+    rng = np.random.default_rng(0); vals = rng.random(updates).tolist()
+    def run():
+        fz = ZoneFusion(cfg, cooldown=0.0)
+        for i, p in enumerate(vals): fz.update({f"s{i % sensors}": p})
+    return {"fusion_update_us": 1e6 * _time(run) / updates}
+
+def bench_fusion_engine(ticks=300, sensors=48, zones=12, rate=1000.0, tick_s=0.2):
+    # GUI-cadence batches: every tick pushes tick_s worth of samples per sensor, then steps
+    cfg = [{"name": f"s{i}", "label": f"z{i % zones}"} for i in range(sensors)]
+    rng = np.random.default_rng(0); k = int(rate * tick_s); vals = rng.random((sensors, k))
+    def run():
+        fe = FusionEngine(cfg)
+        for j in range(ticks):
+            t = 1.7e9 + j * tick_s + np.arange(k) / rate
+            for i in range(sensors): fe.push(f"s{i}", t, vals[i])
+            fe.step()
+    return {"fusion_engine_ms_per_tick": 1e3 * _time(run, 3) / ticks}
+
+def bench_events(events=2000):
+    d = tempfile.mkdtemp(prefix="ar9271_ev_"); path = os.path.join(d, "events.jsonl")
+    def run():
+        ev = EventWriter(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(events): ev.emit("zone_change", zone=f"z{i % 3}")
+        ev.close()
+    out = {"events_emit_us": 1e6 * _time(run, 3) / events}
+    os.unlink(path); os.rmdir(d)
+    return out
+
+def bench_archive(seconds=600, rate=1000.0, block=200):
+    # `seconds` of samples at `rate`, appended in reader-sized blocks and flushed to disk
+    n = int(seconds * rate); rng = np.random.default_rng(0)
+    cols = {c: rng.random(n) for c in SAMPLE_COLUMNS}; cols["t"] = 1.7e9 + np.arange(n) / rate
+    d = tempfile.mkdtemp(prefix="ar9271_arc_")
+    def run():
+        shutil.rmtree(d, ignore_errors=True)
+        a = Archive(d)
+        for i in range(0, n, block): a.append("s0", {c: v[i:i+block] for c, v in cols.items()})
+        a.close()
+    best = _time(run, 3); shutil.rmtree(d, ignore_errors=True)
+    return {"archive_us_per_sample": 1e6 * best / n, "archive_cpu_pct_at_1khz": 100.0 * best / seconds * (1000.0 / rate)}
+
+def bench_instrumentation(frames=100000, chunk=16384):
+    # full SensorReader pipeline (read, parse, features, ring) over a file, metrics off vs on;
+    # the end-to-end difference is within run-to-run noise on small boxes, so the overhead is
+    # also derived from the isolated cost of one read's worth of metric updates
+    d = tempfile.mkdtemp(prefix="ar9271_ins_"); path = os.path.join(d, "stream.tlv")
+    with open(path, "wb") as f: f.write(synth.tlv_stream(frames, pattern="square", rate=1000))
+    reads = [0]
+    def run(metrics):
+        r = SensorReader("s0", "phy0", "none", stream=path, metrics=metrics)
+        r.open(); r.stream.chunk = chunk; reads[0] = 0
+        while True:
+            if r.poll(): reads[0] += 1
+            elif r.at_eof(): break
+        r.close()
+    run(False); off = on = float("inf")
+    for _ in range(4):  # interleaved so drift (thermal, page cache) hits both alike
+        off = min(off, _time(lambda: run(False), 1)); on = min(on, _time(lambda: run(True), 1))
+    os.unlink(path); os.rmdir(d)
+    m = StageMetrics(("read", "parse", "features", "publish")); n = 20000
+    def per_read():
+        for _ in range(n):
+            m.observe("read", 1e-4); m.observe("parse", 2e-4); m.observe("features", 3e-3); m.observe("publish", 1e-4)
+            m.count("samples_out", 200)
+    cost = _time(per_read) / n
+    return {"pipeline_fps": frames / off, "pipeline_instrumented_fps": frames / on,
+            "instrumentation_us_per_read": 1e6 * cost, "instrumentation_overhead_pct": 100.0 * cost * reads[0] / off}
+
+def bench_rssi(packets=50000, macs=64):
+    # radiotap parse alone, and the whole RSSIReader (pcap source, per-transmitter EMA, ring)
+    pk = synth.radiotap_packets(packets, macs=macs, pattern="square")
+    d = tempfile.mkdtemp(prefix="ar9271_rssi_"); path = os.path.join(d, "rssi.pcap"); write_pcap(path, pk)
+    def run():
+        r = RSSIReader("r0", "none", pcap=path); r.open()
+        while not r.at_eof(): r.poll()
+        r.close()
+    raw = [p for _, p in pk]
+    out = {"radiotap_parse_us_per_packet": 1e6 * _time(lambda: [parse_radiotap(p) for p in raw], 3) / packets,
+           "rssi_reader_pps": packets / _time(run, 3)}
+    os.unlink(path); os.rmdir(d)
+    out.update(bench_rssi_model())
+    return out
+
+def bench_rssi_model(packets=200000, macs=1000, capacity=256, block=500):
+    # RSSIFeatures alone, with more transmitters than table slots (so it keeps evicting);
+    # memory is sampled after the first and the last quarter to show it stays flat
+    rng = np.random.default_rng(0)
+    addrs = [bytes(rng.integers(0, 256, 6, dtype=np.uint8)) for _ in range(macs)]
+    who = rng.zipf(1.3, packets) % macs  # a few busy transmitters, a long tail of rare ones
+    tx = [addrs[i] for i in who]; dbm = list(rng.normal(-60.0, 3.0, packets))
+    def run(trace=False):
+        f = RSSIFeatures(capacity=capacity); mem = []
+        for i in range(0, packets, block):
+            f.update_batch(tx[i:i+block], dbm[i:i+block])
+            if trace and i + block in (packets // 4, packets): mem.append(tracemalloc.get_traced_memory()[0])
+        return f, mem
+    dt = _time(run, 3)
+    tracemalloc.start(); f, mem = run(True); tracemalloc.stop()  # tracing is slow: separate pass
+    return {"rssi_model_us_per_packet": 1e6 * dt / packets, "rssi_model_evictions": f.evictions,
+            "rssi_model_mem_growth_kb": (mem[-1] - mem[0]) / 1024.0}
+
+def bench_test_mode(frames=200000):
+    # SensorReader over a file in test mode (stream profiler only) next to the same in radar mode
+    from bench.testmode import throughput
+    return throughput(frames)
+
+def run_all():
+    out = {}
+    for fn in (bench_parse, bench_features, bench_rhythm, bench_fusion, bench_fusion_engine, bench_events, bench_archive, bench_instrumentation, bench_test_mode, bench_rssi): out.update(fn())
+    return out
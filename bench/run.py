@@ -0,0 +1,54 @@
+"""Benchmark suite entry point; results go to JSON so releases can be compared.
+
+    python -m bench.run --out bench_results/$(git describe --always).json
+    python -m bench.run --compare bench_results/v8e.json --out new.json
+"""
+import argparse, json, os, platform, subprocess, sys, time
+import numpy as np
+from bench import micro, macro, startup
+
+# metric name -> True when larger is better
+HIGHER_IS_BETTER = ("fps",)
+
+def _rev():
+    try: return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception: return None
+
+def compare(old, new, tolerance=0.10):
+    """Metrics in `new` that moved more than `tolerance` the wrong way relative to `old`."""
+    regress = []
+    for section in ("micro", "macro", "startup"):
+        for key, v in new.get(section, {}).items():
+            o = old.get(section, {}).get(key)
+            if not isinstance(v, (int, float)) or not isinstance(o, (int, float)) or not o: continue
+            up = key.endswith(HIGHER_IS_BETTER)
+            change = (v - o) / abs(o)
+            if (up and change < -tolerance) or (not up and change > tolerance):
+                regress.append({"metric": f"{section}.{key}", "old": o, "new": v, "change": change})
+    return regress
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out"); ap.add_argument("--compare"); ap.add_argument("--tolerance", type=float, default=0.10)
+    ap.add_argument("--sensors", type=int, default=2); ap.add_argument("--rate", type=float, default=2000.0)
+    ap.add_argument("--seconds", type=float, default=5.0); ap.add_argument("--io", default="select")
+    ap.add_argument("--skip-macro", action="store_true"); ap.add_argument("--skip-startup", action="store_true")
+    a = ap.parse_args()
+    res = {"meta": {"rev": _rev(), "time": time.time(), "python": platform.python_version(), "numpy": np.__version__,
+                    "machine": platform.machine(), "cpus": os.cpu_count()},
+           "micro": micro.run_all()}
+    if not a.skip_macro:
+        m = macro.run(a.sensors, a.rate, a.seconds, io=a.io)
+        res["macro"] = {k: v for k, v in m.items() if isinstance(v, (int, float))}
+    if not a.skip_startup: res["startup"] = startup.run()
+    text = json.dumps(res, indent=2); print(text)
+    if a.out:
+        if os.path.dirname(a.out): os.makedirs(os.path.dirname(a.out), exist_ok=True)
+        with open(a.out, "w") as f: f.write(text + "\n")
+    if a.compare:
+        with open(a.compare) as f: regress = compare(json.load(f), res, a.tolerance)
+        for r in regress: print(f"REGRESSION {r['metric']}: {r['old']:.4g} -> {r['new']:.4g} ({100*r['change']:+.1f}%)", file=sys.stderr)
+        sys.exit(1 if regress else 0)
+
+if __name__ == "__main__":
+    main()
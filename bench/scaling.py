@@ -0,0 +1,42 @@
+"""Frames/s versus sensor count for MultiManager's I/O models.
+
+Every sensor reads its own pre-generated file of HT20 TLVs through the full pipeline
+(read, parse, features); throughput is samples published to the sensors' rings per
+second until every file is drained.
+
+    python -m bench.scaling --max-sensors 8 --frames 20000
+"""
+import argparse, json, os, tempfile, time
+from bench import synth
+from multi import MultiManager
+
+def _write_stream(path, frames, seed):
+    with open(path, "wb") as f: f.write(synth.tlv_stream(frames, pattern="square", seed=seed))
+
+def run(io, sensors, frames, timeout=120.0):
+    tmp = tempfile.mkdtemp(prefix="ar9271_scale_"); cfg = []
+    for i in range(sensors):
+        p = os.path.join(tmp, f"s{i}.bin"); _write_stream(p, frames, i)
+        cfg.append({"name": f"s{i}", "phy": None, "iface": None, "stream": p})
+    mgr = MultiManager(cfg, io=io, ring_capacity=1 << 12); t0 = time.perf_counter(); mgr.start()
+    want = sensors * frames; got = 0; first = None
+    while got < want and time.perf_counter() - t0 < timeout:
+        time.sleep(0.002)
+        got = sum(r.head for r in mgr.rings.values())
+        if got and first is None: first = time.perf_counter()
+    dt = time.perf_counter() - (first or t0)
+    mgr.stop()
+    for c in cfg: os.unlink(c["stream"])
+    os.rmdir(tmp)
+    return {"io": io, "sensors": sensors, "frames": got, "fps_total": got / dt, "fps_per_sensor": got / dt / sensors}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-sensors", type=int, default=8); ap.add_argument("--frames", type=int, default=20000)
+    ap.add_argument("--modes", default="thread,select,process")
+    a = ap.parse_args()
+    out = [run(io, n, a.frames) for io in a.modes.split(",") for n in sorted({1, 2, 4, a.max_sensors}) if n <= a.max_sensors]
+    print(json.dumps(out, indent=2))
+
+if __name__ == "__main__":
+    main()
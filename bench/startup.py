@@ -0,0 +1,34 @@
+"""Startup benchmark: time from `python radard.py` to the first sample in a ring.
+
+Runs the daemon headless on a synthetic stream file (no adapter), `runs` times, and
+reports the first-sample time the daemon measured itself (it starts the clock before
+its imports) plus the wall time of the whole process including interpreter start.
+"""
+import os, re, subprocess, sys, tempfile, time
+import numpy as np
+from bench import synth
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(runs=5, budget=2.0):
+    tmp = tempfile.mkdtemp(prefix="ar9271_startup_"); stream = os.path.join(tmp, "s0.tlv")
+    with open(stream, "wb") as f: f.write(synth.tlv_stream(4000))
+    cfg = os.path.join(tmp, "radar.yaml")
+    with open(cfg, "w") as f:
+        f.write(f"sensors:\n  - {{name: s0, phy: null, iface: null, stream: {stream}}}\n"
+                f"events: {{path: {os.path.join(tmp, 'events.jsonl')}}}\narchive: null\nviewer_socket: null\n"
+                f"startup_budget_s: {budget}\n")
+    first, wall = [], []
+    for _ in range(runs):
+        t0 = time.monotonic()
+        out = subprocess.run([sys.executable, "radard.py", "-c", cfg, "--exit-after-first-sample"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=60).stdout
+        wall.append(time.monotonic() - t0)
+        m = re.search(r"first sample after ([0-9.]+) s", out)
+        if not m: raise RuntimeError(f"daemon produced no sample:\n{out}")
+        first.append(float(m.group(1)))
+    return {"first_sample_s": float(np.median(first)), "first_sample_s_max": max(first),
+            "process_wall_s": float(np.median(wall)), "budget_s": budget}
+
+if __name__ == "__main__":
+    for k, v in run().items(): print(f"{k:>20}: {v:.3f}")
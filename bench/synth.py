@@ -0,0 +1,97 @@
+"""Synthetic AR9271 spectral_scan streams and radiotap packet streams.
+
+tlv_stream() builds valid HT20 / HT20_40 TLV byte streams with a configurable frame rate
+(TSF spacing), noise floor and a presence pattern that raises in-band energy over time;
+split() cuts a stream at arbitrary byte positions so frames straddle read boundaries.
+radiotap_packets() builds monitor-mode packets from `macs` transmitters whose RSSI wobbles
+harder while the presence pattern is on.
+"""
+import struct
+import numpy as np
+from spectral_parser import (HT20_DTYPE, HT40_DTYPE, ATH_FFT_SAMPLE_HT20, ATH_FFT_SAMPLE_HT20_40,
+                             SPECTRAL_HT20_NUM_BINS, SPECTRAL_HT20_40_NUM_BINS, TLV_HDR)
+
+def presence_pattern(n, rate, pattern="none", period=10.0, amplitude=30.0, start=0.0, seed=0):
+    """Per-frame energy offset: "none", "step" (on after `start` s), "square" or "sine" (period s),
+       or "random": aperiodic on/off bursts lasting `period`/2 s on average (interference)."""
+    t = np.arange(n) / float(rate)
+    if pattern == "none": return np.zeros(n)
+    if pattern == "step": return np.where(t >= start, amplitude, 0.0)
+    if pattern == "square": return np.where((t % period) < period / 2, amplitude, 0.0)
+    if pattern == "sine": return amplitude * 0.5 * (1 - np.cos(2 * np.pi * t / period))
+    if pattern == "random":
+        rng = np.random.default_rng(seed + 1); edges = np.cumsum(rng.exponential(period / 2, int(2 * t[-1] / period) + 8 if n else 1))
+        return np.where(np.searchsorted(edges, t) % 2 == 1, amplitude, 0.0)
+    raise ValueError(f"unknown pattern {pattern!r}")
+
+def tlv_stream(n, kind="HT20", rate=1000.0, noise=20.0, noise_sd=6.0, pattern="none", period=10.0,
+               amplitude=30.0, start=0.0, tsf0=0, jitter_us=0.0, freq=2437, pad=0, seed=0):
+    """`n` frames of `kind` ("HT20"/"HT40") as one bytes object. TSF advances 1e6/rate us per
+       frame (plus optional jitter); `pad` appends extra payload bytes the parser must skip."""
+    rng = np.random.default_rng(seed)
+    dt, nbins, typ = ((HT20_DTYPE, SPECTRAL_HT20_NUM_BINS, ATH_FFT_SAMPLE_HT20) if kind == "HT20"
+                      else (HT40_DTYPE, SPECTRAL_HT20_40_NUM_BINS, ATH_FFT_SAMPLE_HT20_40))
+    step = 1e6 / float(rate)
+    tsf = tsf0 + np.round(np.arange(n) * step + (rng.normal(0, jitter_us, n) if jitter_us else 0)).astype(np.uint64)
+    extra = presence_pattern(n, rate, pattern, period, amplitude, start, seed)
+    shape = np.exp(-0.5 * ((np.arange(nbins) - nbins / 2) / (nbins / 6)) ** 2)  # energy lands mid-band
+    bins = noise + rng.normal(0, noise_sd, (n, nbins)) + extra[:, None] * shape[None, :]
+    rec = np.zeros(n, dtype=dt)
+    rec["freq"] = freq; rec["tsf"] = tsf; rec["max_exp"] = 3
+    rec["bins"] = np.clip(np.round(bins), 0, 255).astype(np.uint8)
+    if kind == "HT20":
+        rec["rssi"] = -40; rec["noise"] = -95; rec["max_mag"] = rec["bins"].max(axis=1); rec["max_index"] = rec["bins"].argmax(axis=1)
+    else:
+        rec["chan_type"] = 1; rec["lower_rssi"] = rec["upper_rssi"] = -40; rec["lower_noise"] = rec["upper_noise"] = -95
+    plen = dt.itemsize + pad
+    out = np.zeros((n, TLV_HDR.size + plen), dtype=np.uint8)
+    out[:, :TLV_HDR.size] = np.frombuffer(TLV_HDR.pack(typ, plen), dtype=np.uint8)
+    out[:, TLV_HDR.size:TLV_HDR.size + dt.itemsize] = rec.view(np.uint8).reshape(n, dt.itemsize)
+    return out.tobytes()
+
+def mixed_stream(n, ht40_every=4, seed=0, **kw):
+    """Interleaved HT20 / HT40 stream: every `ht40_every`-th frame is HT40."""
+    a = tlv_stream(n, "HT20", seed=seed, **kw); b = tlv_stream(n, "HT40", seed=seed + 1, **kw)
+    la = len(a) // n; lb = len(b) // n
+    return b"".join(b[i*lb:(i+1)*lb] if i % ht40_every == ht40_every - 1 else a[i*la:(i+1)*la] for i in range(n))
+
+def drop_frames(data, frame_bytes, gaps=10, burst=(1, 20), seed=0):
+    """`data` (fixed-size frames) with `gaps` runs of 1..`burst` consecutive frames cut out,
+       as a driver or a slow reader would lose them. Returns (data, frames removed)."""
+    rng = np.random.default_rng(seed); n = len(data) // frame_bytes
+    at = np.sort(rng.choice(np.arange(1, n - burst[1]), gaps, replace=False))
+    keep = np.ones(n, dtype=bool); removed = 0
+    for i in at:
+        k = int(rng.integers(burst[0], burst[1] + 1)); removed += int(keep[i:i+k].sum()); keep[i:i+k] = False
+    frames = np.frombuffer(data, dtype=np.uint8)[:n * frame_bytes].reshape(n, frame_bytes)
+    return frames[keep].tobytes(), removed
+
+def split(data, min_size=1, max_size=8192, seed=0):
+    """Cut `data` into random-sized chunks, so TLVs straddle chunk edges."""
+    rng = np.random.default_rng(seed); out = []; i = 0
+    while i < len(data):
+        k = int(rng.integers(min_size, max_size + 1)); out.append(data[i:i+k]); i += k
+    return out
+
+HT20_FRAME_BYTES = TLV_HDR.size + HT20_DTYPE.itemsize
+HT40_FRAME_BYTES = TLV_HDR.size + HT40_DTYPE.itemsize
+
+_RT = struct.Struct("<BBHIBBHHbb")  # radiotap: flags, rate, channel (freq, flags), signal, noise
+_RT_PRESENT = (1 << 1) | (1 << 2) | (1 << 3) | (1 << 5) | (1 << 6)
+
+def radiotap_packets(n, macs=8, rate=1000.0, pattern="none", period=10.0, amplitude=6.0, start=0.0,
+                     freq=2437, t0=1.7e9, payload=40, seed=0):
+    """`n` radiotap + 802.11 data frames as [(timestamp, bytes)] from `macs` transmitters with
+       their own mean RSSI (-30..-85 dBm, 2 dB noise). While the pattern is on, the RSSI of
+       every link jitters by up to `amplitude` dB more (what a moving body does)."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(-85, -30, macs); addr = rng.integers(0, 256, (macs, 6), dtype=np.uint8); addr[:, 0] &= 0xfe
+    who = rng.integers(0, macs, n); extra = presence_pattern(n, rate, pattern, period, amplitude, start) / max(amplitude, 1e-9)
+    sig = np.clip(np.round(base[who] + rng.normal(0, 2.0, n) + extra * rng.normal(0, amplitude, n)), -127, 0).astype(int)
+    ts = t0 + np.arange(n) / float(rate); body = bytes(payload)
+    out = []
+    for i in range(n):
+        rt = _RT.pack(0, 0, _RT.size, _RT_PRESENT, 0, 12, freq, 0x00a0, int(sig[i]), -95)
+        hdr = struct.pack("<HH6s6s6sH", 0x0008, 0, b"\xff" * 6, addr[who[i]].tobytes(), addr[who[i]].tobytes(), i << 4 & 0xffff)
+        out.append((float(ts[i]), rt + hdr + body))
+    return out
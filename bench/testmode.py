@@ -0,0 +1,82 @@
+"""Test-mode stream profiler (tlvprofile.StreamProfiler) against synthetic streams.
+
+Validation: streams with known damage, read through a SensorReader in test mode (random
+read sizes, so frames straddle reads): frames cut out in bursts (driver/reader drops),
+an unknown-type and a short TLV, a mixed HT20/HT40 stream, a TSF reset and a stream
+cut off mid-frame. Reports what the profiler saw next to what was done to the stream.
+
+Throughput: frames/s of a SensorReader over the same file in test mode vs radar mode.
+
+    python -m bench.testmode [--frames 200000] [--rate 2000] [--out report.json]
+"""
+import argparse, json, os, queue, tempfile, time
+from bench import synth
+from multi import SensorReader
+from spectral_parser import TLV_HDR
+from tlvprofile import report, write_report
+
+class _Chunked:
+    """File wrapper whose reads return random sizes (as debugfs does)."""
+    def __init__(self, f, seed=0):
+        import numpy as np
+        self.f = f; self.rng = np.random.default_rng(seed)
+    def readinto(self, b):
+        k = int(self.rng.integers(1, len(b) + 1)); return self.f.readinto(memoryview(b)[:k])
+    def close(self): self.f.close()
+
+def _profile(path, chunked=True):
+    q = queue.Queue(); r = SensorReader("s0", "", "", stream=path, test_mode=True, out_queue=q); r.open()
+    if chunked: r.f = r.stream.f = _Chunked(r.f)
+    while not r.at_eof(): r.poll()
+    r.close(); last = None
+    while not q.empty():
+        item = q.get()
+        if item.get("type") == "alive": last = item["profile"]
+    return last
+
+def cases(frames=200000, rate=2000.0):
+    fb = synth.HT20_FRAME_BYTES; out = []
+    data, removed = synth.drop_frames(synth.tlv_stream(frames, rate=rate, jitter_us=40), fb, gaps=40, burst=(2, 30))
+    out.append(("40 drop bursts of 2-30 frames", data, {"gaps": 40, "dropped_est": removed}))
+    clean = synth.tlv_stream(frames, rate=rate)
+    bad = TLV_HDR.pack(9, 24) + bytes(24) + TLV_HDR.pack(1, 12) + bytes(12)
+    out.append(("unknown-type + short TLV", clean[:fb * 1000] + bad + clean[fb * 1000:], {"unknown_type": 1, "short_payload": 1, "gaps": 0}))
+    mixed = synth.mixed_stream(frames // 4, ht40_every=4)
+    out.append(("mixed HT20/HT40 (1 in 4)", mixed, {"types": {"HT20": 3 * (frames // 16), "HT40": frames // 16}, "gaps": 0}))
+    later = synth.tlv_stream(frames // 2, rate=rate, tsf0=0, seed=1); first = synth.tlv_stream(frames // 2, rate=rate, tsf0=10**12)
+    out.append(("TSF reset (adapter restart)", first + later, {"tsf_resets": 1, "gaps": 0}))
+    out.append(("stream cut mid-frame", clean + clean[:fb // 2], {"truncated_tail": fb // 2, "gaps": 0}))
+    return out
+
+def throughput(frames=200000, rate=2000.0):
+    d = tempfile.mkdtemp(prefix="ar9271_tm_"); path = os.path.join(d, "s.bin")
+    with open(path, "wb") as f: f.write(synth.tlv_stream(frames, rate=rate))
+    res = {}
+    for mode in (True, False):
+        best = float("inf")
+        for _ in range(3):
+            r = SensorReader("s0", "", "", stream=path, test_mode=mode, flow={"adaptive": False}); r.open(); t0 = time.perf_counter()
+            while not r.at_eof(): r.poll()
+            best = min(best, time.perf_counter() - t0); r.close()
+        res["test_mode_fps" if mode else "radar_mode_fps"] = frames / best
+    os.unlink(path); os.rmdir(d)
+    return res
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=200000); ap.add_argument("--rate", type=float, default=2000.0)
+    ap.add_argument("--out", help="also write the profiles as a test report")
+    a = ap.parse_args()
+    d = tempfile.mkdtemp(prefix="ar9271_tm_"); path = os.path.join(d, "s.bin"); profiles = {}
+    for name, data, expect in cases(a.frames, a.rate):
+        with open(path, "wb") as f: f.write(data)
+        p = profiles[name] = _profile(path)
+        print(f"--- {name}")
+        for k, v in expect.items(): print(f"{k:>16}: {p[k]}  (injected {v})")
+        print(f"{'frames':>16}: {p['frames']}, spacing p50 <{p['spacing_us']['p50']} us, {p['drop_pct']:.2f}% lost")
+    os.unlink(path); os.rmdir(d)
+    print("---"); print(json.dumps(throughput(a.frames, a.rate)))
+    if a.out: print("report:", write_report(a.out, report(profiles, [], source="synthetic")))
+
+if __name__ == "__main__":
+    main()
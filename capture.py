@@ -0,0 +1,111 @@
+import os, mmap, time
+from bisect import bisect_left, bisect_right
+import numpy as np
+from spectral_parser import frame_index
+
+# A capture is two append-only files per sensor:
+#   <prefix>.tlv  raw spectral_scan TLV bytes exactly as read (complete TLVs only)
+#   <prefix>.idx  one INDEX_DTYPE entry per TLV: byte offset into .tlv, driver TSF, read time
+# Fixed-size index entries make frame i an O(1) lookup and time seeks a binary search
+# over the memory-mapped index, independent of capture size.
+INDEX_DTYPE = np.dtype([("off","<u8"),("tsf","<u8"),("t","<f8")])
+
+class CaptureWriter:
+    def __init__(self, prefix):
+        d = os.path.dirname(prefix)
+        if d: os.makedirs(d, exist_ok=True)
+        self.prefix = prefix
+        self.data = open(prefix + ".tlv", "ab"); self.index = open(prefix + ".idx", "ab")
+        self.pos = self.data.tell(); self.frames = self.index.tell() // INDEX_DTYPE.itemsize
+
+    def write(self, chunk, t=None):
+        """Append one read's worth of complete TLVs with its read timestamp."""
+        offs, _, tsf = frame_index(chunk)
+        if not len(offs): return
+        idx = np.empty(len(offs), dtype=INDEX_DTYPE)
+        idx["off"] = offs + self.pos; idx["tsf"] = tsf; idx["t"] = time.time() if t is None else t
+        self.data.write(chunk); self.index.write(idx.tobytes())
+        self.pos += len(chunk); self.frames += len(offs)
+
+    def close(self):
+        for f in (self.data, self.index):
+            try: f.close()
+            except Exception: pass
+
+class Capture:
+    """Read-only memory-mapped view of a capture: frame ranges and time seeks via the index."""
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._data_f = open(prefix + ".tlv", "rb"); self._idx_f = open(prefix + ".idx", "rb")
+        size = os.fstat(self._data_f.fileno()).st_size
+        n = os.fstat(self._idx_f.fileno()).st_size // INDEX_DTYPE.itemsize
+        self._data_mm = mmap.mmap(self._data_f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._idx_mm = mmap.mmap(self._idx_f.fileno(), 0, access=mmap.ACCESS_READ) if n else None
+        self.data = memoryview(self._data_mm) if size else memoryview(b"")
+        self.index = np.frombuffer(self._idx_mm, dtype=INDEX_DTYPE, count=n) if n else np.empty(0, INDEX_DTYPE)
+        self.size = size
+        # frames indexed but whose bytes never made it to .tlv (crash mid-append) are dropped
+        while len(self.index) and int(self.index["off"][len(self.index)-1]) >= size: self.index = self.index[:-1]
+
+    def __len__(self): return len(self.index)
+
+    @property
+    def t0(self): return float(self.index["t"][0]) if len(self.index) else 0.0
+
+    @property
+    def t1(self): return float(self.index["t"][-1]) if len(self.index) else 0.0
+
+    def offset(self, i):
+        return self.size if i >= len(self.index) else int(self.index["off"][i])
+
+    def frames(self, i, j):
+        """memoryview over TLVs i..j-1 (no copy)."""
+        return self.data[self.offset(i):self.offset(j)]
+
+    def seek(self, t):
+        """Index of the first frame read at or after time t."""
+        return bisect_left(self.index["t"], t)
+
+    def seek_after(self, t):
+        return bisect_right(self.index["t"], t)
+
+    def close(self):
+        self.data.release(); self.index = None
+        for m in (self._data_mm, self._idx_mm):
+            try:
+                if m is not None: m.close()
+            except BufferError: pass  # a caller still holds a frame view; the map goes with it
+        self._data_f.close(); self._idx_f.close()
+
+class ReplayStream:
+    """TLVStream stand-in that feeds a Capture back through SensorReader.
+
+    speed=1.0 replays in real time from the recorded read timestamps, >1 accelerates, and
+    0 runs as fast as possible; each read() returns at most `chunk` bytes of whole TLVs."""
+    def __init__(self, prefix, speed=1.0, chunk=65536, start=None):
+        self.cap = Capture(prefix); self.speed = float(speed); self.chunk = int(chunk)
+        self.i = self.cap.seek(start) if start is not None else 0
+        self._wall0 = None; self._t0 = None
+        self.bytes = 0; self.frames = 0; self.carries = 0; self.malformed = 0; self.eof = False
+        self.t = None  # recorded read time of the last frame handed out
+
+    def read(self):
+        cap = self.cap; n = len(cap)
+        if self.i >= n:
+            self.eof = True; return None
+        j = n
+        if self.speed > 0:
+            now = time.monotonic()
+            if self._wall0 is None: self._wall0 = now; self._t0 = float(cap.index["t"][self.i])
+            j = cap.seek_after(self._t0 + (now - self._wall0) * self.speed)
+            if j <= self.i: return None
+        lim = cap.offset(self.i) + self.chunk
+        if cap.offset(j) > lim: j = max(self.i + 1, bisect_right(cap.index["off"], lim, self.i, j) - 1)
+        mv = cap.frames(self.i, j); self.t = float(cap.index["t"][j-1])
+        self.bytes += len(mv); self.frames += j - self.i; self.i = j
+        return mv
+
+    def stats(self):
+        return {"bytes": self.bytes, "frames": self.frames, "carries": self.carries, "malformed": self.malformed}
+
+    def close(self): self.cap.close()
@@ -0,0 +1,159 @@
+import socket, struct, subprocess, threading, time
+from time import perf_counter
+import netlink
+from metrics import Histogram, quantile
+
+# Channel control. A backend has setup(iface, channel, bw), which puts the interface in
+# monitor mode on that channel, and tune(iface, channel, bw), which only retunes an
+# interface that is already in monitor mode and up. NetlinkChannel does both over
+# rtnetlink/nl80211 (and skips down/type/up when the interface is already a monitor);
+# IwChannel is the ip/iw subprocess version; FakeChannel records calls for dry runs.
+# A Sweep hops one interface through a channel plan on a backend and times each retune.
+
+IFF_UP = 0x1
+NL80211_CMD_SET_WIPHY = 2
+NL80211_IFTYPE_MONITOR = 6
+_CHAN_TYPE = {"NOHT": 0, "HT20": 1, "HT40-": 2, "HT40+": 3}
+_WIDE = {"80MHz": (3, 80), "160MHz": (5, 160)}  # nl80211_chan_width, MHz
+
+def channel_to_freq(ch):
+    ch = int(ch)
+    if ch == 14: return 2484
+    if 1 <= ch <= 13: return 2407 + 5 * ch
+    if 32 <= ch <= 177: return 5000 + 5 * ch
+    raise ValueError(f"unsupported channel {ch}")
+
+def _center(freq, mhz):
+    # 5 GHz 80/160 MHz blocks start at 5180 (ch 36); the centre is the middle of the block
+    lo = 5180 + ((freq - 5180) // mhz) * mhz
+    return lo + mhz // 2 - 10
+
+class NetlinkChannel:
+    """setup()/tune() over netlink: no subprocesses, one or two round trips per retune."""
+    def __init__(self):
+        self.nl = netlink.Nl80211()
+        try: self.rt = netlink.Socket(netlink.NETLINK_ROUTE)
+        except OSError: self.nl.close(); raise
+        self._lock = threading.Lock()
+
+    def _link(self, ifindex, up):
+        payload = netlink.IFINFO.pack(socket.AF_UNSPEC, 0, ifindex, IFF_UP if up else 0, IFF_UP)
+        self.rt.request(netlink.RTM_NEWLINK, payload)
+
+    def _u32(self, typ, v): return netlink.attr(typ, struct.pack("=I", v))
+
+    def _freq(self, ifindex, channel, bw):
+        freq = channel_to_freq(channel)
+        a = self._u32(netlink.NL80211_ATTR_IFINDEX, ifindex) + self._u32(netlink.NL80211_ATTR_WIPHY_FREQ, freq)
+        if bw in _WIDE:
+            width, mhz = _WIDE[bw]
+            a += self._u32(netlink.NL80211_ATTR_CHANNEL_WIDTH, width) + self._u32(netlink.NL80211_ATTR_CENTER_FREQ1, _center(freq, mhz))
+        elif bw in _CHAN_TYPE: a += self._u32(netlink.NL80211_ATTR_WIPHY_CHANNEL_TYPE, _CHAN_TYPE[bw])
+        else: raise ValueError(f"unsupported width {bw!r}")
+        self.nl._cmd(NL80211_CMD_SET_WIPHY, a)
+
+    def setup(self, iface, channel, bw="HT20"):
+        ifindex = socket.if_nametoindex(iface)
+        with self._lock:
+            info = self.nl.interface(ifindex)
+            if info is None or info["type"] != "monitor":
+                self._link(ifindex, False)
+                self.nl._cmd(netlink.NL80211_CMD_SET_INTERFACE, self._u32(netlink.NL80211_ATTR_IFINDEX, ifindex) + self._u32(netlink.NL80211_ATTR_IFTYPE, NL80211_IFTYPE_MONITOR))
+            self._link(ifindex, True)
+            self._freq(ifindex, channel, bw)
+
+    def tune(self, iface, channel, bw="HT20"):
+        ifindex = socket.if_nametoindex(iface)
+        with self._lock: self._freq(ifindex, channel, bw)
+
+    def close(self): self.nl.close(); self.rt.close()
+
+class IwChannel:
+    """The ip/iw subprocess path (four processes per setup, one per tune)."""
+    def setup(self, iface, channel, bw="HT20"):
+        subprocess.check_call(["ip","link","set",iface,"down"])
+        subprocess.check_call(["iw","dev",iface,"set","type","monitor"])
+        subprocess.check_call(["ip","link","set",iface,"up"])
+        self.tune(iface, channel, bw)
+
+    def tune(self, iface, channel, bw="HT20"):
+        subprocess.check_call(["iw","dev",iface,"set","channel",str(channel),bw])
+
+    def close(self): pass
+
+class FakeChannel:
+    """Adapter stand-in: sleeps `latency` s per call and records (op, iface, channel, bw)."""
+    def __init__(self, latency=0.0, fail=()):
+        self.latency = latency; self.fail = set(fail); self.calls = []; self.channel = {}
+
+    def _op(self, op, iface, channel, bw):
+        if self.latency: time.sleep(self.latency)
+        self.calls.append((op, iface, channel, bw))
+        if channel in self.fail: raise OSError(22, f"channel {channel} rejected")
+        self.channel[iface] = (channel, bw)
+
+    def setup(self, iface, channel, bw="HT20"): self._op("setup", iface, channel, bw)
+    def tune(self, iface, channel, bw="HT20"): self._op("tune", iface, channel, bw)
+    def close(self): pass
+
+_backend = None; _backend_lock = threading.Lock()
+def backend():
+    """Process-wide channel backend: netlink when nl80211 is reachable, else ip/iw."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            try: _backend = NetlinkChannel()
+            except (OSError, AttributeError): _backend = IwChannel()
+        return _backend
+
+def parse_plan(spec, bw="HT20", dwell=0.25):
+    """"1,6/0.5,11" -> [(1, bw, 0.25), (6, bw, 0.5), (11, bw, 0.25)]; "/s" overrides the dwell."""
+    plan = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part: continue
+        ch, _, d = part.partition("/")
+        plan.append((int(ch), bw, float(d) if d else float(dwell)))
+    return plan
+
+class Sweep:
+    """Hops `iface` through `plan` [(channel, bw, dwell_s)] on `ctl`, one step() at a time.
+
+    step() is cheap when no hop is due, so readers call it on every poll. Each retune is
+    timed into `latency` (a Histogram); a failed retune is counted and the plan moves on."""
+    def __init__(self, ctl, iface, plan, clock=time.monotonic):
+        if not plan: raise ValueError("empty channel plan")
+        self.ctl = ctl; self.iface = iface; self.plan = list(plan); self.clock = clock
+        self.i = -1; self.t_next = None; self.latency = Histogram()
+        self.retunes = 0; self.errors = 0; self.last_latency = None; self.last_error = None
+
+    @property
+    def channel(self): return self.plan[self.i][0] if self.i >= 0 else None
+
+    def start(self):
+        ch, bw, dwell = self.plan[0]
+        self.ctl.setup(self.iface, ch, bw)
+        self.i = 0; self.t_next = self.clock() + dwell
+
+    def step(self):
+        """Hop if the dwell is over; True when the channel changed."""
+        now = self.clock()
+        if self.t_next is None or now < self.t_next or len(self.plan) == 1: return False
+        i = (self.i + 1) % len(self.plan); ch, bw, dwell = self.plan[i]
+        t0 = perf_counter()
+        try: self.ctl.tune(self.iface, ch, bw)
+        except Exception as e:
+            self.errors += 1; self.last_error = f"channel {ch}: {e}"
+            self.i = i; self.t_next = now + dwell
+            return False
+        dt = perf_counter() - t0
+        self.latency.observe(dt); self.last_latency = dt; self.retunes += 1
+        self.i = i; self.t_next = self.clock() + dwell
+        return True
+
+    def stats(self):
+        snap = self.latency.snapshot()
+        return {"channel": self.channel, "retunes": self.retunes, "retune_errors": self.errors,
+                "retune_ms_last": None if self.last_latency is None else 1e3 * self.last_latency,
+                "retune_ms_p50": None if not snap[2] else 1e3 * quantile(snap, 0.5),
+                "retune_ms_mean": None if not snap[2] else 1e3 * snap[1] / snap[2]}
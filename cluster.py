@@ -0,0 +1,415 @@
+import collections, json, select, selectors, socket, struct, threading, time
+import numpy as np
+from ring import SampleRing, SAMPLE_COLUMNS, SPECTRUM_COLUMNS
+from metrics import Histogram, thread_cpu
+from multi import SideQueue
+
+# Multi-node streaming. Each node runs its readers locally (MultiManager) plus a
+# NodeStreamer that ships its sample rings, and optionally decimated spectra, to an
+# Aggregator over TCP or UDP. The Aggregator stands in for a MultiManager on the central
+# host: it fills one SampleRing per "<node>/<sensor>", so radard.py, FusionEngine and the
+# GUI consume remote sensors exactly like local ones.
+#
+# Every frame is a 32-byte header followed by the payload:
+#   magic "RN", version, kind, seq (u32, per node, every frame), payload length (u32),
+#   t_send (f64, node clock), offset (f64, the node's estimate of aggregator minus node
+#   clock), rtt (f32 s, of that estimate; -1 before the first)
+# Kinds:
+#   H  hello, JSON {"node", "sensors": [{"name", "label"}], "columns"}: first on every
+#      TCP connection, and every HELLO_S seconds over UDP, which has no connection
+#   S  samples: u8 sections; each is u8 sensor index, u32 rows, t as f64, then the other
+#      SAMPLE_COLUMNS as f32 (columns - 1, rows)
+#   P  spectra: the same layout with the SPECTRUM_COLUMNS bins as f16
+#   J  a side-channel message from the node (error, shed, sweep, ...), JSON
+#   C  clock ping (t_send = t1); the aggregator answers R: f64 t1, t2 (receive), t3 (send)
+# The node keeps the offset from the lowest-rtt of its last 8 pings (NTP style) and the
+# aggregator moves each sample's t onto its own clock with it.
+
+MAGIC = b"RN"; VERSION = 1
+HDR = struct.Struct("<2sBcIIddf")
+SEC = struct.Struct("<BI")
+CLOCK = struct.Struct("<ddd")
+DEFAULT_PORT = 7100
+UDP_MAX = 65000   # bytes per frame over UDP (one datagram)
+HELLO_S = 2.0
+
+def _frames(buf):
+    # complete frames at the start of bytearray `buf`, which loses them as they are read
+    i = 0
+    try:
+        while len(buf) - i >= HDR.size:
+            magic, ver, kind, seq, n, t_send, off, rtt = HDR.unpack_from(buf, i)
+            if magic != MAGIC or ver != VERSION: raise ValueError(f"bad frame header {bytes(buf[i:i+4])!r}")
+            if len(buf) - i - HDR.size < n: break
+            yield kind, seq, t_send, off, rtt, bytes(buf[i + HDR.size:i + HDR.size + n]); i += HDR.size + n
+    finally: del buf[:i]
+
+def _sections(payload, ncols, dtype):
+    # (sensor index, t, (ncols - 1, rows) values) for each section of an S/P payload
+    k = payload[0]; i = 1; isz = np.dtype(dtype).itemsize
+    for _ in range(k):
+        idx, rows = SEC.unpack_from(payload, i); i += SEC.size
+        t = np.frombuffer(payload, np.float64, rows, i); i += 8 * rows
+        v = np.frombuffer(payload, dtype, (ncols - 1) * rows, i).reshape(ncols - 1, rows); i += isz * (ncols - 1) * rows
+        yield idx, t, v
+
+class NodeStreamer(threading.Thread):
+    """Ships `rings` ({sensor: SampleRing}) to an Aggregator at host:port as node `node`.
+
+    Every `batch_s` it sends the rows written since the last send, split into frames of
+    at most `max_frame` bytes; a ring's cursor only moves past rows whose frame was sent,
+    so after a reconnect the backlog still in the ring goes out first (rows the ring
+    overwrote meanwhile are counted in dropped_rows). Reconnects back off up to 10 s.
+    With `spectra` rings and spectra_hz > 0, spectrum rows are sent at most that often."""
+    def __init__(self, node, rings, host, port=DEFAULT_PORT, proto="tcp", sensors=None, spectra=None,
+                 spectra_hz=0.0, batch_s=0.05, ping_s=1.0, max_frame=None, clock=time.time):
+        super().__init__(daemon=True, name="node-streamer")
+        if proto not in ("tcp", "udp"): raise ValueError(f"unknown proto {proto!r}")
+        self.node = node; self.rings = rings; self.addr = (host, int(port)); self.proto = proto
+        labels = {s["name"]: s.get("label", s["name"]) for s in (sensors or [])}
+        self.names = list(rings); self.index = {n: i for i, n in enumerate(self.names)}
+        self.hello = json.dumps({"node": node, "sensors": [{"name": n, "label": labels.get(n, n)} for n in self.names],
+                                 "columns": list(SAMPLE_COLUMNS)}).encode()
+        self.spectra = spectra if spectra_hz else {}; self.spectra_hz = spectra_hz
+        self.batch_s = batch_s; self.ping_s = ping_s; self.clock = clock
+        self.max_frame = min(max_frame or (1 << 20), UDP_MAX) if proto == "udp" else (max_frame or 1 << 20)
+        self.sock = None; self.cursors = {}; self.spec_cursors = {}; self.spec_t = {}; self._rbuf = bytearray()
+        self.seq = 0; self.offset = 0.0; self.rtt = -1.0; self._pings = collections.deque(maxlen=8)
+        self.messages = collections.deque(maxlen=1000)
+        self.sent_frames = 0; self.sent_bytes = 0; self.dropped_rows = 0; self.connects = 0; self.last_error = None
+        self._stop_event = threading.Event()
+
+    def message(self, item):
+        """Queue a side-channel message (a MultiManager queue item) for the aggregator."""
+        self.messages.append(item)
+
+    def _open(self):
+        if self.proto == "tcp":
+            s = socket.create_connection(self.addr, timeout=2.0)
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM); s.connect(self.addr)
+        self.sock = s; self._rbuf = bytearray(); self.connects += 1
+        self._send(b"H", self.hello)
+
+    def _close(self):
+        if self.sock is not None:
+            try: self.sock.close()
+            except OSError: pass
+        self.sock = None
+
+    def _send(self, kind, payload):
+        self.seq = (self.seq + 1) & 0xffffffff
+        data = HDR.pack(MAGIC, VERSION, kind, self.seq, len(payload), self.clock(), self.offset, self.rtt) + payload
+        if self.proto == "tcp": self.sock.sendall(data)
+        else: self.sock.send(data)
+        self.sent_frames += 1; self.sent_bytes += len(data)
+
+    def _replies(self):
+        while select.select([self.sock], [], [], 0)[0]:  # the socket keeps its send timeout, so poll first
+            data = self.sock.recv(1 << 16)
+            if not data:
+                if self.proto == "tcp": raise ConnectionError("aggregator closed the connection")
+                return
+            if self.proto == "udp": self._rbuf = bytearray()  # one frame per datagram
+            self._rbuf += data
+            for kind, _, _, _, _, payload in _frames(self._rbuf):
+                if kind == b"R" and len(payload) == CLOCK.size: self._clock(*CLOCK.unpack(payload))
+
+    def _clock(self, t1, t2, t3):
+        t4 = self.clock(); rtt = (t4 - t1) - (t3 - t2)
+        self._pings.append((rtt, ((t2 - t1) + (t3 - t4)) / 2))
+        self.rtt, self.offset = min(self._pings)
+
+    def _flush(self, kind, rings, cursors, dtype, pick=None):
+        # frames of `kind` with the rows of `rings` since `cursors`; a cursor only moves past
+        # rows whose frame went out
+        ncols = len(SAMPLE_COLUMNS) if kind == b"S" else len(SPECTRUM_COLUMNS)
+        rowb = 8 + np.dtype(dtype).itemsize * (ncols - 1); room = self.max_frame - HDR.size - 1
+        parts = []; used = 0; commit = {}
+        for name, ring in rings.items():
+            block, head, over = ring.read_block(cursors.get(name, 0))
+            if over: self.dropped_rows += over
+            start = head - block.shape[1]; pos = np.arange(block.shape[1])
+            if pick is not None and len(pos): pos = pick(name, block[0]); block = block[:, pos]
+            i = 0; m = len(pos)
+            while i < m:
+                k = min(m - i, (room - used - SEC.size) // rowb)
+                if k <= 0:  # frame full
+                    self._send(kind, bytes([len(parts)]) + b"".join(parts)); cursors.update(commit)
+                    parts = []; used = 0; commit = {}; continue
+                b = block[:, i:i + k]
+                parts.append(SEC.pack(self.index[name], k) + b[0].tobytes() + b[1:].astype(dtype).tobytes())
+                used += SEC.size + rowb * k; i += k; commit[name] = start + int(pos[i - 1]) + 1
+            commit[name] = head
+        if parts: self._send(kind, bytes([len(parts)]) + b"".join(parts))
+        cursors.update(commit)
+
+    def _pick_spectra(self, name, t):
+        # rows at least 1/spectra_hz apart, continuing from the last row sent
+        out = []; last = self.spec_t.get(name, -np.inf); step = 1.0 / self.spectra_hz
+        for i, ti in enumerate(t.tolist()):
+            if ti - last >= step: out.append(i); last = ti
+        self.spec_t[name] = last
+        return np.array(out, dtype=np.intp)
+
+    def run(self):
+        backoff = 0.5; next_try = 0.0; next_ping = 0.0; next_hello = 0.0; opened = 0.0
+        while not self._stop_event.is_set():
+            # a ping reply wakes the loop at once: its receive time is the clock estimate's t4
+            if self.sock is not None: select.select([self.sock], [], [], self.batch_s)
+            elif self._stop_event.wait(self.batch_s): break
+            now = time.monotonic()
+            try:
+                if self.sock is None:
+                    if now < next_try: continue
+                    self._open(); backoff = 0.5; opened = now; next_hello = now + HELLO_S; next_ping = now
+                elif self.proto == "udp" and now >= next_hello:
+                    self._send(b"H", self.hello); next_hello = now + HELLO_S
+                self._replies()
+                if now >= next_ping: self._send(b"C", b""); next_ping = now + self.ping_s
+                if self.rtt < 0 and now - opened < 0.5: continue  # hold samples until the clock offset is known
+                while self.messages:
+                    self._send(b"J", json.dumps(self.messages[0]).encode()); self.messages.popleft()
+                self._flush(b"S", self.rings, self.cursors, np.float32)
+                if self.spectra: self._flush(b"P", self.spectra, self.spec_cursors, np.float16, self._pick_spectra)
+            except (OSError, ValueError) as e:
+                self.last_error = f"{type(e).__name__}: {e}"; self._close()
+                next_try = now + backoff; backoff = min(2 * backoff, 10.0)
+        self._close()
+
+    def stats(self):
+        return {"connected": int(self.sock is not None), "sent_frames": self.sent_frames, "sent_bytes": self.sent_bytes,
+                "dropped_rows": self.dropped_rows, "connects": self.connects, "clock_offset": self.offset,
+                "clock_rtt": self.rtt}
+
+    def stop(self):
+        self._stop_event.set(); self.join(timeout=5.0)
+
+class _Node:
+    # aggregator-side state of one node
+    def __init__(self, name):
+        self.name = name; self.conn = None; self.addr = None; self.sensors = []; self.seq = None; self.alive = False
+        self.frames = 0; self.rows = 0; self.bytes = 0; self.lost = 0; self.reconnects = 0; self.restarts = 0
+        self.offset = 0.0; self.rtt = -1.0; self.lag = Histogram(); self.last_lag = None; self.last_rx = None
+
+class _Conn:
+    def __init__(self, sock, addr): self.sock = sock; self.addr = addr; self.buf = bytearray(); self.out = bytearray(); self.writing = False; self.node = None
+
+class Aggregator:
+    """Central end of the node streams; used in place of a MultiManager.
+
+    Listens on host:port (`proto` "tcp", "udp" or "both") in one selector thread, so a
+    slow, silent or reconnecting node never holds up the others. `sensors` pre-creates
+    rings for "<node>/<sensor>" names (so fusion and plots know them before the nodes
+    connect); rings for other announced sensors are added on hello. Node events
+    (connected, reconnected, restarted, disconnected, stale) and every node's side
+    messages arrive on `queue`, and a "nodes" summary with per-node lag every
+    `report_s` seconds."""
+    def __init__(self, sensors=None, host="0.0.0.0", port=DEFAULT_PORT, proto="tcp", ring_capacity=1 << 16,
+                 spectra=False, queue_size=1000, stale_s=5.0, report_s=5.0, clock=time.time):
+        if proto not in ("tcp", "udp", "both"): raise ValueError(f"unknown proto {proto!r}")
+        self.sensors_cfg = list(sensors or []); self.host = host; self.port = int(port); self.proto = proto
+        self.ring_capacity = ring_capacity; self.want_spectra = spectra; self.stale_s = stale_s; self.report_s = report_s
+        self.clock = clock; self.queue = SideQueue(queue_size); self.threads = []
+        self.rings = {}; self.spectra = {}; self.nodes = {}; self.labels = {}
+        self.unknown_frames = 0; self.bad_frames = 0
+        self.sel = None; self.tcp = None; self.udp = None; self._udp_nodes = {}
+        self._thread = None; self._stop_event = threading.Event()
+
+    def _post(self, typ, sensor, **kw):
+        self.queue.put({"t": self.clock(), "sensor": sensor, "type": typ, **kw})
+
+    def start(self):
+        self.rings = {s["name"]: SampleRing(self.ring_capacity) for s in self.sensors_cfg}
+        self.labels = {s["name"]: s.get("label", s["name"]) for s in self.sensors_cfg}
+        self.sel = selectors.DefaultSelector()
+        if self.proto in ("tcp", "both"):
+            self.tcp = socket.create_server((self.host, self.port), reuse_port=False)
+            self.tcp.setblocking(False); self.sel.register(self.tcp, selectors.EVENT_READ, "listen")
+            self.port = self.tcp.getsockname()[1]
+        if self.proto in ("udp", "both"):
+            self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+            self.udp.bind((self.host, self.port)); self.udp.setblocking(False)
+            self.sel.register(self.udp, selectors.EVENT_READ, "udp"); self.port = self.udp.getsockname()[1]
+        self._thread = threading.Thread(target=self._run, daemon=True, name="aggregator"); self._thread.start()
+        return self.queue
+
+    def _run(self):
+        next_report = time.monotonic() + self.report_s
+        while not self._stop_event.is_set():
+            for key, mask in self.sel.select(0.25):
+                if key.data == "listen":
+                    try: s, addr = self.tcp.accept()
+                    except OSError: continue
+                    s.setblocking(False); self.sel.register(s, selectors.EVENT_READ, _Conn(s, addr))
+                elif key.data == "udp": self._read_udp()
+                else:
+                    if mask & selectors.EVENT_WRITE: self._write_tcp(key.data)
+                    if mask & selectors.EVENT_READ: self._read_tcp(key.data)
+            now = time.monotonic()
+            self._check_stale(now)
+            if now >= next_report: self._report(); next_report = now + self.report_s
+        for key in list(self.sel.get_map().values()):
+            if isinstance(key.data, _Conn): key.data.sock.close()
+        self.sel.close()
+
+    def _read_tcp(self, c):
+        try: data = c.sock.recv(1 << 18)  # bounded per wakeup: a busy node can't starve the rest
+        except BlockingIOError: return
+        except OSError: data = b""
+        if not data: self._drop(c); return
+        c.buf += data; now = self.clock()
+        try:
+            for f in _frames(c.buf): self._handle(c, f, now, len(f[5]) + HDR.size)
+        except Exception as e:  # whatever a peer sends, only its own connection goes
+            self.bad_frames += 1; self._post("error", c.node or f"{c.addr[0]}:{c.addr[1]}", msg=f"bad stream, dropping connection: {type(e).__name__}: {e}")
+            self._drop(c)
+
+    def _read_udp(self):
+        for _ in range(256):
+            try: data, addr = self.udp.recvfrom(1 << 16)
+            except (BlockingIOError, OSError): return
+            now = self.clock()
+            try:
+                for f in _frames(bytearray(data)): self._handle(addr, f, now, len(data))
+            except Exception: self.bad_frames += 1
+
+    def _drop(self, c):
+        try: self.sel.unregister(c.sock)
+        except (KeyError, ValueError): pass
+        c.sock.close()
+        n = self.nodes.get(c.node)
+        if n is not None and n.conn is c:
+            n.conn = None; n.alive = False; self._post("node", n.name, event="disconnected")
+
+    def _reply(self, src, data):
+        if not isinstance(src, _Conn):
+            try: self.udp.sendto(data, src)
+            except OSError: pass
+            return
+        if len(src.out) + len(data) > 1 << 16: return  # the node isn't reading replies; skip this one whole
+        src.out += data
+        if len(src.out) == len(data): self._write_tcp(src)
+
+    def _write_tcp(self, c):
+        # send queued replies; whatever a full send buffer leaves waits for EVENT_WRITE, so a
+        # frame is never cut short
+        try: del c.out[:c.sock.send(c.out)]
+        except BlockingIOError: pass
+        except OSError: c.out.clear()  # the read side sees the connection go
+        if bool(c.out) != c.writing:
+            c.writing = bool(c.out)
+            try: self.sel.modify(c.sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if c.writing else 0), c)
+            except (KeyError, ValueError): pass
+
+    def _hello(self, src, hello):
+        if not isinstance(hello, dict) or "node" not in hello or not isinstance(hello.get("sensors"), list) \
+                or not all(isinstance(s, dict) and "name" in s for s in hello["sensors"]):
+            raise ValueError(f"bad hello {str(hello)[:80]!r}")
+        name = str(hello["node"]); n = self.nodes.get(name)
+        if tuple(hello.get("columns", ())) != SAMPLE_COLUMNS:
+            raise ValueError(f"node {name}: columns {hello.get('columns')} differ from {list(SAMPLE_COLUMNS)}")
+        if n is None:
+            n = self.nodes[name] = _Node(name); event = "connected"
+        elif isinstance(src, _Conn): event = None if n.conn is src else "reconnected"
+        else: event = None if n.alive and n.addr == src else "reconnected"
+        if isinstance(src, _Conn):
+            if n.conn is not None and n.conn is not src: old = n.conn; n.conn = None; self._drop(old)
+            n.conn = src; src.node = name
+        else:
+            if n.addr is not None and n.addr != src: self._udp_nodes.pop(n.addr, None)
+            n.addr = src; self._udp_nodes[src] = name
+        if event == "reconnected": n.reconnects += 1
+        n.alive = True; n.sensors = [s["name"] for s in hello["sensors"]]
+        new = {}
+        for s in hello["sensors"]:
+            full = f"{name}/{s['name']}"; self.labels.setdefault(full, s.get("label", s["name"]))
+            if full not in self.rings: new[full] = SampleRing(self.ring_capacity)
+        if new: self.rings = {**self.rings, **new}  # copy, so readers iterating the old dict are unaffected
+        if self.want_spectra:
+            add = {f"{name}/{s}": SampleRing(1024, SPECTRUM_COLUMNS) for s in n.sensors if f"{name}/{s}" not in self.spectra}
+            if add: self.spectra = {**self.spectra, **add}
+        if event: self._post("node", name, event=event, sensors=n.sensors)
+        return n
+
+    def _handle(self, src, frame, now, nbytes):
+        kind, seq, t_send, off, rtt, payload = frame
+        if kind == b"H": n = self._hello(src, json.loads(payload))
+        else:
+            n = self.nodes.get(src.node if isinstance(src, _Conn) else self._udp_nodes.get(src))
+            if n is None: self.unknown_frames += 1; return
+        if n.seq is not None:
+            d = (seq - n.seq) & 0xffffffff
+            if d > 0x7fffffff or d == 0:  # sequence went back: the node restarted
+                n.restarts += 1; self._post("node", n.name, event="restarted")
+            elif d > 1: n.lost += d - 1
+        n.seq = seq; n.frames += 1; n.bytes += nbytes; n.last_rx = time.monotonic()
+        if not n.alive:
+            n.alive = True; self._post("node", n.name, event="resumed")
+        if rtt >= 0: n.offset = off; n.rtt = rtt
+        if kind == b"C": self._reply(src, HDR.pack(MAGIC, VERSION, b"R", 0, CLOCK.size, 0.0, 0.0, -1.0) + CLOCK.pack(t_send, now, self.clock()))
+        elif kind == b"S":
+            newest = -np.inf
+            for idx, t, v in _sections(payload, len(SAMPLE_COLUMNS), np.float32):
+                ring = self.rings.get(f"{n.name}/{n.sensors[idx]}")
+                if ring is None or not len(t): continue
+                t = t + n.offset; cols = {"t": t}; cols.update(zip(SAMPLE_COLUMNS[1:], v))
+                ring.append(cols); n.rows += len(t); newest = max(newest, float(t[-1]))
+            if newest > -np.inf:
+                n.last_lag = now - newest; n.lag.observe(max(0.0, n.last_lag))
+        elif kind == b"P":
+            for idx, t, v in _sections(payload, len(SPECTRUM_COLUMNS), np.float16):
+                ring = self.spectra.get(f"{n.name}/{n.sensors[idx]}")
+                if ring is None or not len(t): continue
+                cols = {"t": t + n.offset}; cols.update(zip(SPECTRUM_COLUMNS[1:], v))
+                ring.append(cols)
+        elif kind == b"J":
+            msg = json.loads(payload)
+            if not isinstance(msg, dict): raise ValueError(f"side message is not an object: {str(msg)[:80]!r}")
+            s = msg.get("sensor")
+            msg["sensor"] = f"{n.name}/{s}" if s in n.sensors else n.name
+            if "t" in msg: msg["t"] = msg["t"] + n.offset
+            self.queue.put(msg)
+
+    def _check_stale(self, now):
+        for n in list(self.nodes.values()):
+            if n.alive and n.last_rx is not None and now - n.last_rx > self.stale_s:
+                n.alive = False; self._post("node", n.name, event="stale", idle_s=round(now - n.last_rx, 1))
+
+    def lags(self):
+        """{node: seconds from the newest sample's (corrected) time to its arrival}"""
+        return {k: n.last_lag for k, n in list(self.nodes.items())}
+
+    def _report(self):
+        if not self.nodes: return
+        self._post("nodes", "aggregator", nodes={k: {
+            "connected": n.alive, "lag_ms": None if n.last_lag is None else round(1e3 * n.last_lag, 1),
+            "offset_ms": round(1e3 * n.offset, 2), "rtt_ms": None if n.rtt < 0 else round(1e3 * n.rtt, 2),
+            "rows": n.rows, "lost_frames": n.lost, "reconnects": n.reconnects} for k, n in list(self.nodes.items())})
+
+    def collect(self):
+        """Snapshot for metrics.render: per-node lag histogram, counters and clock gauges."""
+        sensors = {}; now = time.monotonic()
+        for k, n in list(self.nodes.items()):
+            g = {"node_connected": int(n.alive), "clock_offset_seconds": n.offset}
+            if n.rtt >= 0: g["clock_rtt_seconds"] = n.rtt
+            if n.last_lag is not None: g["node_lag_seconds"] = n.last_lag
+            if n.last_rx is not None: g["node_idle_seconds"] = now - n.last_rx
+            sensors[f"node:{k}"] = {"stages": {"lag": n.lag.snapshot()}, "gauges": g,
+                                    "counters": {"node_frames": n.frames, "node_rows": n.rows, "node_bytes": n.bytes,
+                                                 "node_lost_frames": n.lost, "node_reconnects": n.reconnects,
+                                                 "node_restarts": n.restarts}}
+        for name, ring in list(self.rings.items()):
+            sensors.setdefault(name, {"stages": {}, "counters": {}})["counters"]["ring_rows"] = ring.head
+        return {"sensors": sensors, "cpu": thread_cpu(),
+                "gauges": {"queue_depth": self.queue.qsize(), "queue_dropped": self.queue.dropped, "nodes": len(self.nodes),
+                           "nodes_connected": sum(n.alive for n in list(self.nodes.values())),
+                           "bad_frames": self.bad_frames, "unknown_frames": self.unknown_frames}}
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread: self._thread.join(timeout=2.0)
+        for s in (self.tcp, self.udp):
+            if s is not None: s.close()
@@ -1,16 +1,26 @@
-import os, subprocess, re
+import os, subprocess, re, select, threading
+from collections import deque
+import netlink
+
 def _real(path):
     try: return os.path.realpath(path)
     except Exception: return ""
-def list_wireless():
+
+def _sysfs(iface):
+    """phy name, driver module and USB-ness from sysfs; None if iface is not wireless."""
+    ip=os.path.join("/sys/class/net",iface); phy_link=os.path.join(ip,"phy80211")
+    if not os.path.islink(phy_link): return None
+    drv_link=os.path.join(ip,"device","driver","module")
+    return {"phy":os.path.basename(_real(phy_link)),
+            "driver":os.path.basename(_real(drv_link)) if os.path.exists(drv_link) else None,
+            "is_usb":"/usb" in _real(os.path.join(ip,"device"))}
+
+def _list_iw():
+    # fallback when nl80211 is not reachable over netlink: sysfs + one `iw` per interface
     found=[]; base="/sys/class/net"
     for iface in sorted(os.listdir(base)):
-        ip=os.path.join(base,iface); phy_link=os.path.join(ip,"phy80211")
-        if not os.path.islink(phy_link): continue
-        phy=os.path.basename(_real(phy_link))
-        drv_link=os.path.join(ip,"device","driver","module")
-        driver=os.path.basename(_real(drv_link)) if os.path.exists(drv_link) else None
-        dev_path=_real(os.path.join(ip,"device")); is_usb="/usb" in dev_path
+        info=_sysfs(iface)
+        if info is None: continue
         channel=None; bw="HT20"
         try:
             out=subprocess.check_output(["iw","dev",iface,"info"], text=True, stderr=subprocess.DEVNULL)
@@ -18,8 +28,122 @@ def list_wireless():
             if m: channel=int(m.group(1))
             if "width: 40 MHz" in out: bw="HT40+"
         except Exception: pass
-        found.append({"iface":iface,"phy":phy,"driver":driver,"is_usb":is_usb,"channel":channel,"bw":bw})
+        found.append({"iface":iface,**info,"channel":channel,"bw":bw})
     return found
+
+class Discovery:
+    """Wireless interface list from nl80211, cached.
+
+    While the watcher thread runs (start()), the cache is kept current from rtnetlink link
+    events and nl80211 interface notifications: only the interfaces named in an event are
+    queried again, on the next list(). Without the watcher every list() is one nl80211 dump.
+    If nl80211 cannot be reached at all, list() falls back to `iw dev <iface> info`.
+    Changes seen by the watcher are queued as (event, iface) for changes()."""
+    def __init__(self):
+        self.nl=None; self.backend="iw"
+        try: self.nl=netlink.Nl80211(); self.backend="nl80211"
+        except (OSError, AttributeError): pass  # no AF_NETLINK / no nl80211 family / no permission
+        self.cache=None; self.dirty=set(); self.events=deque(maxlen=256)
+        self._lock=threading.Lock(); self._thread=None; self._stop_event=threading.Event()
+
+    def _entry(self, i):
+        info=_sysfs(i["iface"]) if i["iface"] else None
+        if info is None: return None
+        return {"iface":i["iface"],**info,"channel":i["channel"],"bw":i["bw"],"ifindex":i["ifindex"],"type":i["type"]}
+
+    def _full(self):
+        out={}
+        for i in self.nl.interfaces():
+            e=self._entry(i)
+            if e is not None: out[e["ifindex"]]=e
+        return out
+
+    def list(self, refresh=False):
+        if self.nl is None: return _list_iw()
+        with self._lock:
+            try:
+                if refresh or self.cache is None or self._thread is None:
+                    self.cache=self._full(); self.dirty.clear()
+                for ifindex in list(self.dirty):
+                    i=self.nl.interface(ifindex); e=self._entry(i) if i else None
+                    if e is None: self.cache.pop(ifindex, None)
+                    else: self.cache[ifindex]=e
+                    self.dirty.discard(ifindex)
+            except OSError:
+                self.cache=None; return _list_iw()
+            return sorted((dict(e) for e in self.cache.values()), key=lambda e:e["iface"])
+
+    def invalidate(self, iface):
+        """Query iface again on the next list(), e.g. after changing its channel ourselves
+           (nl80211 sends no notification for channel changes on monitor interfaces)."""
+        with self._lock:
+            self.dirty.update(k for k,e in (self.cache or {}).items() if e["iface"]==iface)
+
+    def changes(self):
+        out=[]
+        while self.events: out.append(self.events.popleft())
+        return out
+
+    def start(self):
+        if self.nl is None or self._thread is not None: return self
+        self._stop_event.clear()
+        self._thread=threading.Thread(target=self._watch, daemon=True, name="netlink-watch"); self._thread.start()
+        return self
+
+    def _note(self, event, ifindex, iface):
+        with self._lock:
+            known=self.cache is not None and ifindex in self.cache
+            self.dirty.add(ifindex)
+        if event!="new" or not known: self.events.append((event, iface))
+
+    def _watch(self):
+        socks=[]
+        try:
+            rt=netlink.Socket(netlink.NETLINK_ROUTE, groups=netlink.RTMGRP_LINK); socks.append(rt)
+            gen=netlink.Socket(netlink.NETLINK_GENERIC); socks.append(gen)
+            for g in ("config","mlme"):
+                if g in self.nl.groups: gen.join(self.nl.groups[g])
+        except OSError:
+            for s in socks: s.close()
+            with self._lock: self._thread=None  # no notifications: list() goes back to full dumps
+            return
+        try:
+            while not self._stop_event.is_set():
+                ready,_,_=select.select(socks, [], [], 0.5)
+                for s in ready:
+                    buf=s.recv()
+                    for typ,_,_,p in netlink.messages(buf):
+                        if s is rt and typ in (netlink.RTM_NEWLINK, netlink.RTM_DELLINK):
+                            ev,ifindex,name=netlink.parse_link(typ, p)
+                            if ev=="del" or self.cache is None or ifindex in self.cache or _sysfs(name or "") is not None:
+                                self._note(ev, ifindex, name)
+                        elif s is gen and typ==self.nl.family:
+                            i=netlink.parse_interface(p)
+                            if i["ifindex"] is None: continue
+                            ev="del" if i["cmd"]==netlink.NL80211_CMD_DEL_INTERFACE else "new" if i["cmd"]==netlink.NL80211_CMD_NEW_INTERFACE else "change"
+                            self._note(ev, i["ifindex"], i["iface"])
+        finally:
+            for s in socks: s.close()
+
+    def stop(self):
+        t=self._thread
+        if t is None: return
+        self._stop_event.set(); t.join(timeout=2.0)
+        with self._lock: self._thread=None
+
+    def close(self):
+        self.stop()
+        if self.nl: self.nl.close(); self.nl=None
+
+_default=None
+def discovery():
+    global _default
+    if _default is None: _default=Discovery()
+    return _default
+
+def list_wireless(refresh=False):
+    return [{k:e[k] for k in ("iface","phy","driver","is_usb","channel","bw")} for e in discovery().list(refresh)]
+
 def pick_default_sensors(limit=2, usb_only=False):
     wl=list_wireless()
     if usb_only: wl=[e for e in wl if e["is_usb"]]
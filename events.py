@@ -1,29 +1,170 @@
-import time, json, os
-try:
-    import requests
-except Exception:
-    requests = None
+import time, json, os, threading, queue
+from collections import deque
+requests = None  # imported on first webhook use, so event logging alone doesn't pay for it
+
+def _requests():
+    global requests
+    if requests is None:
+        try: import requests as r
+        except Exception: r = False
+        requests = r
+    return requests or None
+
+class WebhookSender(threading.Thread):
+    """Delivers events to a webhook over one keep-alive requests.Session.
+
+    Failed deliveries (connection errors, 429, 5xx) go to a bounded retry queue with
+    exponential backoff; with batch=True pending events are POSTed together as a JSON list.
+    Each undelivered event is counted once: in `failed` when delivery was given up on (a
+    non-retryable status, or retries exhausted), in `dropped` when it overflowed the queue or
+    was still pending at close()."""
+    def __init__(self, url, timeout=2.0, retries=5, backoff=0.5, max_backoff=30.0, capacity=1000, batch=False, batch_max=100):
+        super().__init__(daemon=True, name="webhook")
+        self.url=url; self.timeout=timeout; self.retries=retries; self.backoff=backoff; self.max_backoff=max_backoff
+        self.capacity=capacity; self.batch=batch; self.batch_max=batch_max
+        self.pending=deque()  # [evt, attempts, not_before]
+        self._cv=threading.Condition(); self._stop_event=threading.Event()
+        self.sent=0; self.failed=0; self.dropped=0; self.retried=0
+        rq=_requests(); self.session=rq.Session() if rq else None
+
+    def submit(self, evts):
+        with self._cv:
+            for e in evts:
+                if len(self.pending) >= self.capacity: self.pending.popleft(); self.dropped += 1
+                self.pending.append([e, 0, 0.0])
+            self._cv.notify()
+
+    def _due(self):
+        now=time.monotonic(); out=[]; limit=self.batch_max if self.batch else 1
+        for item in self.pending:
+            if item[2] <= now: out.append(item)
+            if len(out) >= limit: break
+        for item in out: self.pending.remove(item)
+        return out
+
+    def _post(self, items):
+        body=[i[0] for i in items] if self.batch else items[0][0]
+        try:
+            r=self.session.post(self.url, json=body, timeout=self.timeout)
+            if r.status_code < 400: return True, False
+            return False, (r.status_code == 429 or r.status_code >= 500)
+        except Exception:
+            return False, True
+
+    def run(self):
+        while True:
+            with self._cv:
+                items=self._due()
+                while not items and not self._stop_event.is_set():
+                    wait=min((i[2] for i in self.pending), default=None)
+                    self._cv.wait(None if wait is None else max(0.0, wait - time.monotonic()))
+                    items=self._due()
+                if not items and self._stop_event.is_set(): return
+            ok, retry = self._post(items)
+            if ok: self.sent += len(items); continue
+            with self._cv:
+                for item in items:
+                    item[1] += 1
+                    if not retry or item[1] > self.retries:
+                        self.failed += 1
+                        print("(webhook error) giving up on event after", item[1], "attempt(s)", flush=True)
+                    elif len(self.pending) >= self.capacity:
+                        self.dropped += 1
+                    else:
+                        self.retried += 1
+                        item[2] = time.monotonic() + min(self.max_backoff, self.backoff * 2 ** (item[1] - 1))
+                        self.pending.append(item)
+
+    def close(self, timeout=2.0):
+        # pending deliveries get until `timeout` to go out; retries still backing off are abandoned
+        deadline=time.monotonic()+timeout
+        while time.monotonic() < deadline:
+            with self._cv:
+                if not any(i[2] <= time.monotonic() for i in self.pending): break
+            time.sleep(0.01)
+        self._stop_event.set()
+        with self._cv: self._cv.notify()
+        self.join(max(0.0, deadline - time.monotonic()))
+        with self._cv: self.dropped += len(self.pending); self.pending.clear()
+        if self.session: self.session.close()
 
 class EventWriter:
-    def __init__(self, path="captures/events.jsonl", webhook=None):
+    """Event log + optional webhook. emit() only enqueues; a background thread batches
+       writes to `path` and applies the fsync policy: "never" (flush only), "batch" (after
+       every batch) or a number of seconds between fsyncs. Events that can't be serialized
+       or written (ENOSPC, ...) are counted in `errors`; the writer carries on."""
+    def __init__(self, path="captures/events.jsonl", webhook=None, fsync="batch", max_queue=10000,
+                 webhook_batch=False, webhook_retries=5, webhook_backoff=0.5, webhook_capacity=1000, echo=True):
         self.path = path
         self.webhook = webhook
+        self.fsync = fsync; self.echo = echo
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
         self.f = open(self.path, "a", encoding="utf-8")
+        self.q = queue.Queue(maxsize=max_queue)
+        self.written = 0; self.dropped = 0; self.errors = 0; self.last_error = None; self._last_sync = time.monotonic()
+        self.sender = None
+        if self.webhook and _requests():
+            self.sender = WebhookSender(self.webhook, retries=webhook_retries, backoff=webhook_backoff,
+                                        capacity=webhook_capacity, batch=webhook_batch)
+            self.sender.start()
+        self._writer = threading.Thread(target=self._run, daemon=True, name="events-writer"); self._writer.start()
 
     def emit(self, typ, **data):
         evt = {"t": time.time(), "type": typ}
         evt.update(data)
-        line = json.dumps(evt)
-        print("EVENT:", line, flush=True)
-        self.f.write(line + "\n")
-        self.f.flush()
-        if self.webhook and requests:
-            try:
-                requests.post(self.webhook, json=evt, timeout=2.0)
-            except Exception as e:
-                print("(webhook error)", e)
+        try: self.q.put_nowait(evt)
+        except queue.Full: self.dropped += 1
+
+    def _run(self):
+        while True:
+            evt = self.q.get()
+            batch = [evt]
+            while True:
+                try: batch.append(self.q.get_nowait())
+                except queue.Empty: break
+            done = None in batch  # a late emit() can land behind the close() sentinel
+            batch = [e for e in batch if e is not None]
+            if batch:
+                try: self._write(batch)
+                except Exception as e: self._error(e, len(batch))
+            if done: return
+
+    def _error(self, e, n):
+        self.errors += n; self.last_error = f"{type(e).__name__}: {e}"
+        print("(event log error)", self.last_error, flush=True)
+
+    def _write(self, batch):
+        lines = []; good = []
+        for e in batch:
+            try: lines.append(json.dumps(e)); good.append(e)
+            except (TypeError, ValueError) as err: self._error(err, 1)
+        if not lines: return
+        if self.echo:
+            for line in lines: print("EVENT:", line, flush=True)
+        try:
+            self.f.write("\n".join(lines) + "\n")
+            self.f.flush()
+            now = time.monotonic()
+            if self.fsync == "batch" or (isinstance(self.fsync, (int, float)) and now - self._last_sync >= self.fsync):
+                os.fsync(self.f.fileno()); self._last_sync = now
+            self.written += len(lines)
+        except OSError as err: self._error(err, len(lines))  # the webhook still gets them
+        if self.sender: self.sender.submit(good)
+
+    def stats(self):
+        s = {"written": self.written, "dropped": self.dropped, "errors": self.errors, "queued": self.q.qsize()}
+        if self.sender:
+            s.update(webhook_sent=self.sender.sent, webhook_failed=self.sender.failed,
+                     webhook_retried=self.sender.retried, webhook_dropped=self.sender.dropped,
+                     webhook_pending=len(self.sender.pending))
+        return s
 
     def close(self):
-        try: self.f.close()
+        try:
+            self.q.put(None, timeout=1.0); self._writer.join(timeout=2.0)
+        except Exception: pass
+        if self.sender: self.sender.close()
+        try:
+            if self.fsync not in (None, "never"): os.fsync(self.f.fileno())
+            self.f.close()
         except Exception: pass
@@ -1,47 +1,233 @@
+import math
+from collections import OrderedDict
 import numpy as np
-from collections import deque
+from robust import make_estimator
+
+FEATURE_KEYS = ("presence","motion","centroid","spread","p_lo","p_mid","p_hi","motion_hz","breath_power","breath_conf")
+RHYTHM_KEYS = FEATURE_KEYS[-3:]
+BREATH_CONF = 0.7  # breath_conf above which a periodic component is called breathing (interference stays below)
+
+class SlidingDFT:
+    """Periodic micro-motion (breathing) from per-band energy time series.
+
+    Frames are averaged into ticks of `tick` s by their own timestamps, so an uneven or
+    strided frame rate does not matter. Each finished tick updates a sliding DFT of the
+    last `window` s, per band, but only at `nbins` tracked bins (geometrically spaced
+    over fmin..fmax, so the breathing band is covered bin by bin):
+    X_k <- r*w_k*(X_k + x_new - r^N*x_old), with damping r keeping rounding error from
+    piling up. That is O(bands*nbins) per tick and O(bands) per frame whatever the window
+    length; the window only sets the tick history kept to subtract old values.
+
+    Outputs, per frame, as of the last finished tick: motion_hz, the strongest tracked
+    frequency; breath_power, the power in the breath band (lo..hi Hz); breath_conf, the
+    share of all tracked power in the strongest breath-band peak (with its neighbours),
+    scaled by how much of the window has been filled. A gap longer than `gap` s, or time
+    going backwards (TSF reset), starts the window over."""
+    def __init__(self, bands=4, window=32.0, tick=0.1, nbins=48, fmin=0.05, fmax=2.0, breath=(0.1, 0.5), r=0.99999, gap=5.0):
+        self.bands = int(bands); self.window = float(window); self.tick = float(tick); self.gap = float(gap)
+        self.N = N = max(4, int(round(window / tick)))
+        k = np.unique(np.clip(np.round(np.geomspace(fmin, min(fmax, 0.5 / tick), nbins) * N * tick), 1, N // 2)).astype(np.int64)
+        self.k = k; self.freqs = k / (N * self.tick)
+        self.w = r * np.exp(2j * np.pi * k / N); self.rN = r ** N
+        b = np.flatnonzero((self.freqs >= breath[0]) & (self.freqs <= breath[1]))
+        self.breath = slice(int(b[0]), int(b[-1]) + 1) if len(b) else slice(0, 0)
+        self.reset()
+
+    def reset(self):
+        self.X = np.zeros((self.bands, len(self.k)), dtype=np.complex128)
+        self.hist = np.zeros((self.N, self.bands)); self.n = 0; self.ref = None
+        self.cur = None; self.acc = np.zeros(self.bands); self.cnt = 0
+        self.out = np.zeros(3)  # motion_hz, breath_power, breath_conf
+
+    def _push(self, x):
+        # relative to the first tick's level: the window starts flat (no step to leak) and a
+        # steady level adds nothing, where the damping would otherwise leak it into every bin
+        if not self.n: self.ref = x.copy()
+        x = x - self.ref
+        i = self.n % self.N; old = self.hist[i].copy(); self.hist[i] = x; self.n += 1
+        self.X += (x - self.rN * old)[:, None]; self.X *= self.w
+
+    def _close(self, nxt):
+        # finish tick self.cur, hold its value over skipped ticks up to `nxt`, refresh the outputs
+        x = self.acc / self.cnt
+        for _ in range(min(nxt - self.cur, self.N)): self._push(x)
+        P = (self.X.real ** 2 + self.X.imag ** 2).sum(axis=0)
+        tot = P.sum()
+        if tot <= 1e-12 * self.N * self.N: self.out[:] = 0.0; return
+        br = P[self.breath]; self.out[0] = self.freqs[int(P.argmax())]
+        self.out[1] = br.sum() / (self.N * self.N)
+        if not len(br): self.out[2] = 0.0; return
+        j = self.breath.start + int(br.argmax())
+        self.out[2] = P[max(j - 1, 0):j + 2].sum() / tot * min(1.0, self.n / self.N)
+
+    def update(self, t, E):
+        """t: (N,) frame times in s; E: (N, bands) band energies. Returns an (N, 3) array
+           of motion_hz, breath_power, breath_conf."""
+        n = len(t); out = np.empty((n, 3))
+        if not n: return out
+        tk = np.floor(np.asarray(t, dtype=np.float64) / self.tick).astype(np.int64)
+        starts = np.r_[0, np.flatnonzero(tk[1:] != tk[:-1]) + 1]; ends = np.r_[starts[1:], n]
+        sums = np.add.reduceat(np.asarray(E, dtype=np.float64), starts, axis=0)
+        for s, e, k, sm in zip(starts.tolist(), ends.tolist(), tk[starts].tolist(), sums):
+            if self.cur is not None and k != self.cur:
+                if k < self.cur or (k - self.cur) * self.tick > self.gap: self.reset()
+                else: self._close(k)
+            if self.cur != k: self.cur = k; self.acc[:] = 0.0; self.cnt = 0
+            self.acc += sm; self.cnt += e - s
+            out[s:e] = self.out
+        return out
 
 class SpectralFeatures:
-    def __init__(self, target_bins=128, history=300):
-        self.target_bins = int(target_bins)
-        self.spec_hist = deque(maxlen=history)
-        self.energy_hist = deque(maxlen=history)
+    def __init__(self, target_bins=128, history=300, estimator="numpy", spec_history=300, rhythm=None):
+        """history: presence baseline window in frames; estimator: "numpy" (reference),
+           "exact" (order statistics, for long windows) or "p2" (approximate, constant memory);
+           rhythm: SlidingDFT keyword arguments (motion_hz / breath_* need frame times)."""
+        self.target_bins = int(target_bins); self.history = int(history); self.estimator = estimator
+        self.spec_history = int(spec_history)
+        # ring buffer: row (count-1) % spec_history is the newest
+        self.spec_hist = np.zeros((self.spec_history, self.target_bins), dtype=np.float64)
+        self.baseline = make_estimator(estimator, self.history)
+        self.count = 0
+        self.spectra = np.empty((0, self.target_bins))  # log spectra of the last block, (N, target_bins)
+        self._idx = np.arange(self.target_bins, dtype=np.float64)
+        self._interp = {}
+        self.rhythm = SlidingDFT(**(rhythm or {}))
 
     def _resample(self, v):
-        v = np.asarray(v, dtype=np.float32).ravel()
-        n = v.size
+        v = np.asarray(v, dtype=np.float32)
+        v = v.reshape(-1, v.shape[-1]) if v.ndim > 1 else v.reshape(1, -1)
+        n = v.shape[1]
         if n == self.target_bins:
-            return v
-        x_old = np.linspace(0.0, 1.0, n, dtype=np.float32)
-        x_new = np.linspace(0.0, 1.0, self.target_bins, dtype=np.float32)
-        return np.interp(x_new, x_old, v)
+            return v.astype(np.float64)
+        if n not in self._interp:
+            x_old = np.linspace(0.0, 1.0, n, dtype=np.float32).astype(np.float64)
+            x_new = np.linspace(0.0, 1.0, self.target_bins, dtype=np.float32).astype(np.float64)
+            j = np.clip(np.searchsorted(x_old, x_new, side="right") - 1, 0, n - 2)
+            self._interp[n] = (j, (x_new - x_old[j]) / (x_old[j+1] - x_old[j]))
+        j, f = self._interp[n]
+        lo = v[:, j].astype(np.float64); hi = v[:, j+1].astype(np.float64)
+        return lo + (hi - lo) * f
 
-    def update(self, v):
-        v = self._resample(v)
-        x = np.log1p(v)
+    def _push(self, x):
+        n = len(x); keep = min(n, self.spec_history)
+        self.spec_hist[(self.count + np.arange(n - keep, n)) % self.spec_history] = x[n-keep:]
+        self.count += n
 
-        if self.spec_hist:
-            m = float(np.mean(np.abs(x - self.spec_hist[-1])))
-        else:
-            m = 0.0
-        self.spec_hist.append(x)
-
-        E = float(np.mean(x))
-        self.energy_hist.append(E)
-        arr = np.array(self.energy_hist, dtype=np.float32)
-        base = np.percentile(arr, 20) if len(arr) > 20 else (float(np.mean(arr)) if len(arr) else E)
-        mad = float(np.median(np.abs(arr - np.median(arr)))) if len(arr) else 0.0
-        mad = 1e-6 if mad == 0.0 else mad
+    def update_batch(self, bins_matrix, t=None):
+        """Features for an (N, bins) block, identical to N successive update() calls.
+           t: (N,) frame times in s (the TSF), without which motion_hz / breath_* stay 0.
+           Returns a dict of length-N float64 arrays keyed by FEATURE_KEYS."""
+        x = np.log1p(self._resample(bins_matrix)); N = x.shape[0]
+        self.spectra = x
+        if N == 0: return {k: np.empty(0) for k in FEATURE_KEYS}
+        motion = np.empty(N)
+        motion[0] = float(np.mean(np.abs(x[0] - self.spec_hist[(self.count-1) % self.spec_history]))) if self.count else 0.0
+        if N > 1: motion[1:] = np.abs(np.diff(x, axis=0)).mean(axis=1)
+
+        E = x.mean(axis=1).astype(np.float64)
+        base, mad = self.baseline.update_batch(E)
         z = (E - base) / (1.4826 * mad)
-        presence = float(1.0 / (1.0 + np.exp(-z)))
-
-        idx = np.arange(self.target_bins, dtype=np.float32)
-        w = x + 1e-6
-        centroid = float((idx * w).sum() / w.sum())
-        spread = float(np.sqrt(((idx - centroid) ** 2 * w).sum() / w.sum()))
-        t = self.target_bins // 3
-        p_lo = float(w[:t].sum() / w.sum())
-        p_mid = float(w[t:2*t].sum() / w.sum())
-        p_hi = float(w[2*t:].sum() / w.sum())
-
-        return {"presence":presence,"motion":m,"centroid":centroid,"spread":spread,"p_lo":p_lo,"p_mid":p_mid,"p_hi":p_hi}
+        presence = 1.0 / (1.0 + np.exp(-z))
+        self._push(x)
+
+        w = x + 1e-6; ws = w.sum(axis=1)
+        centroid = (self._idx * w).sum(axis=1) / ws
+        spread = np.sqrt(((self._idx[None, :] - centroid[:, None]) ** 2 * w).sum(axis=1) / ws)
+        if t is None: rh = np.zeros((N, 3))
+        else:
+            nb = self.rhythm.bands; k = self.target_bins // nb
+            rh = self.rhythm.update(t, x[:, :k * nb].reshape(N, nb, k).mean(axis=2))
+        b = self.target_bins // 3
+        return {"presence":presence,"motion":motion,"centroid":centroid,"spread":spread,
+                "p_lo":w[:, :b].sum(axis=1)/ws,"p_mid":w[:, b:2*b].sum(axis=1)/ws,"p_hi":w[:, 2*b:].sum(axis=1)/ws,
+                "motion_hz":rh[:, 0],"breath_power":rh[:, 1],"breath_conf":rh[:, 2]}
+
+    def update(self, v, t=None):
+        m = self.update_batch(np.asarray(v).reshape(1, -1), None if t is None else np.atleast_1d(float(t)))
+        return {k: float(m[k][0]) for k in FEATURE_KEYS}
+
+    def state(self):
+        """Baseline snapshot (a copy): the estimator window and the newest spectrum."""
+        st = {"kind": "spectral", "target_bins": self.target_bins, "history": self.history, "estimator": self.estimator,
+              "count": self.count, "last": self.spec_hist[(self.count - 1) % self.spec_history].copy()}
+        st.update({"est_" + k: v for k, v in self.baseline.state().items()})
+        return st
+
+    def load_state(self, st):
+        """Restore a state() snapshot; ValueError if it was taken with other parameters."""
+        for k in ("kind", "target_bins", "history", "estimator"):
+            mine = "spectral" if k == "kind" else getattr(self, k)
+            if st.get(k) != mine: raise ValueError(f"snapshot {k} {st.get(k)!r}, expected {mine!r}")
+        self.baseline.load_state({k[4:]: v for k, v in st.items() if k.startswith("est_")})
+        self.count = int(st["count"])
+        if self.count: self.spec_hist[(self.count - 1) % self.spec_history] = st["last"]
+
+class RSSIFeatures:
+    """Presence from per-transmitter RSSI.
+
+    Every transmitter address gets a slot in a fixed-capacity table (least recently heard
+    evicted first) holding a fast EMA of its RSSI, a fast EMA of the squared innovation
+    ("disturbance") and a baseline of the disturbance that falls quickly and rises slowly,
+    so it settles on the link's quiet level. A link is stable once it has been heard
+    `warmup` times with a baseline spread under `stable_db`; only packets of stable links
+    produce samples, scored by how far the link's disturbance is above its own baseline.
+    Memory is fixed by `capacity`, whatever the number of transmitters."""
+    def __init__(self, capacity=512, alpha=0.12, slow=1e-4, down=0.01, warmup=50, stable_db=4.0):
+        cap = self.capacity = int(capacity)
+        self.alpha = alpha; self.slow = slow; self.down = down; self.warmup = int(warmup); self.stable_var = stable_db ** 2
+        self.mean = [0.0] * cap; self.dist = [0.0] * cap; self.base = [0.0] * cap; self.n = [0] * cap
+        self.slots = OrderedDict(); self.free = list(range(cap - 1, -1, -1)); self.evictions = 0
+
+    def __len__(self): return len(self.slots)
+
+    def update_batch(self, macs, dbm):
+        """Features for N packets (transmitter address, signal dBm) in arrival order.
+           Returns (indices of the packets that produced a sample, dict of FEATURE_KEYS arrays)."""
+        slots = self.slots; free = self.free; mean = self.mean; dist = self.dist; base = self.base; cnt = self.n
+        a = self.alpha; slow = self.slow; down = self.down; warm = self.warmup; stable = self.stable_var
+        idx = []; pres = []; mot = []
+        for i, (mac, x) in enumerate(zip(macs, dbm)):
+            s = slots.get(mac)
+            if s is not None: slots.move_to_end(mac)
+            else:
+                if free: s = free.pop()
+                else: s = slots.popitem(last=False)[1]; self.evictions += 1
+                slots[mac] = s; mean[s] = x; dist[s] = base[s] = 0.0; cnt[s] = 1
+                continue
+            k = cnt[s]; d = x - mean[s]; dd = d * d
+            mean[s] += a * d; dist[s] += a * (dd - dist[s])
+            if k < warm: base[s] += (dd - base[s]) / k
+            else: base[s] += (down if dist[s] < base[s] else slow) * (dist[s] - base[s])  # quiet floor: falls fast, rises slowly
+            cnt[s] = k + 1
+            if k < warm or base[s] > stable: continue
+            r = dist[s] / (base[s] + 0.25)
+            idx.append(i); mot.append(math.sqrt(max(0.0, dist[s] - base[s])))
+            pres.append(1.0 / (1.0 + math.exp(-3.0 * (math.log2(r + 1e-9) - 1.5))))
+        n = len(idx); z = np.zeros(n)
+        return np.array(idx, dtype=np.intp), {"presence": np.array(pres), "motion": np.array(mot), "centroid": z, "spread": z,
+                                              "p_lo": z, "p_mid": np.ones(n), "p_hi": z,
+                                              "motion_hz": z, "breath_power": z, "breath_conf": z}
+
+    def stable_links(self):
+        return sum(1 for s in self.slots.values() if self.n[s] > self.warmup and self.base[s] <= self.stable_var)
+
+    def state(self):
+        """Snapshot (a copy) of every tracked link, least recently heard first."""
+        macs = list(self.slots); s = list(self.slots.values())
+        mean = np.array(self.mean); dist = np.array(self.dist); base = np.array(self.base); n = np.array(self.n)
+        return {"kind": "rssi", "alpha": self.alpha, "slow": self.slow, "down": self.down, "warmup": self.warmup,
+                "macs": np.frombuffer(b"".join(macs), np.uint8).reshape(-1, 6),
+                "mean": mean[s], "dist": dist[s], "base": base[s], "n": n[s]}
+
+    def load_state(self, st):
+        """Restore a state() snapshot (the most recent `capacity` links if it holds more);
+           ValueError if it was taken with other model parameters."""
+        for k in ("kind", "alpha", "slow", "down", "warmup"):
+            mine = "rssi" if k == "kind" else getattr(self, k)
+            if st.get(k) != mine: raise ValueError(f"snapshot {k} {st.get(k)!r}, expected {mine!r}")
+        keep = slice(max(0, len(st["macs"]) - self.capacity), None)
+        self.slots = OrderedDict(); self.free = list(range(self.capacity - 1, -1, -1))
+        for mac, m, d, b, k in zip(st["macs"][keep], st["mean"][keep].tolist(), st["dist"][keep].tolist(),
+                                   st["base"][keep].tolist(), st["n"][keep].tolist()):
+            s = self.free.pop(); self.slots[bytes(mac)] = s
+            self.mean[s] = m; self.dist[s] = d; self.base[s] = b; self.n[s] = int(k)
@@ -0,0 +1,80 @@
+import numpy as np
+from features import RHYTHM_KEYS
+
+# Reader-side flow control. The per-sensor SampleRing is the bounded buffer; a FlowControl
+# decides what goes into it:
+#   "drop_oldest"  every sample is published; a lagging consumer loses the oldest rows
+#                  (counted as ring overruns on the consumer side)
+#   "decimate"     at most `rate` samples/s are published, evenly spaced within each block
+#   "aggregate"    every `n` samples become one summary sample (presence/motion max, other
+#                  columns mean, t, channel and the rhythm columns of the last one)
+# With adaptive=True the reader also watches how far the live consumer is behind (the ring's
+# acked cursor) and computes features on every k-th frame only, doubling k while the lag is
+# above `high` of the ring and halving it below `low`. Every sample carries a "frames" column
+# (frames it stands for), and every frame not turned into its own sample is counted.
+POLICIES = ("drop_oldest", "decimate", "aggregate")
+_MAX_COLS = ("presence", "motion")
+_LAST_COLS = ("t", "channel") + RHYTHM_KEYS  # rhythm outputs are already held per 0.1 s tick
+
+class FlowControl:
+    def __init__(self, policy="drop_oldest", rate=200.0, n=8, adaptive=True, high=0.5, low=0.1, max_stride=16):
+        if policy not in POLICIES: raise ValueError(f"unknown flow policy {policy!r}; choose from {POLICIES}")
+        self.policy = policy; self.rate = float(rate); self.n = int(n)
+        self.adaptive = adaptive; self.high = high; self.low = low; self.max_stride = int(max_stride)
+        self.stride = 1; self._phase = 0; self._tokens = None; self._last_t = None; self._carry = None; self._owed = 0.0
+        self.shed_frames = 0    # frames skipped by the feature stride
+        self.shed_samples = 0   # samples merged or dropped by decimate/aggregate
+
+    def update(self, ring):
+        """Adjust the feature stride from the consumer lag; True when it changed."""
+        if not self.adaptive: return False
+        frac = ring.lag / ring.capacity; old = self.stride
+        if frac > self.high: self.stride = min(self.max_stride, self.stride * 2)
+        elif frac < self.low: self.stride = max(1, self.stride // 2)
+        return self.stride != old
+
+    def select(self, n):
+        """Indices of the frames of an n-frame block to compute features on (phase carries over)."""
+        k = self.stride
+        if k == 1: return None
+        idx = np.arange(self._phase, n, k); self._phase = (self._phase - n) % k
+        self.shed_frames += n - len(idx)
+        return idx
+
+    def shape(self, cols):
+        """Apply the publish policy to a block of samples ({column: array}, with t and frames)."""
+        if self.policy == "decimate": return self._decimate(cols)
+        if self.policy == "aggregate": return self._aggregate(cols)
+        return cols
+
+    def _decimate(self, cols):
+        t = cols["t"]; n = len(t)
+        if not n: return cols
+        now = float(t[-1])
+        if self._tokens is None: self._tokens = self.rate * 0.1
+        else: self._tokens = min(self.rate, self._tokens + max(0.0, now - self._last_t) * self.rate)
+        self._last_t = now
+        keep = min(n, int(self._tokens)); self._tokens -= keep; self.shed_samples += n - keep
+        frames = np.asarray(cols["frames"], dtype=np.float64)
+        if not keep:  # nothing published: the frames are owed to the next sample that is
+            self._owed += float(frames.sum()); return {c: np.asarray(v)[:0] for c, v in cols.items()}
+        idx = np.round(np.linspace(0, n - 1, keep)).astype(np.intp)
+        out = {c: np.asarray(v)[idx] for c, v in cols.items()}
+        out["frames"] = np.add.reduceat(frames, np.r_[0, idx[:-1] + 1]); out["frames"][0] += self._owed; self._owed = 0.0
+        return out
+
+    def _aggregate(self, cols):
+        if self._carry is not None:
+            cols = {c: np.concatenate([self._carry[c], np.asarray(v)]) for c, v in cols.items()}
+        n = len(cols["t"]); g = n // self.n; m = g * self.n
+        self._carry = {c: np.asarray(v)[m:] for c, v in cols.items()} if m < n else None
+        if not g: return {c: np.asarray(v)[:0] for c, v in cols.items()}
+        self.shed_samples += m - g
+        out = {}
+        for c, v in cols.items():
+            v = np.asarray(v, dtype=np.float64)[:m].reshape(g, self.n)
+            out[c] = v[:, -1] if c in _LAST_COLS else v.sum(axis=1) if c == "frames" else v.max(axis=1) if c in _MAX_COLS else v.mean(axis=1)
+        return out
+
+    def stats(self):
+        return {"shed_frames": self.shed_frames, "shed_samples": self.shed_samples, "stride": self.stride}
@@ -1,4 +1,5 @@
 import time
+import numpy as np
 class ZoneFusion:
     def __init__(self, sensors, presence_on=0.7, presence_off=0.4, diff_thr=0.1, cooldown=0.75):
         self.labels = {s['name']: s.get('label', s['name']) for s in sensors}
@@ -20,3 +21,84 @@ class ZoneFusion:
             elif target!=self.zone and val>=self.presence_on and (now-self._last_change)>=self.cooldown:
                 self.zone=target; changed=True; self._last_change=now
         return self.zone, changed
+
+class FusionEngine:
+    """Zone fusion over all sensors on a common time grid.
+
+    push() buffers each sensor's (t, presence) samples; step() evaluates every grid tick
+    (multiples of `period`) up to `delay` seconds behind the newest sample, holding each
+    sensor's latest value (dropped to 0 after `max_age` s without samples). A zone's score
+    is the max over its sensors; per-zone hysteresis (presence_on/off, cooldown, which
+    `zones` can override per label) decides occupancy, and the reported zone is the
+    best-scoring occupied one, which only moves to another zone ahead by diff_thr.
+    A step evaluates at most `max_ticks` ticks: when the newest sample is further ahead
+    (a sensor on another clock, or a long stall) the grid skips to the last max_ticks due
+    ticks, counting the rest in `skipped`, instead of allocating one row per tick."""
+    def __init__(self, sensors, presence_on=0.7, presence_off=0.4, diff_thr=0.1, cooldown=0.75,
+                 period=0.1, delay=0.25, max_age=1.0, zones=None, max_ticks=600):
+        names = [s['name'] for s in sensors]; labels = [s.get('label', s['name']) for s in sensors]
+        self.zones = list(dict.fromkeys(labels)); zi = np.array([self.zones.index(l) for l in labels])
+        self.order = np.argsort(zi, kind="stable"); self.starts = np.flatnonzero(np.r_[True, np.diff(zi[self.order]) != 0])
+        self.index = {n: i for i, n in enumerate(names)}
+        over = zones or {}
+        self.on = np.array([over.get(z, {}).get("presence_on", presence_on) for z in self.zones], dtype=np.float64)
+        self.off = np.array([over.get(z, {}).get("presence_off", presence_off) for z in self.zones], dtype=np.float64)
+        self.cooldown = np.array([over.get(z, {}).get("cooldown", cooldown) for z in self.zones], dtype=np.float64)
+        self.diff_thr = diff_thr; self.period = float(period); self.delay = float(delay); self.max_age = float(max_age)
+        self.max_ticks = max(int(max_ticks), 1)
+        n = len(names); nz = len(self.zones)
+        self.last_t = np.full(n, -np.inf); self.last_p = np.zeros(n)
+        self.pending = [[] for _ in range(n)]
+        self.occupied = np.zeros(nz, dtype=bool); self.scores = np.zeros(nz); self._changed_at = np.full(nz, -np.inf)
+        self.best = None; self.newest = -np.inf; self.next_k = None; self.ticks = 0; self.skipped = 0
+
+    @property
+    def zone(self): return None if self.best is None else self.zones[self.best]
+
+    def push(self, name, t, presence):
+        t = np.asarray(t, dtype=np.float64)
+        if not len(t): return
+        self.pending[self.index[name]].append((t, np.asarray(presence, dtype=np.float64)))
+        self.newest = max(self.newest, float(t.max()))
+        if self.next_k is None: self.next_k = int(np.ceil(float(t.min()) / self.period))
+
+    def _grid(self, G):
+        # (ticks, sensors) held presence at each grid time
+        V = np.empty((len(G), len(self.pending)))
+        for i, blocks in enumerate(self.pending):
+            if blocks:
+                t = np.concatenate([b[0] for b in blocks]); p = np.concatenate([b[1] for b in blocks])
+                if np.any(t[1:] < t[:-1]): o = np.argsort(t, kind="stable"); t = t[o]; p = p[o]
+                if len(t) and t[0] < self.last_t[i]: late = t >= self.last_t[i]; t = t[late]; p = p[late]  # older than the held sample
+            else: t = p = np.empty(0)
+            k = np.searchsorted(t, G, side="right") - 1
+            ts = np.where(k >= 0, t[np.maximum(k, 0)] if len(t) else 0.0, self.last_t[i])
+            v = np.where(k >= 0, p[np.maximum(k, 0)] if len(p) else 0.0, self.last_p[i])
+            V[:, i] = np.where(G - ts > self.max_age, 0.0, v)
+            used = int(k[-1]) + 1
+            if used: self.last_t[i] = t[used-1]; self.last_p[i] = p[used-1]
+            self.pending[i] = [(t[used:], p[used:])] if used < len(t) else []
+        return V
+
+    def step(self):
+        """Evaluate all grid ticks that are due; returns [(t, zone)] for each change of zone."""
+        if self.next_k is None: return []
+        m = int(np.floor((self.newest - self.delay) / self.period)) - self.next_k + 1
+        if m <= 0: return []
+        if m > self.max_ticks: self.skipped += m - self.max_ticks; self.next_k += m - self.max_ticks; m = self.max_ticks
+        G = (self.next_k + np.arange(m)) * self.period; self.next_k += m
+        S = np.maximum.reduceat(self._grid(G)[:, self.order], self.starts, axis=1)
+        occ = self.occupied; changes = []
+        for g, s in zip(G.tolist(), S):
+            ready = g - self._changed_at >= self.cooldown
+            on = ~occ & (s >= self.on) & ready; off = occ & (s < self.off) & ready
+            occ[on] = True; occ[off] = False; self._changed_at[on | off] = g
+            best = self.best
+            if not occ.any(): best = None
+            else:
+                b = int(np.argmax(np.where(occ, s, -np.inf)))
+                if best is None or not occ[best] or s[b] >= s[best] + self.diff_thr: best = b
+            if best != self.best:
+                self.best = best; changes.append((g, self.zone))
+        self.scores = S[-1]; self.ticks += m
+        return changes
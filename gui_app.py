@@ -2,7 +2,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import time, queue, os, subprocess
-from collections import deque
+import numpy as np
 
 import matplotlib
 matplotlib.use('TkAgg')
@@ -10,12 +10,20 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 from multi import MultiManager
-from fusion import ZoneFusion
+from fusion import FusionEngine
 from events import EventWriter
-from discover import pick_default_sensors
+from archive import Archive, Archiver
+from plotting import Trace, BlitManager, Waterfall, ProfileView
+from metrics import StageMetrics, MetricsServer, quantile, thread_cpu
+from flow import POLICIES
+from features import BREATH_CONF
+from discover import pick_default_sensors, discovery
 from spectral_ctl import set_channel, disable_spectral
+from viewer import RemoteManager, DEFAULT_SOCKET
+from tlvprofile import report as profile_report, write_report
 
-MAX_POINTS = 1200
+MAX_POINTS = 1 << 20  # raw samples kept for plotting; older history survives as min/max buckets
+VIEW_SPANS = (60.0, 600.0, 3600.0)
 
 class LogWindow(tk.Toplevel):
     def __init__(self, master):
@@ -30,6 +38,34 @@ class LogWindow(tk.Toplevel):
         self._closed = True
         self.withdraw()
 
+class StatsWindow(LogWindow):
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("AR9271 — Pipeline stats"); self.geometry("900x420")
+        self._prev_cpu=None
+
+    def show(self, snap):
+        now=time.time(); cpu=snap.get("cpu",{}); lines=[]
+        hdr=f"{'sensor':<12}{'frames':>10}{'MB in':>9}{'samples':>10}{'partial':>9}{'malf':>6}{'lag':>7}"
+        stages=("read","parse","features","publish","tick","drain","draw")
+        lines.append(hdr+"".join(f"{s+' p50/p99 ms':>22}" for s in stages))
+        for name,m in snap.get("sensors",{}).items():
+            c=m.get("counters",{}); g=m.get("gauges",{}); st=m.get("stages",{})
+            row=(f"{name:<12}{c.get('frames_in',''):>10}{(c['bytes_in']/1e6 if 'bytes_in' in c else 0.0):>9.1f}"
+                 f"{c.get('samples_out',c.get('ring_rows','')):>10}{c.get('partial_tlvs',''):>9}{c.get('malformed_reads',''):>6}{g.get('ring_lag',''):>7}")
+            for s in stages:
+                if s in st and st[s][2]:
+                    row+=f"{1e3*quantile(st[s],0.5):>11.3g}/{1e3*quantile(st[s],0.99):<10.3g}"
+                else: row+=f"{'':>22}"
+            lines.append(row)
+        lines.append("")
+        lines.append("  ".join(f"{k}={v}" for k,v in sorted(snap.get("gauges",{}).items())))
+        if self._prev_cpu:
+            t0,prev=self._prev_cpu; dt=max(1e-6, now-t0)
+            lines.append("CPU %: "+"  ".join(f"{k}={100*(v-prev[k])/dt:.1f}" for k,v in sorted(cpu.items()) if k in prev))
+        self._prev_cpu=(now,cpu)
+        self.text.delete("1.0", tk.END); self.text.insert(tk.END, "\n".join(lines))
+
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -37,34 +73,46 @@ class App(tk.Tk):
         self.geometry("1360x900")
         self.running=False; self.manager=None; self.queue=None
         self.ev=None; self.fusion=None
-        self.safe_mode=tk.BooleanVar(value=True); self.usb_only=tk.BooleanVar(value=True)
+        self.safe_mode=tk.BooleanVar(value=True); self.usb_only=tk.BooleanVar(value=True); self.record_raw=tk.BooleanVar(value=False)
+        self.archive_samples=tk.BooleanVar(value=True); self.archiver=None; self.waterfall=None
+        self.profile_view=None; self.profiles={}; self.run_sensors=[]  # Test mode (spectral): stream profiles per sensor
         self.mode_var=tk.StringVar(value="Radar")      # Radar / Test / Network
         self.source_var=tk.StringVar(value="spectral") # spectral / rssi
+        self.flow_var=tk.StringVar(value="drop_oldest")  # reader publish policy under load
         self.network_iface=tk.StringVar(value="")
         self.after_id=None
         self.tick_ms=tk.IntVar(value=200)  # graph update rate (ms)
         self.last_draw=0.0; self.draw_every_s=0.25; self.last_ylim=0.0
-        self.log_win=None
+        self.view_span=tk.StringVar(value="60"); self.xview=None
+        self.log_win=None; self.stats_win=None; self.last_stats=0.0
+        self.instrument=tk.BooleanVar(value=False); self.metrics_srv=None
+        self.gui_metrics=StageMetrics(("tick","drain","draw"))
+        self.discovery=discovery().start()  # cached adapter list, kept current from netlink events
 
         self._build_ui()
         self.reset_series(); self.schedule_tick()
 
     def _build_ui(self):
         ctrl=ttk.Frame(self); ctrl.pack(side=tk.LEFT, fill=tk.Y, padx=8, pady=8)
-        ttk.Label(ctrl, text="Sensors (name:phy:iface:channel:bw)").pack(anchor='w')
+        ttk.Label(ctrl, text="Sensors (name:phy:iface:channel:bw[:estimator:window])").pack(anchor='w')
         self.sensors_text=tk.Text(ctrl, width=52, height=10); self.sensors_text.pack()
 
         r=ttk.Frame(ctrl); r.pack(fill=tk.X, pady=(4,6))
         ttk.Button(r, text="Scan USB", command=lambda:self.scan(usb_only=True)).pack(side=tk.LEFT, padx=2)
         ttk.Button(r, text="Scan All", command=lambda:self.scan(usb_only=False)).pack(side=tk.LEFT, padx=2)
         ttk.Checkbutton(r, text="USB only", variable=self.usb_only).pack(side=tk.LEFT, padx=6)
+        ttk.Checkbutton(r, text="Record raw", variable=self.record_raw).pack(side=tk.LEFT, padx=2)
+        ttk.Checkbutton(r, text="Archive", variable=self.archive_samples).pack(side=tk.LEFT, padx=2)
+        ttk.Checkbutton(r, text="Instrument (:9109)", variable=self.instrument).pack(side=tk.LEFT, padx=2)
 
         r2=ttk.Frame(ctrl); r2.pack(fill=tk.X, pady=(2,6))
         ttk.Checkbutton(r2, text="Safe mode (don’t change iface/channel)", variable=self.safe_mode).pack(side=tk.LEFT, padx=2)
         ttk.Label(r2, text="Mode:").pack(side=tk.LEFT, padx=(10,2))
-        ttk.Combobox(r2, textvariable=self.mode_var, values=["Radar","Test","Network"], width=10, state="readonly").pack(side=tk.LEFT)
+        ttk.Combobox(r2, textvariable=self.mode_var, values=["Radar","Test","Waterfall","Network"], width=10, state="readonly").pack(side=tk.LEFT)
         ttk.Label(r2, text="Source:").pack(side=tk.LEFT, padx=(10,2))
         ttk.Combobox(r2, textvariable=self.source_var, values=["spectral","rssi"], width=10, state="readonly").pack(side=tk.LEFT)
+        ttk.Label(r2, text="Flow:").pack(side=tk.LEFT, padx=(10,2))
+        ttk.Combobox(r2, textvariable=self.flow_var, values=list(POLICIES), width=11, state="readonly").pack(side=tk.LEFT)
 
         ch=ttk.Frame(ctrl); ch.pack(fill=tk.X, pady=(6,6))
         ttk.Label(ch, text="Set Channel:").pack(side=tk.LEFT)
@@ -78,6 +126,8 @@ class App(tk.Tk):
         s=tk.Scale(rate, from_=50, to=1000, orient=tk.HORIZONTAL, variable=self.tick_ms, command=self._on_rate_change, length=200)
         s.pack(side=tk.LEFT, padx=6)
         ttk.Label(rate, textvariable=self.tick_ms).pack(side=tk.LEFT)
+        ttk.Label(rate, text="View (s):").pack(side=tk.LEFT, padx=(10,2))
+        ttk.Combobox(rate, textvariable=self.view_span, values=[str(int(v)) for v in VIEW_SPANS], width=5, state="readonly").pack(side=tk.LEFT)
 
         net=ttk.Frame(ctrl); net.pack(fill=tk.X, pady=(6,6))
         ttk.Label(net, text="Network iface:").pack(side=tk.LEFT)
@@ -98,6 +148,10 @@ class App(tk.Tk):
         ttk.Button(btns, text="Stop", command=self.stop_run).grid(row=0,column=1, padx=4)
         ttk.Button(btns, text="Reset adapters", command=self.reset_adapters).grid(row=0,column=2, padx=4)
         ttk.Button(btns, text="Open Logs", command=self.open_logs).grid(row=0,column=3, padx=4)
+        ttk.Button(btns, text="Open Stats", command=self.open_stats).grid(row=1,column=3, padx=4, pady=2)
+        self.socket_var=tk.StringVar(value=DEFAULT_SOCKET)  # radard.py viewer socket
+        ttk.Entry(btns, textvariable=self.socket_var, width=22).grid(row=1,column=0, columnspan=2, padx=4, pady=2, sticky='we')
+        ttk.Button(btns, text="Attach", command=self.attach_run).grid(row=1,column=2, padx=4, pady=2)
 
         ttk.Label(ctrl, text="Recent").pack(anchor='w', pady=(6,0))
         self.events_text=tk.Text(ctrl, width=52, height=10); self.events_text.pack()
@@ -112,6 +166,7 @@ class App(tk.Tk):
         self.thr_p_off=self.ax.axhline(0.4, linestyle=":")
         self.thr_m=self.ax.axhline(0.15, linestyle="-.")
         self.canvas=FigureCanvasTkAgg(self.fig, master=plots); self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.blit=BlitManager(self.canvas, [self.line_a, self.line_b])
         self.status_label=ttk.Label(plots, text="IDLE", font=("TkDefaultFont", 24)); self.status_label.pack(pady=8, anchor='w')
 
     # ------- logging helpers -------
@@ -120,6 +175,24 @@ class App(tk.Tk):
             self.log_win.deiconify(); self.log_win.lift(); return
         self.log_win = LogWindow(self)
 
+    def open_stats(self):
+        if self.stats_win and self.stats_win.winfo_exists() and not self.stats_win._closed:
+            self.stats_win.deiconify(); self.stats_win.lift(); return
+        self.stats_win = StatsWindow(self)
+
+    def collect_metrics(self):
+        # called from the metrics HTTP thread too: reads state, never touches Tk
+        mgr=self.manager
+        snap=mgr.collect() if mgr else {"sensors":{}, "gauges":{}, "cpu":thread_cpu()}
+        if mgr:
+            for name,ring in list(mgr.rings.items()):
+                if ring.data is not None and name in snap["sensors"]:
+                    snap["sensors"][name].setdefault("gauges",{})["ring_lag"]=ring.head-self.cursors.get(name,0)
+        snap["sensors"]["gui"]=self.gui_metrics.snapshot()
+        ev=self.ev
+        if ev: snap["gauges"].update({f"events_{k}":v for k,v in ev.stats().items()})
+        return snap
+
     def _log(self, s):
         try:
             self.events_text.insert(tk.END, s + "\n"); self.events_text.see(tk.END)
@@ -153,7 +226,7 @@ class App(tk.Tk):
         self.after_id=self.after(self.tick_ms.get(), self._tick)
 
     def reset_series(self):
-        self.start_t=None; self.ts=deque(maxlen=MAX_POINTS); self.a=deque(maxlen=MAX_POINTS); self.b=deque(maxlen=MAX_POINTS)
+        self.start_t=None; self.cursors={}; self.spec_cursors={}; self.trace=Trace(2, capacity=MAX_POINTS, spans=VIEW_SPANS); self.xview=None
         self.last_draw=time.time(); self.last_ylim=time.time()
         self._net_prev=None
 
@@ -164,16 +237,18 @@ class App(tk.Tk):
         for s in sensors:
             ch=s.get("channel",6); bw=s.get("bw","HT20")
             self.sensors_text.insert(tk.END, f"{s['name']}:{s['phy']}:{s['iface']}:{ch}:{bw}\n")
-        self._log(f"Scanned {len(sensors)} adapters.")
+        self._log(f"Scanned {len(sensors)} adapters ({self.discovery.backend}).")
 
     def parse_sensors(self):
         sensors=[]
         for line in self.sensors_text.get("1.0", tk.END).strip().splitlines():
             if not line.strip(): continue
-            name,phy,iface,chan,bw=(line.split(":")+["","","","",""])[:5]
-            channel=int(chan) if chan else None
+            name,phy,iface,chan,bw,est,win=(line.split(":")+[""]*7)[:7]  # est/win: optional baseline engine and window
+            sweep=chan if ("," in chan or "/" in chan) else None  # "1,6/0.5,11": hop channels (dwell s)
+            channel=int(chan.split(",")[0].split("/")[0]) if chan else None
             sensors.append({"name":name,"phy":phy,"iface":iface,"channel":channel,"bw":(bw or "HT20"),
-                            "mode":"background","fft":"HT20","label":name})
+                            "mode":"background","fft":"HT20","label":name,"sweep":sweep,
+                            "estimator":(est or "numpy"),"window":int(win or 300)})
         return sensors
 
     # ------- NEW: apply_channel works -------
@@ -191,7 +266,7 @@ class App(tk.Tk):
         errs=0
         for s in self.parse_sensors():
             try:
-                set_channel(s["iface"], ch, bw)
+                set_channel(s["iface"], ch, bw); self.discovery.invalidate(s["iface"])
                 self._log(f"Set {s['iface']} -> channel {ch} {bw}")
             except Exception as e:
                 errs+=1
@@ -204,15 +279,33 @@ class App(tk.Tk):
         if self.running: return
         try:
             mode=self.mode_var.get(); source=self.source_var.get()
-            if mode in ("Radar","Test"):
+            if mode in ("Radar","Test","Waterfall"):
                 sensors=self.parse_sensors()
                 if not sensors:
                     messagebox.showerror("Error","No sensors configured"); return
+                if mode=="Waterfall" and source!="spectral":
+                    messagebox.showerror("Waterfall","Waterfall needs the spectral source."); return
                 test_mode=(mode=="Test")
-                self.manager=MultiManager(sensors, touch_iface=(not self.safe_mode.get()), test_mode=test_mode, source=source)
+                self.manager=MultiManager(sensors, touch_iface=(not self.safe_mode.get()), test_mode=test_mode, source=source,
+                                          capture_dir=("captures/raw" if self.record_raw.get() else None), spectra=(mode=="Waterfall"),
+                                          metrics=self.instrument.get(), flow={"policy": self.flow_var.get()},
+                                          baselines="captures/baselines")
+                if self.instrument.get() and self.metrics_srv is None:
+                    try:
+                        self.metrics_srv=MetricsServer(self.collect_metrics); self.metrics_srv.start()
+                        self._log(f"Metrics at http://127.0.0.1:{self.metrics_srv.port}/metrics")
+                    except OSError as e:
+                        self.metrics_srv=None; self._log(f"[metrics] endpoint not started: {e}")
                 self.queue=self.manager.start()
+                if mode=="Waterfall":
+                    self.ax.set_visible(False); self.waterfall=Waterfall(self.fig, [s["name"] for s in sensors])
+                if test_mode and source=="spectral":
+                    self.ax.set_visible(False); self.profile_view=ProfileView(self.fig, [s["name"] for s in sensors])
+                self.profiles={}; self.run_sensors=sensors
+                if mode=="Radar" and self.archive_samples.get():
+                    self.archiver=Archiver(Archive("captures/archive"), self.manager.rings); self.archiver.start()
                 self.ev=EventWriter("captures/events.jsonl", webhook=self.webhook_var.get() or None)
-                self.fusion=ZoneFusion(sensors, presence_on=self.pres_on.get(), presence_off=self.pres_off.get(), diff_thr=0.1, cooldown=self.cooldown.get())
+                self.fusion=FusionEngine(sensors, presence_on=self.pres_on.get(), presence_off=self.pres_off.get(), diff_thr=0.1, cooldown=self.cooldown.get())
                 self._log(f"Started (mode={mode}, source={source}, safe_mode={self.safe_mode.get()}).")
                 self.line_a.set_label("presence" if mode=="Radar" else ("fps" if source=="spectral" else "pps"))
                 self.line_b.set_label("motion" if mode=="Radar" else ("Mbps" if source=="spectral" else "—"))
@@ -228,26 +321,70 @@ class App(tk.Tk):
             self.thr_p_on.set_visible(self.mode_var.get()=="Radar")
             self.thr_p_off.set_visible(self.mode_var.get()=="Radar")
             self.thr_m.set_visible(self.mode_var.get()=="Radar")
-            self.ax.set_ylabel({"Radar":"Score","Test":("FPS" if self.source_var.get()=="spectral" else "Packets/s"),"Network":"Mbps"}[mode])
-            self.status_label.config(text="RUNNING", foreground="blue"); self.schedule_tick()
+            self.ax.set_ylabel({"Radar":"Score","Test":("FPS" if self.source_var.get()=="spectral" else "Packets/s"),"Waterfall":"","Network":"Mbps"}[mode])
+            self.status_label.config(text="RUNNING", foreground="blue"); self.canvas.draw_idle(); self.schedule_tick()
         except Exception as e:
             messagebox.showerror("Start failed", str(e))
 
+    def attach_run(self):
+        # viewer of a running radard.py: the daemon owns readers, fusion, events and the archive
+        if self.running: return
+        try:
+            self.manager=RemoteManager(self.socket_var.get()); self.queue=self.manager.start()
+        except (OSError, ValueError) as e:
+            self.manager=None; messagebox.showerror("Attach failed", f"{self.socket_var.get()}: {e}"); return
+        self.mode_var.set("Radar"); self.source_var.set(self.manager.hello.get("source", "spectral"))
+        self.ev=None; self.fusion=None
+        self._log(f"Attached to {self.socket_var.get()} ({', '.join(self.manager.rings)}).")
+        self.line_a.set_label("presence"); self.line_b.set_label("motion")
+        self.running=True; self.reset_series()
+        for ln in (self.thr_p_on, self.thr_p_off, self.thr_m): ln.set_visible(True)
+        self.ax.set_ylabel("Score")
+        self.status_label.config(text="ATTACHED", foreground="blue"); self.canvas.draw_idle(); self.schedule_tick()
+
     def stop_run(self):
+        try:
+            if self.archiver: self.archiver.stop()
+        except Exception as e:
+            self._log(f"[stop] archive: {e}")
+        self.archiver=None
         try:
             if self.manager:
                 self.manager.stop()
         except Exception as e:
             self._log(f"[stop] manager stop: {e}")
+        if self.profile_view: self._write_test_report()
         self.manager=None; self.queue=None; self.running=False
         try:
-            if self.ev: self.ev.close()
+            if self.ev:
+                self.ev.close(); self._log(f"[events] {self.ev.stats()}")
         except Exception: pass
         self.ev=None
+        if self.metrics_srv:
+            try: self.metrics_srv.stop()
+            except Exception: pass
+            self.metrics_srv=None
+        if self.waterfall:
+            self.waterfall.close(); self.waterfall=None; self.ax.set_visible(True); self.canvas.draw_idle()
+        if self.profile_view:
+            self.profile_view.close(); self.profile_view=None; self.ax.set_visible(True); self.canvas.draw_idle()
         self._log("Stopped.")
         self.status_label.config(text="IDLE", foreground="gray")
         self.schedule_tick()
 
+    def _write_test_report(self):
+        # the readers publish their final counts on close: pick those up before the queue goes
+        while self.queue is not None:
+            try: item=self.queue.get_nowait()
+            except queue.Empty: break
+            if item.get("type")=="alive" and "profile" in item: self.profiles[item["sensor"]]=item["profile"]
+        if not self.profiles: return
+        path=os.path.join("captures", "test_reports", time.strftime("test-%Y%m%d-%H%M%S.json"))
+        try:
+            write_report(path, profile_report(self.profiles, self.run_sensors, mode="Test", source="spectral"))
+            self._log(f"Test report: {path} ("+", ".join(f"{n}: {p['frames']} frames, {p['gaps']} gaps, {p['drop_pct']:.2f}% lost" for n,p in self.profiles.items())+")")
+        except OSError as e: self._log(f"[test report] {e}")
+
     def reset_adapters(self):
         self.stop_run()
         sensors=self.parse_sensors()
@@ -284,11 +421,63 @@ class App(tk.Tk):
         rx_mbps=8.0*(rx-rx0)/dt/1e6; tx_mbps=8.0*(tx-t0)/dt/1e6 if False else 8.0*(tx-tx0)/dt/1e6
         return max(0.0,rx_mbps), max(0.0,tx_mbps)
 
+    # ------- sample rings -------
+    def _drain_rings(self):
+        parts=[]
+        for name,ring in self.manager.rings.items():
+            cols,self.cursors[name],over=ring.read(self.cursors.get(name,0)); ring.ack(self.cursors[name])
+            if over: self._log(f"[{name}] display fell behind: {over} samples overwritten ({ring.overruns} total)")
+            if len(cols["t"]):
+                parts.append(cols)
+                if self.fusion: self.fusion.push(name, cols["t"], cols["presence"])
+        if self.fusion:
+            for _,zone in self.fusion.step():
+                if self.ev: self.ev.emit("zone_change", zone=zone)
+        if not parts: return
+        order=np.argsort(np.concatenate([p["t"] for p in parts]), kind="stable")
+        t=np.concatenate([p["t"] for p in parts])[order]
+        pres=np.concatenate([p["presence"] for p in parts])[order]; mot=np.concatenate([p["motion"] for p in parts])[order]
+        if self.start_t is None: self.start_t=float(t[0])
+        self.trace.extend(t-self.start_t, pres, mot)
+        # breathing: the sensor most confident about a periodic 0.1-0.5 Hz component right now
+        br=max(((p["breath_conf"][-1], p["motion_hz"][-1]) for p in parts if "breath_conf" in p), default=(0.0,0.0))
+        if pres[-1] >= self.pres_on.get():
+            self.status_label.config(text=f"PRESENCE (breathing {60*br[1]:.0f}/min)" if br[0] >= BREATH_CONF else "PRESENCE", foreground="green")
+        elif mot[-1] >= self.motion_thr.get(): self.status_label.config(text="MOTION", foreground="orange")
+        else:
+            self.status_label.config(text="RUNNING", foreground="blue")
+
+    def _drain_spectra(self):
+        for name,ring in self.manager.spectra.items():
+            block,self.spec_cursors[name],_=ring.read_block(self.spec_cursors.get(name,0))
+            if block.shape[1]: self.waterfall.push(name, block[1:].T)
+
+    # ------- plot -------
+    def _draw(self, now, mode):
+        # only the two lines are blitted; axis limits move in steps, and only then is the
+        # whole figure redrawn (which also refreshes the blit background)
+        span=float(self.view_span.get()); last=self.trace.last_t; layout=False
+        if self.xview is None or last > self.xview[1] or self.xview[1]-self.xview[0] > span or (self.xview[1]-self.xview[0] < span and self.xview[0] > 0.0):
+            right=last+0.1*span; self.xview=(max(0.0, right-span), right)
+            self.ax.set_xlim(*self.xview); layout=True
+        x,(ya,yb)=self.trace.view(*self.xview)
+        self.line_a.set_data(x, ya); self.line_b.set_data(x, yb)
+        if now - self.last_ylim >= 6*self.draw_every_s:
+            if mode=="Radar": ylim=(0.0, 1.2)
+            else:
+                top=max(5.0 if mode=="Test" else 10.0, float(ya.max(initial=0.0))*1.2, float(yb.max(initial=0.0))*1.2)
+                cur=self.ax.get_ylim()[1]
+                ylim=(0.0, top) if (top > cur or top < 0.5*cur) else None
+            if ylim and tuple(self.ax.get_ylim())!=ylim: self.ax.set_ylim(*ylim); layout=True
+            self.last_ylim=now
+        if layout: self.canvas.draw()
+        else: self.blit.update()
+
     # ------- main tick -------
     def _tick(self):
-        now=time.time(); mode=self.mode_var.get(); source=self.source_var.get()
+        now=time.time(); mode=self.mode_var.get(); source=self.source_var.get(); t0=time.perf_counter()
 
-        if self.running and self.queue is not None and mode in ("Radar","Test"):
+        if self.running and self.queue is not None and mode in ("Radar","Test","Waterfall"):
             processed=0
             while processed<800:
                 try: item=self.queue.get_nowait()
@@ -296,47 +485,56 @@ class App(tk.Tk):
                 processed+=1
                 typ=item.get("type"); t=item["t"]
                 if self.start_t is None: self.start_t=t
-                self.ts.append(t - self.start_t)
                 if typ=="error":
-                    self.a.append(0.0); self.b.append(0.0)
+                    self.trace.extend(t - self.start_t, 0.0, 0.0)
                     self._log(f"[{item['sensor']}] {item['msg']}")
+                elif typ=="shed":
+                    self._log(f"[{item['sensor']}] load shedding ({item['policy']}): features on every {item['stride']} frame(s); "
+                              f"{item['shed_frames']} frames skipped, {item['shed_samples']} samples merged/dropped so far")
+                elif typ=="sweep":
+                    self._log(f"[{item['sensor']}] sweeping {','.join(map(str,item['plan']))}: {item['retunes']} retunes, "
+                              f"last {item['retune_ms_last']:.1f} ms, mean {item['retune_ms_mean']:.1f} ms, {item['retune_errors']} failed")
+                elif typ=="zone_change":
+                    self._log(f"Zone: {item['zone']}")
+                elif typ=="baseline":
+                    self._log(f"[{item['sensor']}] ch {item['channel']}: "+(f"baseline restored ({item['age_s']:.0f} s old)" if item["restored"] else f"cold start ({item['reason']})"))
+                elif typ=="node":
+                    self._log(f"[{item['sensor']}] node {item['event']}")
+                elif typ=="nodes":
+                    self._log("Nodes: "+"; ".join(f"{k} lag {v['lag_ms']} ms, clock {v['offset_ms']:+} ms, {v['lost_frames']} lost"
+                                                 +("" if v["connected"] else " (down)") for k,v in item["nodes"].items()))
                 elif typ=="alive":
                     fps=float(item.get("fps",0.0)); mbps=8.0*float(item.get("bps",0.0))/1e6
-                    self.a.append(fps); self.b.append(mbps if source=="spectral" else 0.0)
-                else:
-                    pres=float(item["presence"]); mot=float(item["motion"]); self.a.append(pres); self.b.append(mot)
-                    if self.fusion:
-                        zone,changed=self.fusion.update({item["sensor"]:pres})
-                        if changed and self.ev: self.ev.emit("zone_change", zone=zone)
-                    if pres >= self.pres_on.get(): self.status_label.config(text="PRESENCE", foreground="green")
-                    elif mot >= self.motion_thr.get(): self.status_label.config(text="MOTION", foreground="orange")
-                    else:
-                        self.status_label.config(text="RUNNING", foreground="blue")
+                    self.trace.extend(t - self.start_t, fps, mbps if source=="spectral" else 0.0)
+                    if "profile" in item:
+                        self.profiles[item["sensor"]]=item["profile"]
+                        if self.profile_view: self.profile_view.push(item["sensor"], t, fps, item["profile"])
+            if self.manager: self._drain_rings()
+            if self.manager and self.waterfall: self._drain_spectra()
+            self.gui_metrics.observe("drain", time.perf_counter()-t0)
 
         elif self.running and mode=="Network":
             iface=self.network_iface.get()
             rx,tx=self._net_rates(iface)
             if rx is not None:
                 if self.start_t is None: self.start_t=now
-                self.ts.append(now - self.start_t); self.a.append(rx); self.b.append(tx)
-
-        if self.ts and (now - self.last_draw >= self.draw_every_s):
-            self.line_a.set_xdata(list(self.ts)); self.line_a.set_ydata(list(self.a))
-            self.line_b.set_xdata(list(self.ts)); self.line_b.set_ydata(list(self.b))
-            if now - self.last_ylim >= 6*self.draw_every_s:
-                if mode=="Radar":
-                    self.ax.set_ylim(0.0, 1.2)
-                elif mode=="Test":
-                    ymax=max(5.0, max(self.a or [0])*1.2, max(self.b or [0])*1.2)
-                    self.ax.set_ylim(0.0, ymax)
-                else:
-                    ymax=max(10.0, max(self.a or [0])*1.2, max(self.b or [0])*1.2)
-                    self.ax.set_ylim(0.0, ymax)
-                last=self.ts[-1]; self.ax.set_xlim(max(0.0, last-60.0), last)
-                self.last_ylim=now
-            self.ax.figure.canvas.draw_idle()
-            self.last_draw=now
-
+                self.trace.extend(now - self.start_t, rx, tx)
+
+        if now - self.last_draw >= self.draw_every_s:
+            t1=time.perf_counter()
+            if self.waterfall: self.waterfall.draw(); self.last_draw=now
+            elif self.profile_view: self.profile_view.draw(); self.last_draw=now
+            elif len(self.trace): self._draw(now, mode); self.last_draw=now
+            self.gui_metrics.observe("draw", time.perf_counter()-t1)
+
+        for ev,iface in self.discovery.changes():
+            self._log(f"Adapter {iface or '?'} {'removed' if ev=='del' else 'added' if ev=='new' else 'changed'}")
+
+        if self.stats_win and not self.stats_win._closed and now-self.last_stats>=1.0:
+            self.last_stats=now
+            try: self.stats_win.show(self.collect_metrics())
+            except Exception as e: self._log(f"[stats] {e}")
+        self.gui_metrics.observe("tick", time.perf_counter()-t0)
         self.schedule_tick()
 
 if __name__=="__main__":
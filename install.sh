@@ -13,3 +13,4 @@ pip install --upgrade pip
 pip install -r requirements.txt
 mount | grep -q "/sys/kernel/debug" || mount -t debugfs none /sys/kernel/debug || true
 echo "Run GUI:   sudo ${APP_DIR}/run_gui.sh"
+echo "Headless:  cp ${APP_DIR}/radar.example.yaml ${APP_DIR}/radar.yaml && sudo ${APP_DIR}/run_daemon.sh"
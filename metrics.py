@@ -0,0 +1,118 @@
+import os, threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Hot-path instrumentation. Readers time their stages into fixed-bucket Histograms (one
+# bisect + two adds per observation, once per read rather than per frame) and keep plain
+# counters; snapshot() turns them into picklable tuples so worker processes can ship them
+# over the side channel. render() formats a collected snapshot as Prometheus text.
+
+BUCKETS = (25e-6, 50e-6, 100e-6, 250e-6, 500e-6, 1e-3, 2.5e-3, 5e-3, 10e-3, 25e-3, 50e-3, 100e-3, 250e-3, 1.0)
+PREFIX = "ar9271"
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds; self.counts = [0] * (len(bounds) + 1); self.sum = 0.0; self.count = 0
+
+    def observe(self, v):
+        self.counts[bisect_left(self.bounds, v)] += 1; self.sum += v; self.count += 1
+
+    def snapshot(self): return (list(self.counts), self.sum, self.count)
+
+def quantile(snap, q):
+    """Upper bucket bound holding the q-quantile of a Histogram snapshot (None if empty)."""
+    counts, _, n = snap
+    if not n: return None
+    rank = q * n; acc = 0
+    for i, c in enumerate(counts):
+        acc += c
+        if acc >= rank: return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+    return float("inf")
+
+class StageMetrics:
+    """Per-reader stage histograms plus free-form counters."""
+    def __init__(self, stages):
+        self.stages = {s: Histogram() for s in stages}; self.counters = {}
+
+    def observe(self, stage, dt): self.stages[stage].observe(dt)
+
+    def count(self, key, n=1): self.counters[key] = self.counters.get(key, 0) + n
+
+    def snapshot(self, **counters):
+        c = dict(self.counters); c.update(counters)
+        return {"stages": {s: h.snapshot() for s, h in self.stages.items()}, "counters": c}
+
+_CLK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def proc_cpu(path):
+    """utime+stime in seconds from a /proc/<pid>[/task/<tid>]/stat file; None if unreadable."""
+    try:
+        with open(path) as f: rest = f.read().rsplit(")", 1)[1].split()
+        return (int(rest[11]) + int(rest[12])) / _CLK
+    except (OSError, IndexError, ValueError):
+        return None
+
+def thread_cpu():
+    """{thread name: CPU seconds} for every live thread of this process (Linux /proc)."""
+    out = {}
+    for th in threading.enumerate():
+        tid = getattr(th, "native_id", None)
+        if tid is None: continue
+        v = proc_cpu(f"/proc/self/task/{tid}/stat")
+        if v is not None: out[th.name] = v
+    return out
+
+def _labels(**kw):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in kw.items()) + "}"
+
+def render(snap):
+    """Prometheus text exposition of a collected snapshot: {"sensors": {name: {"stages": ...,
+       "counters": ..., "gauges": ...}}, "gauges": {name: v}, "cpu": {thread: seconds}}"""
+    out = []; sensors = snap.get("sensors", {})
+    name = f"{PREFIX}_stage_seconds"
+    out += [f"# HELP {name} Time spent per pipeline stage, per read.", f"# TYPE {name} histogram"]
+    for sensor, m in sensors.items():
+        for stage, (counts, total, n) in m.get("stages", {}).items():
+            acc = 0
+            for b, c in zip(BUCKETS + (float("inf"),), counts):
+                acc += c; le = "+Inf" if b == float("inf") else repr(b)
+                out.append(f"{name}_bucket{_labels(sensor=sensor, stage=stage, le=le)} {acc}")
+            out.append(f"{name}_sum{_labels(sensor=sensor, stage=stage)} {total!r}")
+            out.append(f"{name}_count{_labels(sensor=sensor, stage=stage)} {n}")
+    for kind, suffix, typ in (("counters", "_total", "counter"), ("gauges", "", "gauge")):
+        for k in sorted({k for m in sensors.values() for k in m.get(kind, {})}):
+            out += [f"# TYPE {PREFIX}_{k}{suffix} {typ}"]
+            out += [f"{PREFIX}_{k}{suffix}{_labels(sensor=s)} {m[kind][k]!r}" for s, m in sensors.items() if k in m.get(kind, {})]
+    for k, v in sorted(snap.get("gauges", {}).items()):
+        out += [f"# TYPE {PREFIX}_{k} gauge", f"{PREFIX}_{k} {v}"]
+    cpu = snap.get("cpu", {})
+    if cpu:
+        out += [f"# TYPE {PREFIX}_thread_cpu_seconds_total counter"]
+        out += [f"{PREFIX}_thread_cpu_seconds_total{_labels(thread=t)} {v!r}" for t, v in sorted(cpu.items())]
+    return "\n".join(out) + "\n"
+
+class MetricsServer(threading.Thread):
+    """Serves render(collect()) at http://host:port/metrics. Binds to localhost by default."""
+    def __init__(self, collect, host="127.0.0.1", port=9109):
+        super().__init__(daemon=True, name="metrics-http")
+        collect_fn = collect
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404); return
+                try: body = render(collect_fn()).encode()
+                except Exception as e:
+                    self.send_error(500, str(e)); return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body))); self.end_headers()
+                self.wfile.write(body)
+            def log_message(self, *_): pass
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+
+    def run(self): self.httpd.serve_forever(poll_interval=0.5)
+
+    def stop(self):
+        self.httpd.shutdown(); self.httpd.server_close()
@@ -1,23 +1,94 @@
-import time, threading, queue, numpy as np, subprocess, re, os, signal
-from spectral_ctl import set_channel, enable_spectral, disable_spectral, spectral_stream_path
-from spectral_parser import parse_frames, SPECTRAL_HT20_NUM_BINS, SPECTRAL_HT20_40_NUM_BINS
-from features import SpectralFeatures
+import time, threading, queue, numpy as np, os, signal, selectors, multiprocessing as mp
+from time import perf_counter
+from spectral_ctl import set_channel, enable_spectral, disable_spectral, spectral_stream_path, trigger_spectral
+from spectral_parser import decode_frames, SPECTRAL_HT20_NUM_BINS, SPECTRAL_HT20_40_NUM_BINS
+from features import SpectralFeatures, RSSIFeatures
+from spectral_io import TLVStream
+from tlvprofile import StreamProfiler
+from capture import CaptureWriter, ReplayStream
+from ring import SampleRing, SPECTRUM_COLUMNS
+from metrics import StageMetrics, thread_cpu, proc_cpu
+from flow import FlowControl
+from channel import Sweep, parse_plan, backend as channel_backend
+from netlink import freq_to_channel
+from radiotap import parse as parse_radiotap, PacketCapture, PcapReader
+import baseline
+
+# Readers split their pipeline into open() / poll() / close() so they can run either as
+# their own thread (run) or be driven by a shared IOLoop; poll() never blocks on debugfs.
+# Samples go to the reader's SampleRing; out_queue only carries "error"/"alive" messages.
+# In test mode a spectral reader only profiles the stream (tlvprofile.StreamProfiler: TLV
+# headers and TSFs, no decoding) and its "alive" messages carry the profile so far.
+# With a spectra ring, the log spectrum averaged over every spec_interval seconds is
+# published there too (one SPECTRUM_COLUMNS row per interval, for the waterfall view).
+# `flow` configures the reader's FlowControl (publish policy and adaptive feature stride);
+# shedding is reported on out_queue as "shed" messages.
+# `sweep` ("1,6/0.5,11": channels, optional per-channel dwell) makes a spectral reader hop
+# channels every `dwell` s (needs touch_iface, or a `channel_ctl` backend such as
+# channel.FakeChannel). Every sample carries the channel of the
+# frames it came from (taken from the frame's own frequency), features are kept per
+# channel, and retune latency is reported in "sweep" messages and the reader metrics.
+# `baselines` (a directory) gives live readers warm starts: each feature model's baseline
+# is restored from its snapshot when one matches (sensor, channel, bandwidth; see
+# baseline.py) and checkpointed every `baseline_every` s, by copying the state in poll()
+# and writing it on the store's own thread. Restores are reported as "baseline" messages.
+
+class SideQueue(queue.Queue):
+    """Bounded side channel: when full, put() drops the oldest message instead of blocking."""
+    def __init__(self, maxsize=1000):
+        super().__init__(maxsize); self.dropped=0
+    def put(self, item, block=True, timeout=None):
+        while True:
+            try: return super().put(item, block=False)
+            except queue.Full:
+                try: self.get_nowait(); self.dropped+=1
+                except queue.Empty: pass
 
 class SensorReader(threading.Thread):
-    def __init__(self, name, phy, iface, channel=None, bw='HT20', mode='background', fft='HT20', label=None, out_queue=None, touch_iface=False, test_mode=False, **_):
+    def __init__(self, name, phy, iface, channel=None, bw='HT20', mode='background', fft='HT20', label=None, out_queue=None, touch_iface=False, test_mode=False, stream=None, ring=None, capture=None, replay=None, speed=1.0, spectra=None, spec_interval=0.05, metrics=False, flow=None, sweep=None, dwell=0.25, channel_ctl=None, baselines=None, baseline_every=30.0, estimator='numpy', window=300, **_):
         super().__init__(daemon=True)
         self.name=name; self.phy=phy; self.iface=iface
         self.channel=channel; self.bw=bw; self.mode=mode; self.fft=fft
         self.label=label or name
         self.out_queue = out_queue or queue.Queue()
-        self._stop = threading.Event()
+        self.ring = ring if ring is not None else SampleRing()
+        self._stop_event = threading.Event()
         self.nbin = SPECTRAL_HT20_NUM_BINS if fft=='HT20' else SPECTRAL_HT20_40_NUM_BINS
-        self.feats = SpectralFeatures(target_bins=128, history=300)
+        self.estimator = estimator; self.window = int(window)  # presence baseline engine and window (frames), see robust.py
+        self.feats = self._new_features(); self._feats = {}  # per channel
         self.touch_iface = touch_iface; self.test_mode=test_mode
+        self.stream_path = stream  # read this file/FIFO instead of the adapter's debugfs stream
+        self.replay = replay; self.speed = speed  # or replay this capture prefix (speed 0 = as fast as possible)
+        self.capture_dir = capture  # record the raw stream to <capture>/<name>.tlv/.idx
+        self.spectra = spectra; self.spec_interval = spec_interval
+        self.sweep_spec = sweep; self.dwell = dwell; self.channel_ctl = channel_ctl; self.sweep = None; self._sweep_report = (0.0, 0)
+        self.metrics = StageMetrics(("read", "parse", "features", "publish") + (("retune",) if sweep else ())) if metrics else None
+        self.flow = FlowControl(**(flow or {})); self._shed_report = (0.0, None)
+        self.f = None; self.stream = None; self.capwriter = None; self.profiler = None
+        self.baselines = baselines; self.baseline_every = baseline_every; self._bstore = None; self._next_ckpt = 0.0
 
-    def run(self):
-        try:
-            if self.touch_iface and (self.channel is not None):
+    def open(self):
+        self._last_pub=time.time(); self._frames=0; self._bytes=0; self.profiler=StreamProfiler() if self.test_mode else None
+        self._spec_sum=np.zeros(len(SPECTRUM_COLUMNS)-1); self._spec_n=0; self._spec_t=0.0
+        if self.baselines and self.replay is None:  # a replay neither uses nor overwrites the live baselines
+            self._bstore = baseline.store(self.baselines); self._next_ckpt = time.monotonic() + self.baseline_every
+        if self.replay is not None:
+            try: self.stream = ReplayStream(self.replay, speed=self.speed)
+            except OSError as e:
+                self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"replay open failed: {e}"})
+                return None
+            return self.stream
+        if self.sweep_spec:
+            ctl = self.channel_ctl or (channel_backend() if self.touch_iface else None)
+            if ctl is None:
+                self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": "channel sweep needs interface control (Safe mode off); staying put"})
+            else:
+                try: self.sweep = Sweep(ctl, self.iface, parse_plan(self.sweep_spec, self.bw, self.dwell)); self.sweep.start()
+                except Exception as e:
+                    self.sweep = None
+                    self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"sweep setup failed: {e}"})
+        if self.stream_path is None:
+            if self.touch_iface and (self.channel is not None) and not self.sweep_spec:
                 try: set_channel(self.iface, self.channel, self.bw)
                 except Exception as e:
                     self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"set_channel failed: {e}"})
@@ -26,112 +97,447 @@ class SensorReader(threading.Thread):
                 path = spectral_stream_path(self.phy)
             except Exception as e:
                 self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"spectral enable/open failed: {e}"})
-                return
-            with open(path, 'rb', buffering=0) as f:
-                last_pub=time.time(); frames=0; bytes_read=0
-                while not self._stop.is_set():
-                    chunk = f.read(65536)
-                    if not chunk: time.sleep(0.01); continue
-                    bytes_read += len(chunk)
-                    if self.test_mode:
-                        tlvs=0
-                        for _ in parse_frames(chunk): tlvs+=1
-                        frames += tlvs
-                        now=time.time()
-                        if now-last_pub>=0.5:
-                            dt=now-last_pub
-                            self.out_queue.put({"t":now,"sensor":self.name,"type":"alive","fps":frames/dt,"bps":bytes_read/dt})
-                            last_pub=now; frames=0; bytes_read=0
-                    else:
-                        for samp in parse_frames(chunk):
-                            m = self.feats.update(samp['bins'].astype(np.float32))
-                            now=time.time()
-                            self.out_queue.put({'t':now,'sensor':self.name,'type':'sample','presence':m['presence'],'motion':m['motion'],
-                                                'centroid':m['centroid'],'spread':m['spread'],'p_lo':m['p_lo'],'p_mid':m['p_mid'],'p_hi':m['p_hi']})
-        finally:
+                return None
+        else: path = self.stream_path
+        try: self.f = os.fdopen(os.open(path, os.O_RDONLY | os.O_NONBLOCK), 'rb', buffering=0)
+        except OSError as e:
+            self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"stream open failed: {e}"})
+            return None
+        self.stream = TLVStream(self.f, chunk=65536)
+        if self.capture_dir:
+            try: self.capwriter = CaptureWriter(os.path.join(self.capture_dir, self.name))
+            except OSError as e:
+                self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"capture open failed: {e}"})
+        return self.f
+
+    def poll(self):
+        """Read and process whatever the stream has; False when nothing was read."""
+        stream=self.stream; b0=stream.bytes; f0=stream.frames
+        if self.sweep is not None: self._hop()
+        t0 = perf_counter(); chunk = stream.read()
+        if chunk is None: return False
+        t1 = perf_counter(); mt = self.metrics
+        if self.capwriter: self.capwriter.write(chunk)
+        self._bytes += stream.bytes-b0
+        if self.test_mode:
+            self.profiler.feed(chunk, getattr(stream, "runs", None))
+            self._frames += stream.frames-f0
+            now=time.time()
+            if now-self._last_pub>=0.5: self._publish_profile(now)
+            if mt: mt.observe("read", t1-t0)
+            return True
+        recs = decode_frames(chunk); t2 = perf_counter(); tf = tp = 0.0
+        flow = self.flow; changed = flow.update(self.ring)
+        for rec in recs.values():
+            if not len(rec): continue
+            idx = flow.select(len(rec))
+            if idx is not None: rec = rec[idx]
+            if not len(rec): continue
+            t = stream.t if self.replay is not None else time.time()
+            freq = rec["freq"]; cuts = np.flatnonzero(freq[1:] != freq[:-1]) + 1
+            for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(rec)]):  # one run per channel
+                a = perf_counter(); ch = freq_to_channel(int(freq[lo])) or 0
+                self.feats = feats = self._features(ch)
+                m = feats.update_batch(rec["bins"][lo:hi], rec["tsf"][lo:hi] * 1e-6); n = hi - lo
+                m["t"] = np.full(n, t); m["frames"] = np.full(n, float(flow.stride)); m["channel"] = np.full(n, float(ch))
+                b = perf_counter()
+                m = flow.shape(m)
+                self.ring.append(m)
+                if self.spectra is not None: self._publish_spectrum(feats.spectra, t)
+                tf += b-a; tp += perf_counter()-b
+                if mt: mt.count("samples_out", len(m["t"]))
+        report_shed(self, changed)
+        if self._bstore is not None and time.monotonic() >= self._next_ckpt: self._checkpoint()
+        if mt:
+            mt.observe("read", t1-t0); mt.observe("parse", t2-t1); mt.observe("features", tf); mt.observe("publish", tp)
+        return True
+
+    def _features(self, ch):
+        # the first channel seen keeps the reader's initial SpectralFeatures
+        f = self._feats.get(ch)
+        if f is None:
+            f = self._feats[ch] = self.feats if not self._feats else self._new_features()
+            if self._bstore is not None: restore_baseline(self, f, self._bkey(ch), ch)
+        return f
+
+    def _new_features(self):
+        return SpectralFeatures(target_bins=128, history=self.window, estimator=self.estimator)
+
+    def _bkey(self, ch):
+        return baseline.key("spectral", f"{self.phy}.{self.iface}" if self.phy or self.iface else self.name, ch, self.bw)
+
+    def _checkpoint(self):
+        for ch, f in self._feats.items():
+            if f.count: self._bstore.save(self._bkey(ch), f.state())
+        self._next_ckpt = time.monotonic() + self.baseline_every
+
+    def _hop(self):
+        sw = self.sweep; errors = sw.errors
+        if sw.step():
+            if self.metrics: self.metrics.observe("retune", sw.last_latency)
+            if self.stream_path is None and self.replay is None:
+                try: trigger_spectral(self.phy)  # re-arm the scan on the new channel
+                except Exception: pass
+        if sw.errors != errors:
+            self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"retune failed: {sw.last_error}"})
+        now = time.time(); last, n = self._sweep_report
+        if now - last >= 5.0 and sw.retunes != n:
+            self._sweep_report = (now, sw.retunes)
+            self.out_queue.put({"t": now, "sensor": self.name, "type": "sweep", "plan": [p[0] for p in sw.plan], **sw.stats()})
+
+    def metrics_snapshot(self):
+        s = self.stream.stats() if self.stream else {}
+        extra = {"retunes": self.sweep.retunes, "retune_errors": self.sweep.errors} if self.sweep else {}
+        snap = self.metrics.snapshot(frames_in=s.get("frames", 0), bytes_in=s.get("bytes", 0),
+                                     partial_tlvs=s.get("carries", 0), malformed_reads=s.get("malformed", 0),
+                                     shed_frames=self.flow.shed_frames, shed_samples=self.flow.shed_samples, **extra)
+        snap["gauges"] = {"feature_stride": self.flow.stride}
+        if self.sweep: snap["gauges"]["channel"] = self.sweep.channel
+        return snap
+
+    def _publish_spectrum(self, x, t):
+        self._spec_sum += x.sum(axis=0); self._spec_n += len(x)
+        if t - self._spec_t < self.spec_interval: return
+        row = dict(zip(SPECTRUM_COLUMNS[1:], (self._spec_sum / self._spec_n)[:, None])); row["t"] = [t]
+        self.spectra.append(row)
+        self._spec_sum[:] = 0.0; self._spec_n = 0; self._spec_t = t
+
+    def _publish_profile(self, now):
+        dt=max(now-self._last_pub, 1e-6)
+        self.out_queue.put({"t":now,"sensor":self.name,"type":"alive","fps":self._frames/dt,"bps":self._bytes/dt,
+                            "carries":self.stream.carries,"profile":self.profiler.snapshot(self.stream)})
+        self._last_pub=now; self._frames=0; self._bytes=0
+
+    def at_eof(self): return self.stream is not None and self.stream.eof
+
+    def close(self):
+        if self.profiler is not None and self.stream is not None: self._publish_profile(time.time())  # final counts for the report
+        if self._bstore is not None:
+            self._checkpoint(); self._bstore.flush()
+        try:
+            if self.f: self.f.close()
+        except Exception: pass
+        self.f = None
+        if self.capwriter: self.capwriter.close(); self.capwriter = None
+        if self.replay is not None:
+            if self.stream: self.stream.close()
+            return
+        if self.stream_path is None:
             try: disable_spectral(self.phy)
             except Exception: pass
 
-    def stop(self): self._stop.set()
+    def run(self):
+        try:
+            if self.open() is None: return
+            while not self._stop_event.is_set():
+                if not self.poll(): time.sleep(0.01)
+        except Exception as e:
+            self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"reader stopped: {type(e).__name__}: {e}"})
+        finally:
+            self.close()
+
+    def stop(self): self._stop_event.set()
 
 class RSSIReader(threading.Thread):
-    SIG_RE = re.compile(r'signal\s*(-?\d+)\s*dBm', re.IGNORECASE)
-    def __init__(self, name, iface, channel=6, bw='HT20', out_queue=None, touch_iface=False):
+    """RSSI presence from monitor-mode traffic: radiotap headers straight off an AF_PACKET
+       socket on `iface` (or from a recorded radiotap `pcap`), scored per transmitter by
+       RSSIFeatures (at most `transmitters` tracked); ACK/CTS frames, which carry no
+       transmitter address, are skipped."""
+    def __init__(self, name, iface, channel=6, bw='HT20', out_queue=None, touch_iface=False, ring=None, metrics=False, flow=None, pcap=None, transmitters=512, baselines=None, baseline_every=30.0):
         super().__init__(daemon=True)
-        self.name=name; self.iface=iface; self.channel=channel; self.bw=bw
+        self.name=name; self.iface=iface; self.channel=channel; self.bw=bw; self.pcap=pcap
         self.out_queue=out_queue or queue.Queue()
+        self.ring = ring if ring is not None else SampleRing()
         self.touch_iface=touch_iface
-        self._stop=threading.Event()
-        self.proc=None
+        self._stop_event=threading.Event()
+        self.src=None; self._eof=False; self.transmitters=transmitters
+        self.metrics = StageMetrics(("read", "parse", "features")) if metrics else None
+        self.flow = FlowControl(**dict(flow or {}, adaptive=False)); self._shed_report = (0.0, None)
+        self.baselines = baselines; self.baseline_every = baseline_every; self._bstore = None; self._next_ckpt = 0.0
+
+    def open(self):
+        if self.touch_iface and (self.channel is not None) and self.pcap is None:
+            try: set_channel(self.iface, self.channel, self.bw)
+            except Exception as e:
+                self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"rssi monitor/channel failed: {e}"})
+                return None
+        try: self.src = PcapReader(self.pcap) if self.pcap is not None else PacketCapture(self.iface)
+        except (OSError, ValueError) as e:
+            self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"rssi capture open failed: {e}"})
+            return None
+        self.feats=RSSIFeatures(capacity=self.transmitters); self.last_pub=time.time(); self.pcount=0; self.skipped=0; self.drops=0
+        if self.baselines and self.pcap is None:  # a recording neither uses nor overwrites the live baselines
+            self._bstore=baseline.store(self.baselines); self._next_ckpt=time.monotonic()+self.baseline_every
+            self._bkey=baseline.key("rssi", self.iface, self.channel, self.bw)
+            restore_baseline(self, self.feats, self._bkey, self.channel)
+        return self.src
+
+    def poll(self):
+        """Parse every packet the source has buffered; False when nothing was read."""
+        t0=perf_counter(); pkts=self.src.read(); t1=perf_counter()
+        self._eof = self.src.eof
+        if not pkts: return False
+        ts=[]; txs=[]; dbm=[]; nbytes=0
+        for t,pkt in pkts:
+            nbytes+=len(pkt); r=parse_radiotap(pkt)
+            if r is None or r[0] is None or r[4] is None: self.skipped+=1; continue
+            ts.append(t); txs.append(r[4]); dbm.append(float(r[0]))
+        t2=perf_counter(); keep,m=self.feats.update_batch(txs, dbm)
+        self.pcount+=len(ts); now=time.time()
+        if now-self.last_pub>=0.5:
+            dt=now-self.last_pub; self.out_queue.put({'t':now,'sensor':self.name,'type':'alive','fps':self.pcount/dt,'bps':0.0}); self.pcount=0; self.last_pub=now
+            if self.pcap is None: self.drops+=self.src.stats()[1]
+        n=len(keep)
+        if n:
+            m["t"]=np.array(ts)[keep]; m["frames"]=np.ones(n); m["channel"]=np.full(n, float(self.channel or 0))
+            self.ring.append(self.flow.shape(m))
+            report_shed(self, False)
+        if self._bstore is not None and time.monotonic()>=self._next_ckpt: self._checkpoint()
+        if self.metrics:
+            mt=self.metrics; mt.observe("read", t1-t0); mt.observe("parse", t2-t1); mt.observe("features", perf_counter()-t2)
+            mt.count("packets_in", len(pkts)); mt.count("bytes_in", nbytes); mt.count("samples_out", n)
+        return True
+
+    def metrics_snapshot(self):
+        snap=self.metrics.snapshot(shed_samples=self.flow.shed_samples, packets_skipped=self.skipped, kernel_drops=self.drops,
+                                   transmitter_evictions=self.feats.evictions)
+        snap["gauges"]={"transmitters": len(self.feats), "stable_links": self.feats.stable_links()}
+        return snap
+
+    def at_eof(self): return self._eof
+
+    def _checkpoint(self):
+        if len(self.feats): self._bstore.save(self._bkey, self.feats.state())
+        self._next_ckpt=time.monotonic()+self.baseline_every
+
+    def close(self):
+        if self._bstore is not None and self.src is not None:
+            self._checkpoint(); self._bstore.flush()
+        try:
+            if self.src: self.src.close()
+        except Exception: pass
+        self.src=None
 
     def run(self):
         try:
-            if self.touch_iface and (self.channel is not None):
-                try:
-                    subprocess.check_call(["ip","link","set",self.iface,"down"])
-                    subprocess.check_call(["iw","dev",self.iface,"set","type","monitor"])
-                    subprocess.check_call(["ip","link","set",self.iface,"up"])
-                    subprocess.check_call(["iw","dev",self.iface,"set","channel",str(self.channel),self.bw])
+            if self.open() is None: return
+            while not self._stop_event.is_set():
+                if not self.poll(): time.sleep(0.01)
+        except Exception as e:
+            self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"reader stopped: {type(e).__name__}: {e}"})
+        finally:
+            self.close()
+
+    def stop(self): self._stop_event.set()
+
+def restore_baseline(r, feats, key, channel):
+    """Load the snapshot under `key` into `feats` and tell the consumer how that went."""
+    st, why = r._bstore.load(key)
+    if st is not None:
+        try: feats.load_state(st)
+        except (ValueError, KeyError) as e: st, why = None, f"snapshot does not fit: {e}"
+    if st is None:
+        if why != "no snapshot": r.out_queue.put({"t": time.time(), "sensor": r.name, "type": "baseline", "channel": channel, "restored": False, "reason": why})
+        return False
+    r.out_queue.put({"t": time.time(), "sensor": r.name, "type": "baseline", "channel": channel, "restored": True,
+                     "age_s": round(time.time() - float(st["saved"]), 1)})
+    return True
+
+def report_shed(r, changed, every=5.0):
+    """Tell the consumer when a reader starts/stops shedding, and every `every` s while it does."""
+    flow=r.flow; now=time.time(); last,counts=r._shed_report
+    cur=(flow.shed_frames, flow.shed_samples)
+    if not changed and (cur==counts or now-last<every): return
+    if counts is None and cur==(0, 0) and not changed: return
+    r._shed_report=(now, cur)
+    r.out_queue.put({"t": now, "sensor": r.name, "type": "shed", "policy": flow.policy, **flow.stats()})
+
+class IOLoop(threading.Thread):
+    """Single thread multiplexing every reader's stream through selectors (epoll on Linux).
+       Readers are dispatched as soon as their fd turns readable; files the selector can't
+       watch (regular files) or that hit EOF fall back to polling every `idle_poll` seconds.
+       A reader whose poll() raises is reported on its out_queue and dropped; the others go on."""
+    def __init__(self, readers, idle_poll=0.01):
+        super().__init__(daemon=True, name="ioloop")
+        self.readers=list(readers); self.idle_poll=idle_poll
+        self._stop_event=threading.Event(); self._wake_r, self._wake_w = os.pipe()
+
+    def run(self):
+        sel=selectors.DefaultSelector(); polled=[]; live=[]; files={}
+        sel.register(self._wake_r, selectors.EVENT_READ, None)
+        try:
+            for r in self.readers:
+                if self._stop_event.is_set(): break
+                try: f=r.open()
                 except Exception as e:
-                    self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": f"rssi monitor/channel failed: {e}"})
-                    return
-            cmd=["tcpdump","-I","-i",self.iface,"-l","-e","-s","256","type","mgt","subtype","beacon","or","type","data"]
-            try:
-                self.proc=subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1, universal_newlines=True)
-            except FileNotFoundError:
-                self.out_queue.put({"t": time.time(), "sensor": self.name, "type":"error", "msg": "tcpdump not found; sudo apt install tcpdump"})
-                return
-            ema=None; alpha=0.12; last_pub=time.time(); pcount=0
-            while not self._stop.is_set():
-                line=self.proc.stdout.readline()
-                if not line:
-                    time.sleep(0.01); continue
-                m=self.SIG_RE.search(line)
-                if not m: continue
-                try: dbm=float(m.group(1))
-                except Exception: continue
-                pcount+=1
-                if ema is None: ema=dbm
-                else: ema=alpha*dbm+(1-alpha)*ema
-                motion=abs(dbm-ema)
-                presence=1.0/(1.0 + pow(2.71828, -((motion-1.0)/2.0)))
-                now=time.time()
-                self.out_queue.put({'t':now,'sensor':self.name,'type':'sample','presence':presence,'motion':motion,
-                                    'centroid':0.0,'spread':0.0,'p_lo':0.0,'p_mid':1.0,'p_hi':0.0})
-                if now-last_pub>=0.5:
-                    dt=now-last_pub; self.out_queue.put({'t':now,'sensor':self.name,'type':'alive','fps':pcount/dt,'bps':0.0}); pcount=0; last_pub=now
+                    r.out_queue.put({"t": time.time(), "sensor": r.name, "type":"error", "msg": f"open failed: {e}"}); f=None
+                if f is None: r.close(); continue
+                live.append(r); files[r]=f
+                try: sel.register(f, selectors.EVENT_READ, r)
+                except (PermissionError, ValueError, OSError): polled.append(r)
+            while not self._stop_event.is_set() and live:
+                for key,_ in sel.select(self.idle_poll if polled else None):
+                    r=key.data
+                    if r is None: continue
+                    if r._stop_event.is_set(): self._drop(sel, r, live, polled, files); continue
+                    got=self._poll(sel, r, live, polled, files)
+                    if got is False and r.at_eof():
+                        sel.unregister(key.fileobj); polled.append(r)
+                for r in list(polled):
+                    if r._stop_event.is_set(): self._drop(sel, r, live, polled, files)
+                    else: self._poll(sel, r, live, polled, files)
         finally:
-            try:
-                if self.proc and self.proc.poll() is None:
-                    self.proc.terminate()
-                    try: self.proc.wait(timeout=0.5)
-                    except Exception: self.proc.kill()
-            except Exception: pass
+            for r in live: r.close()
+            sel.close(); os.close(self._wake_r); os.close(self._wake_w)
+
+    def _poll(self, sel, r, live, polled, files):
+        # poll() result, or None when the reader failed and was dropped
+        try: return r.poll()
+        except Exception as e:
+            r.out_queue.put({"t": time.time(), "sensor": r.name, "type":"error", "msg": f"reader stopped: {type(e).__name__}: {e}"})
+            self._drop(sel, r, live, polled, files)
+            return None
+
+    @staticmethod
+    def _drop(sel, r, live, polled, files):
+        if r in polled: polled.remove(r)
+        else: sel.unregister(files[r])
+        live.remove(r)
+        try: r.close()
+        except Exception as e:
+            r.out_queue.put({"t": time.time(), "sensor": r.name, "type":"error", "msg": f"close failed: {e}"})
 
     def stop(self):
-        self._stop.set()
-        try:
-            if self.proc: self.proc.terminate()
-        except Exception: pass
+        self._stop_event.set()
+        try: os.write(self._wake_w, b'x')
+        except OSError: pass
+
+class _BatchOut:
+    """Worker-side out_queue: collects messages so each poll crosses the pipe as one list."""
+    def __init__(self): self.items=[]
+    def put(self, item): self.items.append(item)
+
+def _exit_on_signal(*_): raise SystemExit(0)
+
+def _sensor_worker(kind, kwargs, ring_spec, out, stop, spec_spec=None):
+    # a SIGTERM from SensorProcess.join's last resort must still unwind through close()
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring=SampleRing.attach(*ring_spec); spectra=SampleRing.attach(*spec_spec, columns=SPECTRUM_COLUMNS) if spec_spec else None
+    if spectra is not None: kwargs=dict(kwargs, spectra=spectra)
+    buf=_BatchOut(); r=(SensorReader if kind=="spectral" else RSSIReader)(out_queue=buf, ring=ring, **kwargs)
+    sel=selectors.DefaultSelector(); polled=False
+    try:
+        try: f=r.open()
+        except Exception as e:
+            buf.put({"t": time.time(), "sensor": r.name, "type":"error", "msg": f"open failed: {e}"}); f=None
+        if f is None: return
+        try: sel.register(f, selectors.EVENT_READ)
+        except (PermissionError, ValueError, OSError): polled=True
+        last_metrics=time.time()
+        while not stop.is_set():
+            got = r.poll() if (polled or sel.select(0.05)) else False
+            if r.metrics and time.time()-last_metrics>=1.0:
+                last_metrics=time.time(); buf.put({"t": last_metrics, "sensor": r.name, "type":"metrics", "data": r.metrics_snapshot()})
+            if buf.items: out.put(buf.items); buf.items=[]
+            if not got and (polled or r.at_eof()): polled=True; time.sleep(0.01)
+    finally:
+        r.close(); sel.close(); ring.close()
+        if spectra is not None: spectra.close()
+        if buf.items: out.put(buf.items)
+
+class SensorProcess:
+    """Runs one reader pipeline (read, parse, features) in its own process. Samples land
+       directly in the sensor's shared-memory SampleRing; side-channel message batches come
+       back over a shared multiprocessing queue and are unpacked by MultiManager."""
+    _ctx = mp.get_context("spawn")
+    def __init__(self, kind, kwargs, ring, out, spectra=None):
+        self.name=kwargs["name"]; self._stop_event=self._ctx.Event()
+        spec=(spectra.name, spectra.capacity) if spectra is not None else None
+        self.proc=self._ctx.Process(target=_sensor_worker, args=(kind, kwargs, (ring.name, ring.capacity), out, self._stop_event, spec), daemon=True)
+    def start(self): self.proc.start()
+    def stop(self): self._stop_event.set()
+    def join(self, timeout=None):
+        self.proc.join(timeout)
+        if self.proc.is_alive():
+            self.proc.terminate(); self.proc.join(1.0)
 
 class MultiManager:
-    def __init__(self, sensors, touch_iface=False, test_mode=False, source="spectral"):
-        self.sensors_cfg=sensors; self.queue=queue.Queue(); self.threads=[]
+    def __init__(self, sensors, touch_iface=False, test_mode=False, source="spectral", io="select", ring_capacity=1 << 16, capture_dir=None, spectra=False, metrics=False, flow=None, queue_size=1000, baselines=None):
+        # samples: one SampleRing per sensor in self.rings; self.queue: errors and "alive" stats
+        # spectra=True: also a SPECTRUM_COLUMNS ring per spectral sensor in self.spectra
+        # flow: FlowControl kwargs for every reader; the side queue holds at most queue_size messages
+        # baselines: directory of baseline snapshots for warm starts (None: always start cold)
+        self.sensors_cfg=sensors; self.queue=SideQueue(queue_size); self.threads=[]; self.rings={}; self.flow=flow
+        self.want_spectra=spectra; self.spectra={}
+        self.metrics=metrics; self._remote={}  # process mode: latest metrics snapshot per sensor
+        self.ring_capacity=ring_capacity; self.capture_dir=capture_dir
         self.touch_iface=touch_iface; self.test_mode=test_mode; self.source=source
+        # io: "select" (one multiplexed loop), "thread" (thread per sensor) or "process" (process per sensor)
+        self.io=io; self.loop=None; self._mpq=None; self._pump=None; self.baselines=baselines
 
-    def start(self):
-        self.threads=[]
+    def _readers(self):
+        return [SensorReader(out_queue=self.queue, ring=self.rings[kw["name"]], spectra=self.spectra.get(kw["name"]), **kw) if kind=="spectral"
+                else RSSIReader(out_queue=self.queue, ring=self.rings[kw["name"]], **kw) for kind,kw in self._kwargs()]
+
+    def _kwargs(self):
         for cfg in self.sensors_cfg:
             cfg=dict(cfg)
             if self.source=="spectral":
+                cfg["metrics"]=self.metrics; cfg["flow"]=self.flow; cfg.setdefault("baselines", self.baselines)
                 cfg["touch_iface"]=self.touch_iface; cfg["test_mode"]=self.test_mode
-                th=SensorReader(out_queue=self.queue, **cfg)
+                if self.capture_dir and "replay" not in cfg: cfg["capture"]=self.capture_dir
+                yield "spectral", cfg
             else:
-                th=RSSIReader(name=cfg["name"], iface=cfg["iface"], channel=cfg.get("channel",6), bw=cfg.get("bw","HT20"),
-                              out_queue=self.queue, touch_iface=self.touch_iface)
-            th.start(); self.threads.append(th)
+                yield "rssi", {"name":cfg["name"],"iface":cfg["iface"],"channel":cfg.get("channel",6),"bw":cfg.get("bw","HT20"),
+                               "touch_iface":self.touch_iface, "metrics":self.metrics, "flow":self.flow, "pcap":cfg.get("pcap"),
+                               "baselines":cfg.get("baselines", self.baselines)}
+
+    def _pump_batches(self):
+        while True:
+            batch=self._mpq.get()
+            if batch is None: return
+            for item in batch:
+                if item.get("type")=="metrics": self._remote[item["sensor"]]=item["data"]
+                else: self.queue.put(item)
+
+    def start(self):
+        self.rings={cfg["name"]: SampleRing(self.ring_capacity, shared=(self.io=="process")) for cfg in self.sensors_cfg}
+        if self.want_spectra and self.source=="spectral":
+            self.spectra={cfg["name"]: SampleRing(1024, SPECTRUM_COLUMNS, shared=(self.io=="process")) for cfg in self.sensors_cfg}
+        if self.io=="process":
+            self._mpq=SensorProcess._ctx.Queue()
+            self.threads=[SensorProcess(kind, kw, self.rings[kw["name"]], self._mpq, self.spectra.get(kw["name"])) for kind,kw in self._kwargs()]
+            for p in self.threads: p.start()
+            self._pump=threading.Thread(target=self._pump_batches, daemon=True, name="batch-pump"); self._pump.start()
+            return self.queue
+        self.threads=self._readers()
+        if self.io=="select":
+            self.loop=IOLoop(self.threads); self.loop.start()
+        else:
+            for th in self.threads: th.start()
         return self.queue
 
+    def collect(self):
+        """Snapshot for metrics.render: reader stage timings/counters, ring and queue state, CPU."""
+        if self.io=="process": sensors={k: dict(v) for k,v in self._remote.items()}
+        else: sensors={r.name: r.metrics_snapshot() for r in self.threads if getattr(r, "metrics", None)}
+        for name,ring in list(self.rings.items()):
+            if ring.data is None: continue
+            m=sensors.setdefault(name, {"stages": {}, "counters": {}}); m["counters"]=dict(m.get("counters", {}), ring_rows=ring.head)
+        cpu=thread_cpu()
+        if self.io=="process":
+            for p in self.threads:
+                v=proc_cpu(f"/proc/{p.proc.pid}/stat") if p.proc.pid else None
+                if v is not None: cpu[f"sensor:{p.name}"]=v
+        return {"sensors": sensors, "gauges": {"queue_depth": self.queue.qsize(), "queue_dropped": self.queue.dropped}, "cpu": cpu}
+
     def stop(self):
         for th in self.threads: th.stop()
-        for th in self.threads: th.join(timeout=2.0)
+        if self.loop:
+            self.loop.stop(); self.loop.join(timeout=2.0); self.loop=None
+        else:
+            for th in self.threads: th.join(timeout=2.0)
+        if self._pump:
+            self._mpq.put(None); self._pump.join(timeout=2.0); self._pump=None
+        for ring in list(self.rings.values()) + list(self.spectra.values()): ring.close(unlink=True)
@@ -0,0 +1,157 @@
+import os, socket, struct
+
+# Minimal netlink client for interface discovery: generic netlink (nl80211) for wireless
+# interfaces, channel and width, and rtnetlink link notifications. The parse_* functions
+# work on raw bytes only, so they can be fed recorded messages without a socket.
+
+NLMSG_HDR = struct.Struct("=IHHII")  # len, type, flags, seq, pid
+GENL_HDR = struct.Struct("=BBH")     # cmd, version, reserved
+NLA_HDR = struct.Struct("=HH")       # len, type
+IFINFO = struct.Struct("=BxHiII")    # family, type, index, flags, change
+
+NETLINK_ROUTE = 0; NETLINK_GENERIC = 16
+SOL_NETLINK = 270; NETLINK_ADD_MEMBERSHIP = 1
+NLM_F_REQUEST = 0x1; NLM_F_ACK = 0x4; NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2; NLMSG_DONE = 3
+GENL_ID_CTRL = 0x10; CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1; CTRL_ATTR_FAMILY_NAME = 2; CTRL_ATTR_MCAST_GROUPS = 7
+CTRL_ATTR_MCAST_GRP_NAME = 1; CTRL_ATTR_MCAST_GRP_ID = 2
+RTMGRP_LINK = 1; RTM_NEWLINK = 16; RTM_DELLINK = 17; IFLA_IFNAME = 3
+
+NL80211_CMD_GET_INTERFACE = 5; NL80211_CMD_SET_INTERFACE = 6
+NL80211_CMD_NEW_INTERFACE = 7; NL80211_CMD_DEL_INTERFACE = 8
+NL80211_ATTR_WIPHY = 1; NL80211_ATTR_IFINDEX = 3; NL80211_ATTR_IFNAME = 4; NL80211_ATTR_IFTYPE = 5
+NL80211_ATTR_WIPHY_FREQ = 38; NL80211_ATTR_WIPHY_CHANNEL_TYPE = 39
+NL80211_ATTR_CHANNEL_WIDTH = 159; NL80211_ATTR_CENTER_FREQ1 = 160
+IFTYPES = {1: "adhoc", 2: "managed", 3: "AP", 6: "monitor", 7: "mesh", 8: "P2P-client", 9: "P2P-GO"}
+_HT40 = {2: "HT40-", 3: "HT40+"}                    # nl80211_channel_type
+_WIDTH = {0: "HT20", 1: "HT20", 3: "80MHz", 5: "160MHz"}  # nl80211_chan_width (2 = 40 MHz)
+
+class NetlinkError(OSError): pass
+
+def attrs(buf, off=0, end=None):
+    """{type: payload bytes} for the attributes in buf[off:end] (nested/byteorder flags masked)."""
+    end = len(buf) if end is None else end; out = {}
+    while off + NLA_HDR.size <= end:
+        n, typ = NLA_HDR.unpack_from(buf, off)
+        if n < NLA_HDR.size or off + n > end: break
+        out[typ & 0x3fff] = bytes(buf[off + NLA_HDR.size:off + n])
+        off += (n + 3) & ~3
+    return out
+
+def attr(typ, payload):
+    if isinstance(payload, str): payload = payload.encode() + b"\0"
+    n = NLA_HDR.size + len(payload)
+    return NLA_HDR.pack(n, typ) + payload + b"\0" * (-n % 4)
+
+def _u32(a, k):
+    v = a.get(k)
+    return struct.unpack_from("=I", v)[0] if v is not None and len(v) >= 4 else None
+
+def _str(a, k):
+    v = a.get(k)
+    return v.split(b"\0", 1)[0].decode(errors="replace") if v is not None else None
+
+def messages(buf):
+    """Yield (type, flags, seq, payload) for each netlink message in buf."""
+    off = 0
+    while off + NLMSG_HDR.size <= len(buf):
+        n, typ, flags, seq, _ = NLMSG_HDR.unpack_from(buf, off)
+        if n < NLMSG_HDR.size or off + n > len(buf): break
+        yield typ, flags, seq, bytes(buf[off + NLMSG_HDR.size:off + n])
+        off += (n + 3) & ~3
+
+def freq_to_channel(mhz):
+    if mhz == 2484: return 14
+    if 2412 <= mhz < 2484: return (mhz - 2407) // 5
+    if 5000 <= mhz < 5950: return (mhz - 5000) // 5
+    if 5955 <= mhz <= 7115: return (mhz - 5950) // 5
+    return None
+
+def parse_family(payload):
+    """(family id, {multicast group name: id}) from a CTRL_CMD_NEWFAMILY payload."""
+    a = attrs(payload, GENL_HDR.size); groups = {}
+    grp = a.get(CTRL_ATTR_MCAST_GROUPS, b"")
+    for g in attrs(grp).values():
+        ga = attrs(g); name = _str(ga, CTRL_ATTR_MCAST_GRP_NAME); gid = _u32(ga, CTRL_ATTR_MCAST_GRP_ID)
+        if name is not None and gid is not None: groups[name] = gid
+    fid = a.get(CTRL_ATTR_FAMILY_ID)
+    return (struct.unpack_from("=H", fid)[0] if fid else None), groups
+
+def parse_interface(payload):
+    """Interface dict from an nl80211 interface message payload (genl header included)."""
+    cmd = GENL_HDR.unpack_from(payload)[0]; a = attrs(payload, GENL_HDR.size)
+    freq = _u32(a, NL80211_ATTR_WIPHY_FREQ); width = _u32(a, NL80211_ATTR_CHANNEL_WIDTH)
+    ctype = _u32(a, NL80211_ATTR_WIPHY_CHANNEL_TYPE); cf1 = _u32(a, NL80211_ATTR_CENTER_FREQ1)
+    if ctype in _HT40: bw = _HT40[ctype]
+    elif width == 2: bw = "HT40+" if freq and cf1 and cf1 > freq else "HT40-"
+    else: bw = _WIDTH.get(width, "HT20")
+    return {"cmd": cmd, "ifindex": _u32(a, NL80211_ATTR_IFINDEX), "iface": _str(a, NL80211_ATTR_IFNAME),
+            "wiphy": _u32(a, NL80211_ATTR_WIPHY), "type": IFTYPES.get(_u32(a, NL80211_ATTR_IFTYPE)),
+            "freq": freq, "channel": freq_to_channel(freq) if freq else None, "bw": bw}
+
+def parse_link(typ, payload):
+    """(event, ifindex, ifname) from an RTM_NEWLINK/RTM_DELLINK payload."""
+    _, _, index, flags, _ = IFINFO.unpack_from(payload)
+    a = attrs(payload, IFINFO.size)
+    return ("del" if typ == RTM_DELLINK else "new"), index, _str(a, IFLA_IFNAME)
+
+def _error(payload):
+    return -struct.unpack_from("=i", payload)[0]
+
+class Socket:
+    """Blocking netlink socket with request/dump helpers."""
+    def __init__(self, proto, groups=0, timeout=1.0):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, proto)
+        self.sock.bind((0, groups)); self.sock.settimeout(timeout); self.seq = 0
+
+    def fileno(self): return self.sock.fileno()
+
+    def join(self, group): self.sock.setsockopt(SOL_NETLINK, NETLINK_ADD_MEMBERSHIP, group)
+
+    def recv(self): return self.sock.recv(1 << 16)
+
+    def request(self, typ, payload, flags=NLM_F_REQUEST | NLM_F_ACK):
+        """Send one request; return the payloads of every reply until DONE/ACK."""
+        self.seq += 1; seq = self.seq
+        self.sock.send(NLMSG_HDR.pack(NLMSG_HDR.size + len(payload), typ, flags, seq, 0) + payload)
+        out = []
+        while True:
+            for mtyp, _, mseq, p in messages(self.recv()):
+                if mseq != seq: continue  # a notification or a stale reply
+                if mtyp == NLMSG_DONE: return out
+                if mtyp == NLMSG_ERROR:
+                    err = _error(p)
+                    if err: raise NetlinkError(err, os.strerror(err))
+                    return out
+                out.append(p)
+                if not flags & NLM_F_DUMP and not flags & NLM_F_ACK: return out
+
+    def close(self): self.sock.close()
+
+class Nl80211:
+    """nl80211 over generic netlink: interface queries and the multicast group ids."""
+    def __init__(self, timeout=1.0):
+        self.sock = Socket(NETLINK_GENERIC, timeout=timeout)
+        try:
+            reply = self.sock.request(GENL_ID_CTRL, GENL_HDR.pack(CTRL_CMD_GETFAMILY, 1, 0) + attr(CTRL_ATTR_FAMILY_NAME, "nl80211"))
+        except Exception:
+            self.sock.close(); raise
+        if not reply: self.sock.close(); raise NetlinkError(2, "nl80211 family not found")
+        self.family, self.groups = parse_family(reply[0])
+
+    def _cmd(self, cmd, payload=b"", flags=NLM_F_REQUEST | NLM_F_ACK):
+        return self.sock.request(self.family, GENL_HDR.pack(cmd, 0, 0) + payload, flags)
+
+    def interfaces(self):
+        return [parse_interface(p) for p in self._cmd(NL80211_CMD_GET_INTERFACE, flags=NLM_F_REQUEST | NLM_F_DUMP)]
+
+    def interface(self, ifindex):
+        """One interface by index, or None once it is gone."""
+        try: reply = self._cmd(NL80211_CMD_GET_INTERFACE, attr(NL80211_ATTR_IFINDEX, struct.pack("=I", ifindex)), NLM_F_REQUEST)
+        except NetlinkError as e:
+            if e.errno in (19, 22): return None  # ENODEV, EINVAL: not (or no longer) wireless
+            raise
+        return parse_interface(reply[0]) if reply else None
+
+    def close(self): self.sock.close()
@@ -0,0 +1,231 @@
+from collections import deque
+import numpy as np
+from matplotlib import colormaps
+
+# Display-side series storage and blitted drawing for the GUI. Samples go into a NumPy
+# ring (Trace) that also keeps min/max buckets at a fixed resolution per view span, so
+# what gets handed to matplotlib is bounded by the resolution, not the sample count;
+# spectra go into per-sensor Waterfall images that scroll in place; Test-mode stream
+# profiles (tlvprofile snapshots) go into a ProfileView.
+
+class _MinMax:
+    """Fixed-width time buckets holding per-column min and max, in a ring of `capacity`."""
+    def __init__(self, width, ncols, capacity):
+        self.width = float(width); self.cap = int(capacity)
+        self.key = np.zeros(self.cap, dtype=np.int64); self.lo = np.zeros((ncols, self.cap)); self.hi = np.zeros((ncols, self.cap))
+        self.n = 0
+
+    def add(self, t, Y):
+        b = np.floor(t / self.width).astype(np.int64)
+        if self.n: b = np.maximum(b, self.key[(self.n - 1) % self.cap])  # late samples fold into the open bucket
+        b = np.maximum.accumulate(b)
+        starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]]); keys = b[starts]
+        lo = np.minimum.reduceat(Y, starts, axis=1); hi = np.maximum.reduceat(Y, starts, axis=1)
+        if self.n and keys[0] == self.key[(self.n - 1) % self.cap]:
+            p = (self.n - 1) % self.cap
+            self.lo[:, p] = np.minimum(self.lo[:, p], lo[:, 0]); self.hi[:, p] = np.maximum(self.hi[:, p], hi[:, 0])
+            keys = keys[1:]; lo = lo[:, 1:]; hi = hi[:, 1:]
+        k = len(keys)
+        if k > self.cap: keys = keys[-self.cap:]; lo = lo[:, -self.cap:]; hi = hi[:, -self.cap:]; self.n += k - self.cap; k = self.cap
+        idx = (self.n + np.arange(k)) % self.cap
+        self.key[idx] = keys; self.lo[:, idx] = lo; self.hi[:, idx] = hi; self.n += k
+
+    def view(self, t0, t1):
+        """Interleaved (min, max) points per bucket overlapping [t0, t1], oldest first."""
+        L = min(self.n, self.cap)
+        if not L: return np.empty(0), np.empty((self.lo.shape[0], 0))
+        first = self.n - L; k0 = np.floor(t0 / self.width); k1 = np.floor(t1 / self.width)
+        # bucket keys increase with the logical index, so bisect over it
+        lo_i, hi_i = first, self.n
+        while lo_i < hi_i:
+            m = (lo_i + hi_i) // 2
+            if self.key[m % self.cap] < k0: lo_i = m + 1
+            else: hi_i = m
+        idx = np.arange(lo_i, self.n) % self.cap
+        idx = idx[self.key[idx] <= k1]
+        x = np.repeat((self.key[idx] + 0.5) * self.width, 2)
+        y = np.empty((self.lo.shape[0], 2 * len(idx))); y[:, 0::2] = self.lo[:, idx]; y[:, 1::2] = self.hi[:, idx]
+        return x, y
+
+class Trace:
+    """Ring of (t, y_0..y_k) samples for plotting.
+
+    view(t0, t1) returns the raw samples when at most 2*resolution fall in the range and
+    min/max decimated buckets otherwise, so the cost of drawing a window is bounded no
+    matter how many samples it covers. Buckets are kept for every span in `spans`, and
+    outlive the raw ring, so long views keep working after the raw samples are gone."""
+    def __init__(self, ncols=2, capacity=1 << 20, spans=(60.0, 600.0, 3600.0), resolution=2000):
+        self.cap = int(capacity); self.resolution = int(resolution)
+        self.t = np.zeros(self.cap); self.y = np.zeros((ncols, self.cap)); self.n = 0
+        self.levels = sorted((float(s), _MinMax(s / self.resolution, ncols, 2 * self.resolution)) for s in spans)
+
+    def __len__(self): return min(self.n, self.cap)
+
+    @property
+    def last_t(self): return float(self.t[(self.n - 1) % self.cap]) if self.n else None
+
+    def extend(self, t, *cols):
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64)); k = len(t)
+        if not k: return
+        Y = np.vstack([np.atleast_1d(np.asarray(c, dtype=np.float64)) for c in cols])
+        for _, lv in self.levels: lv.add(t, Y)
+        if k > self.cap: t = t[-self.cap:]; Y = Y[:, -self.cap:]; self.n += k - self.cap; k = self.cap
+        p = self.n % self.cap; first = min(k, self.cap - p)
+        self.t[p:p+first] = t[:first]; self.y[:, p:p+first] = Y[:, :first]
+        if k > first: self.t[:k-first] = t[first:]; self.y[:, :k-first] = Y[:, first:]
+        self.n += k
+
+    def _bisect(self, v):
+        # logical index of the first raw sample with t >= v (ring holds t in arrival order)
+        lo, hi = self.n - len(self), self.n
+        while lo < hi:
+            m = (lo + hi) // 2
+            if self.t[m % self.cap] < v: lo = m + 1
+            else: hi = m
+        return lo
+
+    def view(self, t0, t1):
+        """(x, [y_0..y_k]) to plot for t0 <= t <= t1."""
+        i = self._bisect(t0); j = self._bisect(np.nextafter(t1, np.inf))
+        if j - i <= 2 * self.resolution and (i > self.n - len(self) or self.n <= self.cap):
+            idx = np.arange(i, j) % self.cap
+            return self.t[idx], self.y[:, idx]
+        lv = next((lv for s, lv in self.levels if s >= t1 - t0), self.levels[-1][1])
+        return lv.view(t0, t1)
+
+    def clear(self):
+        self.n = 0
+        for _, lv in self.levels: lv.n = 0
+
+class BlitManager:
+    """Redraws only `artists` over a cached background. Anything else that changes (limits,
+       labels, static lines) needs a full canvas.draw(), which refreshes the background."""
+    def __init__(self, canvas, artists):
+        self.canvas = canvas; self.artists = list(artists); self.bg = None
+        for a in self.artists: a.set_animated(True)
+        self.cid = canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, _evt):
+        self.bg = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        fig = self.canvas.figure
+        for a in self.artists:
+            if a.get_visible() and (a.axes is None or a.axes.get_visible()): fig.draw_artist(a)
+
+    def update(self):
+        if self.bg is None:
+            self.canvas.draw(); return
+        self.canvas.restore_region(self.bg)
+        self._draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    def disconnect(self): self.canvas.mpl_disconnect(self.cid)
+
+class Waterfall:
+    """One scrolling spectrogram per sensor, newest row at the top.
+
+    Spectra go into a preallocated (2*rows, bins) buffer in which every row is written twice
+    (i and i+rows), so the visible window is always a contiguous slice and scrolling never copies.
+    The colour scale follows the 5th..99.5th percentile of what is on screen; colours are
+    looked up here, in place, into the image's own RGBA array (set_data() would copy and scan
+    it on every draw), which matplotlib draws without its own norm/cmap pass."""
+    def __init__(self, fig, names, rows=300, bins=128, cmap="viridis"):
+        self.fig = fig; self.rows = int(rows); self.bins = int(bins)
+        self.bufs = {}; self.pos = {}; self.images = {}; self.axes = []; self.clim = {}; self.scratch = {}
+        self.lut = colormaps[cmap](np.linspace(0.0, 1.0, 256), bytes=True)
+        n = len(names); cols = 1 if n <= 2 else 2; nr = -(-n // cols)
+        for i, name in enumerate(names):
+            ax = fig.add_subplot(nr, cols, i + 1); ax.set_title(name, fontsize=9); ax.set_yticks([])
+            ax.set_xlabel("bin", fontsize=8)
+            buf = np.zeros((2 * self.rows, self.bins), dtype=np.float32)
+            self.bufs[name] = buf; self.pos[name] = 0
+            self.images[name] = ax.imshow(np.zeros((self.rows, self.bins, 4), dtype=np.uint8), aspect="auto", interpolation="none")
+            self.images[name].get_array()[:] = self.lut[0]
+            self.scratch[name] = (np.empty((self.rows, self.bins), dtype=np.float32), np.empty((self.rows, self.bins), dtype=np.uint8))
+            self.axes.append(ax)
+        self.blit = BlitManager(fig.canvas, list(self.images.values()))
+
+    def push(self, name, block):
+        """Append (n, bins) spectra for `name`, oldest first."""
+        buf = self.bufs[name]; R = self.rows; block = block[-R:]; p = self.pos[name]
+        for row in block:  # rows grow upward: the newest is at index p of the visible slice
+            p = (p - 1) % R; buf[p] = row; buf[p + R] = row
+        self.pos[name] = p
+
+    def draw(self):
+        for name, im in self.images.items():
+            p = self.pos[name]; view = self.bufs[name][p:p + self.rows]
+            lo, hi = np.percentile(view[::4], (5.0, 99.5))
+            if name in self.clim:  # smooth so the scale doesn't flicker
+                lo = 0.8 * self.clim[name][0] + 0.2 * lo; hi = 0.8 * self.clim[name][1] + 0.2 * hi
+            self.clim[name] = (lo, hi)
+            f, idx = self.scratch[name]
+            np.subtract(view, lo, out=f); f *= 255.0 / max(hi - lo, 1e-3); np.clip(f, 0, 255, out=f)
+            idx[...] = f
+            np.take(self.lut, idx, axis=0, out=im.get_array()); im.changed()
+        self.blit.update()
+
+    def close(self):
+        for ax in self.axes: ax.remove()
+        self.axes = []; self.images = {}; self.blit.disconnect()
+
+class ProfileView:
+    """Test mode for spectral sensors: frames/s (solid) and estimated lost frames/s (dashed)
+    per sensor over time, the TSF spacing histogram and a table of the profile counters.
+    Snapshots arrive every 0.5 s per sensor, so this redraws the figure (only when something
+    new came in) instead of blitting."""
+    def __init__(self, fig, names, points=1200):
+        self.fig = fig; self.names = list(names); self.dirty = False; self.t0 = None
+        gs = fig.add_gridspec(2, 2, height_ratios=(3, 2), hspace=0.35)
+        self.ax_rate = fig.add_subplot(gs[0, :]); self.ax_hist = fig.add_subplot(gs[1, 0]); self.ax_text = fig.add_subplot(gs[1, 1])
+        self.axes = [self.ax_rate, self.ax_hist, self.ax_text]
+        self.ax_rate.set_ylabel("frames/s", fontsize=8); self.ax_rate.set_xlabel("Time (s)", fontsize=8)
+        self.ax_hist.set_title("TSF spacing", fontsize=9); self.ax_text.axis("off")
+        self.series = {n: deque(maxlen=points) for n in self.names}; self.last = {}; self.lines = {}; self.bars = {}
+        w = 0.8 / max(1, len(self.names))
+        for i, n in enumerate(self.names):
+            fps, = self.ax_rate.plot([], [], label=n)
+            lost, = self.ax_rate.plot([], [], "--", color=fps.get_color(), label=f"{n} lost")
+            self.lines[n] = (fps, lost)
+            self.bars[n] = self.ax_hist.bar(np.arange(16) + i * w, np.zeros(16), width=w, color=fps.get_color(), label=n)
+        self.ax_rate.legend(loc="upper right", fontsize=7)
+        self.table = self.ax_text.text(0.0, 1.0, "", va="top", family="monospace", fontsize=7, transform=self.ax_text.transAxes)
+        self._ticks = None
+
+    def push(self, name, t, fps, profile):
+        """One "alive" message: window frames/s and the cumulative profile snapshot."""
+        if name not in self.series: return
+        if self.t0 is None: self.t0 = t
+        prev = self.last.get(name); self.last[name] = (t, profile)
+        lost = max(0.0, (profile["dropped_est"] - prev[1]["dropped_est"]) / max(t - prev[0], 1e-3)) if prev else 0.0
+        self.series[name].append((t - self.t0, fps, lost)); self.dirty = True
+
+    def draw(self):
+        if not self.dirty: return
+        rows = []
+        for n, (fps, lost) in self.lines.items():
+            if self.series[n]:
+                a = np.array(self.series[n]); fps.set_data(a[:, 0], a[:, 1]); lost.set_data(a[:, 0], a[:, 2])
+            if n not in self.last: continue
+            p = self.last[n][1]; sp = p["spacing_us"]; cnt = np.asarray(sp["counts"], dtype=float)
+            for b, h in zip(self.bars[n], 100.0 * cnt / max(cnt.sum(), 1.0)): b.set_height(h)
+            if self._ticks is None:
+                unit = lambda u: f"{u}us" if u < 1000 else f"{u // 1000}ms" if u < 1000000 else f"{u // 1000000}s"
+                self._ticks = [f"<{unit(u)}" for u in sp["buckets"]] + [f">{unit(sp['buckets'][-1])}"]
+                self.ax_hist.set_xticks(np.arange(len(self._ticks))); self.ax_hist.set_xticklabels(self._ticks, rotation=90, fontsize=6)
+                self.ax_hist.set_ylabel("% of frames", fontsize=8)
+            us = lambda v: "-" if v is None else f"{v:.0f}"
+            rows.append(f"{n}: {p['frames']} frames " + " ".join(f"{k}={v}" for k, v in sorted(p["types"].items())))
+            rows.append(f"  gaps {p['gaps']} ({p['gap_ms']:.0f} ms), ~{p['dropped_est']} lost = {p['drop_pct']:.2f}%, TSF resets {p['tsf_resets']}")
+            rows.append(f"  spacing us: mean {us(sp['mean'])} p50 <{us(sp['p50'])} p99 <{us(sp['p99'])} max {us(sp['max'])}")
+            rows.append(f"  bad TLVs: unknown {p['unknown_type']} short {p['short_payload']} malformed {p.get('malformed', 0)}"
+                        f" ({p.get('skipped_bytes', 0)} B skipped), carries {p.get('carries', 0)}")
+        self.table.set_text("\n".join(rows))
+        self.ax_rate.relim(); self.ax_rate.autoscale_view(); self.ax_hist.relim(); self.ax_hist.autoscale_view()
+        self.fig.canvas.draw_idle(); self.dirty = False
+
+    def close(self):
+        for ax in self.axes: ax.remove()
+        self.axes = []; self.lines = {}; self.bars = {}
@@ -0,0 +1,183 @@
+"""Headless radar daemon: readers, fusion and events without Tk or matplotlib.
+
+    python radard.py -c radar.yaml
+
+Runs MultiManager, FusionEngine and EventWriter in one consumer loop, optionally archives
+samples and serves Prometheus metrics, and publishes samples and messages on a Unix
+socket that the GUI can attach to as a viewer ("Attach" button). Keys missing from the
+config file take the values in DEFAULTS; see radar.example.yaml.
+
+Multi-node: with `upstream` a node also streams its samples to an aggregator; with
+`listen` the daemon is that aggregator and its sensors are "<node>/<sensor>" (cluster.py).
+"""
+import time
+T_START = time.monotonic()  # before the heavy imports, so they count toward time-to-first-sample
+import argparse, copy, signal, socket, sys
+import yaml
+from multi import MultiManager
+from fusion import FusionEngine
+from events import EventWriter
+from archive import Archive, Archiver
+from metrics import StageMetrics, MetricsServer
+from ring import SAMPLE_COLUMNS
+from viewer import ViewerServer, DEFAULT_SOCKET, pack_samples, pack_json
+from cluster import Aggregator, NodeStreamer
+
+DEFAULTS = {
+    "source": "spectral",          # spectral / rssi
+    "io": "select",                # select / thread / process
+    "touch_iface": False,          # put the sensors in monitor mode on their channel
+    "sensors": [],                 # [{name, phy, iface, channel, bw, label, ...}] as in the GUI
+    "fusion": {"presence_on": 0.7, "presence_off": 0.4, "diff_thr": 0.1, "cooldown": 0.75, "zones": None},
+    "events": {"path": "captures/events.jsonl", "webhook": None, "fsync": "batch"},
+    "archive": "captures/archive", # directory, or null to not archive
+    "baselines": "captures/baselines",  # baseline snapshots for warm starts; null: start cold
+    "flow": {"policy": "drop_oldest"},
+    "metrics_port": None,          # e.g. 9109 to serve /metrics
+    "viewer_socket": DEFAULT_SOCKET,  # null: no viewers
+    "startup_budget_s": 2.0,       # warn when the first sample takes longer than this
+    "poll_s": 0.02,                # consumer loop period
+    "listen": None,                # {host, port, proto: tcp/udp/both, spectra}: aggregate node streams
+    "upstream": None,              # {host, port, proto: tcp/udp, node, spectra_hz, batch_s}: stream to an aggregator
+}
+
+def load_config(path=None):
+    """DEFAULTS overlaid with the YAML file at `path` (one level deep for dict sections)."""
+    cfg = copy.deepcopy(DEFAULTS)
+    if path:
+        with open(path) as f: user = yaml.safe_load(f) or {}
+        for k, v in user.items():
+            if k not in DEFAULTS: raise ValueError(f"{path}: unknown key {k!r}")
+            if isinstance(DEFAULTS[k], dict) and isinstance(v, dict): cfg[k].update(v)
+            else: cfg[k] = v
+    for i, s in enumerate(cfg["sensors"]):
+        if "name" not in s: raise ValueError(f"sensor #{i + 1} has no name")
+        s.setdefault("label", s["name"])
+    return cfg
+
+def log(msg): print(time.strftime("%H:%M:%S"), msg, flush=True)
+
+class Daemon:
+    def __init__(self, cfg):
+        self.cfg = cfg; self.manager = None; self.fusion = None; self.ev = None
+        self.archiver = None; self.metrics_srv = None; self.viewers = None; self.streamer = None
+        self.cursors = {}; self.first_sample_s = None; self.rows = 0
+        self.loop_metrics = StageMetrics(("loop",))
+        self._stop = False
+
+    def start(self):
+        cfg = self.cfg; sensors = cfg["sensors"]
+        up = dict(cfg["upstream"] or {})
+        if cfg["listen"]:
+            self.manager = Aggregator(sensors, **cfg["listen"])
+        elif not sensors: raise ValueError("no sensors configured")
+        else:
+            self.manager = MultiManager(sensors, touch_iface=cfg["touch_iface"], source=cfg["source"], io=cfg["io"],
+                                        metrics=cfg["metrics_port"] is not None, flow=cfg["flow"], spectra=bool(up.get("spectra_hz")),
+                                        baselines=cfg["baselines"])
+        self.queue = self.manager.start()
+        if cfg["listen"]: log(f"aggregating node streams on {self.manager.proto} port {self.manager.port}")
+        fz = cfg["fusion"]
+        if sensors:  # an aggregator without sensors only relays (viewers, archive)
+            self.fusion = FusionEngine(sensors, presence_on=fz["presence_on"], presence_off=fz["presence_off"],
+                                       diff_thr=fz["diff_thr"], cooldown=fz["cooldown"], zones=fz.get("zones"))
+        if up:
+            node = up.pop("node", None) or socket.gethostname()
+            self.streamer = NodeStreamer(node, self.manager.rings, sensors=sensors, spectra=self.manager.spectra, **up)
+            self.streamer.start(); log(f"streaming as node {node} to {up['host']}:{self.streamer.addr[1]} ({self.streamer.proto})")
+        ev = cfg["events"]
+        self.ev = EventWriter(ev["path"], webhook=ev.get("webhook"), fsync=ev.get("fsync", "batch"), echo=False)
+        if cfg["archive"]:
+            self.archiver = Archiver(Archive(cfg["archive"]), self.manager.rings); self.archiver.start()
+        if cfg["metrics_port"] is not None:
+            self.metrics_srv = MetricsServer(self.collect, port=int(cfg["metrics_port"])); self.metrics_srv.start()
+            log(f"metrics at http://127.0.0.1:{self.metrics_srv.port}/metrics")
+        if cfg["viewer_socket"]:
+            hello = {"sensors": sensors, "columns": list(SAMPLE_COLUMNS), "source": cfg["source"], "config": fz}
+            self.viewers = ViewerServer(cfg["viewer_socket"], hello); self.viewers.start()
+            log(f"viewers on {cfg['viewer_socket']}")
+        log(f"started {len(sensors)} sensor(s), source={cfg['source']}, io={cfg['io']}")
+
+    def step(self):
+        """Drain messages and rings once; returns the number of sample rows seen."""
+        while True:
+            try: item = self.queue.get_nowait()
+            except Exception: break
+            typ = item.get("type")
+            if typ == "error": log(f"[{item['sensor']}] {item['msg']}")
+            elif typ == "shed": log(f"[{item['sensor']}] load shedding ({item['policy']}): stride {item['stride']}")
+            elif typ == "node": log(f"[{item['sensor']}] node {item['event']}")
+            elif typ == "baseline":
+                log(f"[{item['sensor']}] ch {item['channel']}: " + (f"baseline restored ({item['age_s']:.0f} s old)" if item["restored"] else f"cold start: {item['reason']}"))
+            elif typ == "nodes":
+                log("nodes: " + ", ".join(f"{k} lag {v['lag_ms']} ms, offset {v['offset_ms']} ms, lost {v['lost_frames']}"
+                                          + ("" if v["connected"] else " (down)") for k, v in item["nodes"].items()))
+            if self.streamer: self.streamer.message(item)
+            if self.viewers: self.viewers.broadcast(pack_json(item))
+        if self.archiver: self.archiver.rings = self.manager.rings  # an aggregator adds rings as nodes appear
+        rows = 0
+        for name, ring in self.manager.rings.items():
+            block, cur, over = ring.read_block(self.cursors.get(name, 0)); self.cursors[name] = cur; ring.ack(cur)
+            if over: log(f"[{name}] consumer fell behind: {over} samples overwritten")
+            n = block.shape[1]
+            if not n: continue
+            rows += n
+            if self.fusion and name in self.fusion.index: self.fusion.push(name, block[0], block[1])  # SAMPLE_COLUMNS: t, presence, ...
+            if self.viewers and len(self.viewers): self.viewers.broadcast(pack_samples(name, block))
+        if rows and self.first_sample_s is None:
+            self.first_sample_s = time.monotonic() - T_START
+            budget = None if self.cfg["listen"] else self.cfg["startup_budget_s"]  # an aggregator waits on its nodes
+            log(f"first sample after {self.first_sample_s:.3f} s" + (f" (over the {budget:.1f} s budget)" if budget and self.first_sample_s > budget else ""))
+        for t, zone in (self.fusion.step() if self.fusion else ()):
+            self.ev.emit("zone_change", zone=zone)
+            log(f"zone -> {zone}")
+            if self.viewers: self.viewers.broadcast(pack_json({"t": t, "sensor": "fusion", "type": "zone_change", "zone": zone}))
+        self.rows += rows
+        return rows
+
+    def run(self):
+        period = float(self.cfg["poll_s"])
+        while not self._stop:
+            t0 = time.perf_counter(); self.step(); dt = time.perf_counter() - t0
+            self.loop_metrics.observe("loop", dt)
+            time.sleep(max(0.0, period - dt))
+
+    def collect(self):
+        snap = self.manager.collect()
+        snap["sensors"]["daemon"] = self.loop_metrics.snapshot()
+        snap["gauges"].update({f"events_{k}": v for k, v in self.ev.stats().items()})
+        if self.first_sample_s is not None: snap["gauges"]["first_sample_seconds"] = self.first_sample_s
+        if self.viewers: snap["gauges"]["viewers"] = len(self.viewers)
+        if self.streamer: snap["gauges"].update({f"upstream_{k}": v for k, v in self.streamer.stats().items()})
+        return snap
+
+    def stop(self):
+        self._stop = True
+        for part in (self.streamer, self.archiver, self.manager, self.viewers, self.metrics_srv):
+            if part is None: continue
+            try: part.stop()
+            except Exception as e: log(f"[stop] {type(part).__name__}: {e}")
+        if self.ev:
+            self.ev.close(); log(f"[events] {self.ev.stats()}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("-c", "--config", help="YAML config (see radar.example.yaml)")
+    ap.add_argument("--viewer-socket", help="override viewer_socket")
+    ap.add_argument("--exit-after-first-sample", action="store_true", help="stop once the first sample arrives (startup timing)")
+    a = ap.parse_args(argv)
+    cfg = load_config(a.config)
+    if a.viewer_socket: cfg["viewer_socket"] = a.viewer_socket
+    d = Daemon(cfg)
+    def _term(*_): d._stop = True
+    signal.signal(signal.SIGTERM, _term); signal.signal(signal.SIGINT, _term)
+    try:
+        d.start()
+        if a.exit_after_first_sample:
+            while not d._stop and d.first_sample_s is None: d.step(); time.sleep(0.001)
+        else: d.run()
+    finally: d.stop()
+    return 0 if d.first_sample_s is not None or not a.exit_after_first_sample else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
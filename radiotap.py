@@ -0,0 +1,150 @@
+import mmap, socket, struct, time
+
+# Radiotap + 802.11 header parsing for RSSI capture, and the two packet sources that feed
+# it: PacketCapture (AF_PACKET on a monitor interface, TPACKET_V3 ring) and PcapReader
+# (recorded LINKTYPE_IEEE802_11_RADIOTAP pcap files, for offline runs and benchmarks).
+# Both return batches of (timestamp, packet bytes); parse() pulls the antenna signal,
+# noise, rate, frequency and transmitter address out of one packet.
+
+RT_HDR = struct.Struct("<BBHI")  # version, pad, length, first present word
+_U32 = struct.Struct("<I")
+# (alignment, size) of the radiotap fields ahead of the ones we read (bits 0..6)
+_FIELDS = ((8, 8), (1, 1), (1, 1), (2, 4), (1, 2), (1, 1), (1, 1))
+F_TSFT, F_FLAGS, F_RATE, F_CHANNEL, F_FHSS, F_SIGNAL, F_NOISE = range(7)
+FLAG_BADFCS = 0x40
+_layouts = {}
+
+def _layout(present, nwords):
+    # byte offsets of the fields we read; alignment is relative to the header start
+    off = 4 + 4 * nwords; pos = {}
+    for bit, (al, sz) in enumerate(_FIELDS):
+        if present & (1 << bit):
+            off = (off + al - 1) & ~(al - 1); pos[bit] = off; off += sz
+    return (pos.get(F_FLAGS), pos.get(F_RATE), pos.get(F_CHANNEL), pos.get(F_SIGNAL), pos.get(F_NOISE), off)
+
+def mac_str(b): return ":".join(f"{x:02x}" for x in b)
+
+def parse(pkt):
+    """(signal dBm, noise dBm, rate Mb/s, freq MHz, transmitter address bytes) of one radiotap
+       packet; missing fields are None. Returns None for non-radiotap or bad-FCS packets."""
+    n = len(pkt)
+    if n < RT_HDR.size: return None
+    ver, _, rlen, present = RT_HDR.unpack_from(pkt)
+    if ver != 0 or rlen > n: return None
+    nwords = 1; p = present
+    while p & 0x80000000:  # extended bitmaps: fields of the first namespace follow all of them
+        if 4 + 4 * (nwords + 1) > rlen: return None
+        p = _U32.unpack_from(pkt, 4 + 4 * nwords)[0]; nwords += 1
+    key = (present & 0x7f, nwords); lay = _layouts.get(key)
+    if lay is None: lay = _layouts[key] = _layout(present, nwords)
+    fo, ro, co, so, no, end = lay
+    if end > rlen: return None
+    if fo is not None and pkt[fo] & FLAG_BADFCS: return None
+    sig = pkt[so] - 256 if so is not None and pkt[so] > 127 else (pkt[so] if so is not None else None)
+    noise = pkt[no] - 256 if no is not None and pkt[no] > 127 else (pkt[no] if no is not None else None)
+    rate = pkt[ro] * 0.5 if ro is not None else None
+    freq = (pkt[co] | pkt[co + 1] << 8) if co is not None else None
+    tx = None
+    if n >= rlen + 16:
+        fc = pkt[rlen]
+        if not ((fc >> 2) & 3 == 1 and (fc >> 4) in (12, 13)): tx = bytes(pkt[rlen + 10:rlen + 16])  # CTS/ACK have no addr2
+    return sig, noise, rate, freq, tx
+
+# ---- pcap files ----
+PCAP_HDR = struct.Struct("<IHHiIII"); PCAP_REC = struct.Struct("<IIII")
+LINKTYPE_RADIOTAP = 127
+_MAGIC = {0xa1b2c3d4: ("<", 1e-6), 0xd4c3b2a1: (">", 1e-6), 0xa1b23c4d: ("<", 1e-9), 0x4d3cb2a1: (">", 1e-9)}
+
+def write_pcap(path, packets, linktype=LINKTYPE_RADIOTAP, snaplen=65535):
+    """Write [(timestamp, bytes)] as a microsecond pcap file."""
+    with open(path, "wb") as f:
+        f.write(PCAP_HDR.pack(0xa1b2c3d4, 2, 4, 0, 0, snaplen, linktype))
+        for ts, pkt in packets:
+            sec = int(ts); f.write(PCAP_REC.pack(sec, int(round((ts - sec) * 1e6)), len(pkt), len(pkt))); f.write(pkt)
+
+class PcapReader:
+    """Batches of (timestamp, packet) from a pcap file, `chunk` bytes per read()."""
+    def __init__(self, path, chunk=1 << 18):
+        self.f = open(path, "rb"); self.chunk = chunk; self.eof = False; self.packets = 0
+        hdr = self.f.read(PCAP_HDR.size)
+        if len(hdr) < PCAP_HDR.size: raise ValueError(f"{path}: not a pcap file")
+        magic = struct.unpack("<I", hdr[:4])[0]
+        if magic not in _MAGIC: raise ValueError(f"{path}: not a pcap file (magic {magic:#x})")
+        bo, self.tscale = _MAGIC[magic]
+        self.linktype = struct.unpack(bo + "I", hdr[20:24])[0] & 0x0fffffff
+        if self.linktype != LINKTYPE_RADIOTAP: raise ValueError(f"{path}: linktype {self.linktype}, expected radiotap ({LINKTYPE_RADIOTAP})")
+        self.rec = struct.Struct(bo + "IIII"); self.buf = b""
+
+    def fileno(self): return self.f.fileno()
+
+    def read(self):
+        data = self.f.read(self.chunk)
+        if not data: self.eof = True; return []
+        buf = self.buf + data; out = []; i = 0; R = self.rec; n = len(buf)
+        while i + R.size <= n:
+            sec, frac, incl, _ = R.unpack_from(buf, i)
+            if i + R.size + incl > n: break
+            out.append((sec + frac * self.tscale, buf[i + R.size:i + R.size + incl])); i += R.size + incl
+        self.buf = buf[i:]; self.packets += len(out)
+        return out
+
+    def close(self): self.f.close()
+
+# ---- live capture ----
+ETH_P_ALL = 3; SOL_PACKET = 263
+PACKET_RX_RING = 5; PACKET_STATISTICS = 6; PACKET_VERSION = 10; TPACKET_V3 = 2
+TP_STATUS_KERNEL = 0; TP_STATUS_USER = 1
+_BLK = struct.Struct("<IIIII")     # version, offset_to_priv, block_status, num_pkts, offset_to_first_pkt
+_PKT = struct.Struct("<IIIIIIH")   # next_offset, sec, nsec, snaplen, len, status, mac
+
+class PacketCapture:
+    """AF_PACKET capture on `iface`. With a TPACKET_V3 ring the kernel fills `blocks` blocks
+       of `block_size` bytes and hands each over when it is full or `timeout_ms` old, so one
+       wakeup and no per-packet syscalls cover a whole block. Without ring support it falls
+       back to non-blocking recv() of up to `batch` packets per read()."""
+    def __init__(self, iface, block_size=1 << 18, blocks=8, timeout_ms=20, batch=1024):
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        self.ring = None; self.blocks = blocks; self.block_size = block_size; self.cur = 0
+        self.batch = batch; self.eof = False; self.packets = 0
+        try:
+            self.sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+            self.sock.setsockopt(SOL_PACKET, PACKET_RX_RING, struct.pack("<7I", block_size, blocks, 2048, block_size * blocks // 2048, timeout_ms, 0, 0))
+            self.ring = mmap.mmap(self.sock.fileno(), block_size * blocks, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        except OSError:
+            self.sock.close()  # the version/ring options stick to the socket; start over without them
+            self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL)); self.ring = None
+        self.sock.bind((iface, ETH_P_ALL)); self.sock.setblocking(False)
+
+    def fileno(self): return self.sock.fileno()
+
+    def read(self):
+        out = []
+        if self.ring is None:
+            for _ in range(self.batch):
+                try: pkt = self.sock.recv(65535)
+                except BlockingIOError: break
+                out.append((time.time(), pkt))
+        else:
+            ring = self.ring
+            for _ in range(self.blocks):
+                base = self.cur * self.block_size
+                _, _, status, npkt, off = _BLK.unpack_from(ring, base)
+                if not status & TP_STATUS_USER: break
+                p = base + off
+                for _ in range(npkt):
+                    nxt, sec, nsec, snap, _, _, mac = _PKT.unpack_from(ring, p)
+                    out.append((sec + nsec * 1e-9, ring[p + mac:p + mac + snap])); p += nxt
+                _U32.pack_into(ring, base + 8, TP_STATUS_KERNEL)  # hand the block back
+                self.cur = (self.cur + 1) % self.blocks
+        self.packets += len(out)
+        return out
+
+    def stats(self):
+        """(packets, drops) the kernel counted since the last call."""
+        try: st = self.sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 12)
+        except OSError: return 0, 0
+        return struct.unpack_from("<II", st)  # tpacket_stats (8 bytes) without a ring, tpacket_stats_v3 (12) with one
+
+    def close(self):
+        if self.ring is not None: self.ring.close(); self.ring = None
+        self.sock.close()
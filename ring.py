@@ -0,0 +1,92 @@
+import numpy as np
+from multiprocessing import shared_memory
+from features import FEATURE_KEYS
+
+SAMPLE_COLUMNS = ("t",) + FEATURE_KEYS + ("frames", "channel")  # frames: how many frames a sample stands for
+SPECTRUM_BINS = 128
+SPECTRUM_COLUMNS = ("t",) + tuple(f"b{i}" for i in range(SPECTRUM_BINS))
+
+class SampleRing:
+    """Fixed-size columnar ring of per-sensor samples (t + feature columns, float64).
+
+    One producer appends blocks with append(); any number of consumers keep their own
+    cursor and pull every row written since it with read(), in one vectorized slice.
+    A consumer that falls more than `capacity` rows behind loses the oldest rows; the
+    loss is returned and summed in `overruns`. The live consumer ack()s its cursor so the
+    producer can see how far behind it is (`lag`). With shared=True the ring lives in a
+    SharedMemory segment that a worker process can attach() to by name."""
+    def __init__(self, capacity=1 << 16, columns=SAMPLE_COLUMNS, shared=False, name=None):
+        self.capacity = int(capacity); self.columns = tuple(columns); self.overruns = 0
+        nbytes = 8 * (2 + len(self.columns) * self.capacity)  # head, acked, columns
+        self.shm = None
+        if shared or name:
+            self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=nbytes)
+            buf = self.shm.buf
+        else:
+            buf = bytearray(nbytes)
+        self._head = np.ndarray((2,), dtype=np.int64, buffer=buf)
+        self.data = np.ndarray((len(self.columns), self.capacity), dtype=np.float64, buffer=buf, offset=16)
+        self._col = {c: i for i, c in enumerate(self.columns)}
+        if name is None: self._head[0] = 0; self._head[1] = -1  # -1: no live consumer yet
+
+    @classmethod
+    def attach(cls, name, capacity, columns=SAMPLE_COLUMNS):
+        # spawned workers share the creator's resource tracker, so the segment is
+        # unlinked exactly once, by the creator's close(unlink=True)
+        return cls(capacity, columns, name=name)
+
+    @property
+    def name(self): return self.shm.name if self.shm else None
+
+    @property
+    def head(self): return int(self._head[0])
+
+    def ack(self, cursor): self._head[1] = cursor
+
+    @property
+    def lag(self):
+        """Rows the live consumer has not read yet (0 until it first ack()s)."""
+        a = int(self._head[1])
+        return 0 if a < 0 else max(0, int(self._head[0]) - a)
+
+    def append(self, cols):
+        """Append a block given as {column: 1-D array}; every column must have the same length."""
+        n = len(cols[self.columns[0]])
+        if n == 0: return
+        h = int(self._head[0]); cap = self.capacity
+        if n > cap:
+            cols = {c: np.asarray(v)[n-cap:] for c, v in cols.items()}; h += n - cap; n = cap
+        p = h % cap; first = min(n, cap - p)
+        for c, v in cols.items():
+            row = self.data[self._col[c]]; v = np.asarray(v, dtype=np.float64)
+            row[p:p+first] = v[:first]
+            if n > first: row[:n-first] = v[first:]
+        self._head[0] = h + n  # publish after the rows are in place
+
+    def read(self, cursor):
+        """Rows written since `cursor`: returns ({column: array}, new_cursor, overrun)."""
+        block, h, over = self.read_block(cursor)
+        return {c: block[i] for i, c in enumerate(self.columns)}, h, over
+
+    def read_block(self, cursor):
+        """Like read(), but the rows come back as one (columns, n) array."""
+        h = int(self._head[0]); cap = self.capacity
+        over = max(0, h - cursor - cap); cursor += over
+        n = h - cursor
+        if n <= 0: return np.empty((len(self.columns), 0)), h, over
+        p = cursor % cap; first = min(n, cap - p)
+        block = np.concatenate([self.data[:, p:p+first], self.data[:, :n-first]], axis=1) if n > first else self.data[:, p:p+first].copy()
+        lapped = max(0, int(self._head[0]) - cursor - cap)  # rows overwritten while we copied
+        if lapped:
+            block = block[:, lapped:]; over += lapped
+        self.overruns += over
+        return block, h, over
+
+    def close(self, unlink=False):
+        if self.shm is None: return
+        self._head = self.data = None
+        self.shm.close()
+        if unlink:
+            try: self.shm.unlink()
+            except FileNotFoundError: pass
+        self.shm = None
@@ -0,0 +1,250 @@
+import math
+from bisect import bisect_left, bisect_right, insort
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Rolling robust statistics for the presence z-score. Every estimator takes a block of
+# energies and returns, per element, (base, mad) over the window ending at (and including)
+# that element: base = 20th percentile (window mean while <= 20 samples), mad = median
+# absolute deviation floored at 1e-6. state()/load_state() copy an estimator's window to and
+# from a dict of scalars and arrays (baseline snapshots, see baseline.py).
+
+MIN_MAD = 1e-6
+
+def _floor(mad): return MIN_MAD if mad == 0.0 else mad
+
+class NumpyWindow:
+    """Reference engine: NumPy percentile/median over a ring buffer. O(window) per frame,
+       vectorized across a block; fine for the default few-hundred-frame window."""
+    def __init__(self, window=300):
+        self.window = int(window)
+        self.ring = np.zeros(self.window, dtype=np.float32); self.count = 0
+
+    def _last(self, k):
+        p = self.count % self.window
+        if self.count < self.window: return self.ring[max(0, p-k):p]
+        return np.roll(self.ring, -p)[self.window-k:]
+
+    @staticmethod
+    def _robust(arr):
+        base = np.percentile(arr, 20) if len(arr) > 20 else float(np.mean(arr))
+        return base, _floor(float(np.median(np.abs(arr - np.median(arr)))))
+
+    def update_batch(self, E):
+        E = np.asarray(E, dtype=np.float64); N = len(E); h = self.window; c = min(self.count, h)
+        ext = np.concatenate([self._last(c), E.astype(np.float32)])
+        base = np.empty(N); mad = np.empty(N)
+        full = max(0, h - 1 - c)                      # frames before the window is full
+        if N <= 4: full = N                           # too few rows to amortize the windowed path
+        for j in range(min(full, N)):
+            base[j], mad[j] = self._robust(ext[max(0, c+j+1-h):c+j+1])
+        if N > full:
+            sw = sliding_window_view(ext, h)[c+full+1-h:]
+            med = np.median(sw, axis=1)
+            m = np.median(np.abs(sw - med[:, None]), axis=1).astype(np.float64)
+            base[full:] = np.percentile(sw, 20, axis=1) if h > 20 else sw.mean(axis=1)
+            mad[full:] = np.where(m == 0.0, MIN_MAD, m)
+        keep = min(N, h)
+        self.ring[(self.count + np.arange(N - keep, N)) % h] = E[N-keep:]
+        self.count += N
+        return base, mad
+
+    def state(self): return {"count": self.count, "ring": self.ring.copy()}
+
+    def load_state(self, st):
+        self.ring[:] = st["ring"]; self.count = int(st["count"])
+
+class OrderStatWindow:
+    """Exact engine: the window is kept sorted in bounded-size blocks indexed by a Fenwick
+       tree over block sizes, so insert/evict/select are O(log n) plus an O(load) memmove
+       and the MAD is found by a k-th selection over the two sorted deviation runs."""
+    def __init__(self, window=300, load=512):
+        self.window = int(window); self.load = int(load)
+        self.ring = np.zeros(self.window, dtype=np.float32); self.count = 0
+        self._lists = []; self._maxes = []; self._fen = [0]
+
+    def __len__(self): return min(self.count, self.window)
+
+    def _rebuild(self):
+        fen = [0] + [len(b) for b in self._lists]
+        for i in range(1, len(fen)):
+            j = i + (i & -i)
+            if j < len(fen): fen[j] += fen[i]
+        self._fen = fen
+
+    def _add(self, k, d):
+        i = k + 1; fen = self._fen
+        while i < len(fen): fen[i] += d; i += i & -i
+
+    def _prefix(self, k):
+        s = 0; fen = self._fen
+        while k > 0: s += fen[k]; k -= k & -k
+        return s
+
+    def _insert(self, v):
+        if not self._lists:
+            self._lists.append([v]); self._maxes.append(v); self._rebuild(); return
+        k = bisect_left(self._maxes, v)
+        if k == len(self._maxes): k -= 1; self._maxes[k] = v
+        b = self._lists[k]; insort(b, v)
+        if len(b) > 2 * self.load:
+            self._lists[k:k+1] = [b[:self.load], b[self.load:]]
+            self._maxes[k:k+1] = [b[self.load-1], b[-1]]; self._rebuild()
+        else: self._add(k, 1)
+
+    def _remove(self, v):
+        k = bisect_left(self._maxes, v); b = self._lists[k]
+        del b[bisect_left(b, v)]
+        if not b:
+            del self._lists[k]; del self._maxes[k]; self._rebuild()
+        else:
+            self._maxes[k] = b[-1]; self._add(k, -1)
+
+    def select(self, i):
+        """i-th smallest value (0-based) in the window."""
+        fen = self._fen; k = 0; step = 1 << (len(fen).bit_length() - 1)
+        while step:
+            j = k + step
+            if j < len(fen) and fen[j] <= i: k = j; i -= fen[j]
+            step >>= 1
+        return self._lists[k][i]
+
+    def rank(self, v):
+        """Number of window values strictly below v."""
+        k = bisect_left(self._maxes, v)
+        if k == len(self._lists): return len(self)
+        return self._prefix(k) + bisect_left(self._lists[k], v)
+
+    def _quantile(self, q):
+        pos = q * (len(self) - 1); lo = int(pos); f = pos - lo
+        a = self.select(lo)
+        return a if f == 0.0 else a + f * (self.select(lo + 1) - a)
+
+    def _kth_dev(self, k, m, p):
+        # deviations below m: L[a] = m - S[p-1-a]; at/above m: R[b] = S[p+b] - m; both ascending
+        n = len(self); sel = self.select
+        lo = max(0, k + 1 - (n - p)); hi = min(k + 1, p)
+        while lo < hi:
+            a = (lo + hi) // 2
+            if m - sel(p-1-a) < sel(p+k-a) - m: lo = a + 1
+            else: hi = a
+        a = lo; b = k + 1 - a
+        return max(m - sel(p-a) if a > 0 else -math.inf, sel(p+b-1) - m if b > 0 else -math.inf)
+
+    def push(self, e):
+        e = float(np.float32(e))
+        if self.count >= self.window: self._remove(float(self.ring[self.count % self.window]))
+        self.ring[self.count % self.window] = e; self.count += 1
+        self._insert(e)
+        n = len(self)
+        base = self._quantile(0.2) if n > 20 else float(np.mean(self._ring_values()))
+        m = self._quantile(0.5); p = self.rank(m)
+        if n % 2: mad = self._kth_dev(n // 2, m, p)
+        else: mad = 0.5 * (self._kth_dev(n // 2 - 1, m, p) + self._kth_dev(n // 2, m, p))
+        return base, _floor(mad)
+
+    def _ring_values(self):
+        return self.ring[:self.count] if self.count < self.window else self.ring
+
+    def update_batch(self, E):
+        out = [self.push(e) for e in np.asarray(E, dtype=np.float64).tolist()]
+        base, mad = zip(*out) if out else ((), ())
+        return np.array(base, dtype=np.float64), np.array(mad, dtype=np.float64)
+
+    def state(self): return {"count": self.count, "ring": self.ring.copy()}
+
+    def load_state(self, st):
+        self.ring[:] = st["ring"]; self.count = int(st["count"])
+        v = sorted(self._ring_values().tolist()); L = self.load
+        self._lists = [v[i:i+L] for i in range(0, len(v), L)]; self._maxes = [b[-1] for b in self._lists]
+        self._rebuild()
+
+class P2Quantile:
+    """Jain & Chlamtac P-square single-quantile estimator: five markers, O(1) per value."""
+    def __init__(self, q):
+        self.q = q; self.n = 0; self.h = []
+        self.pos = [1, 2, 3, 4, 5]; self.des = [1, 1+2*q, 1+4*q, 3+2*q, 5]; self.inc = [0, q/2, q, (1+q)/2, 1]
+
+    def add(self, x):
+        self.n += 1
+        if self.n <= 5:
+            insort(self.h, x); return
+        h = self.h; pos = self.pos
+        if x < h[0]: h[0] = x; k = 0
+        elif x >= h[4]: h[4] = x; k = 3
+        else: k = bisect_right(h, x) - 1
+        for i in range(k+1, 5): pos[i] += 1
+        for i in range(5): self.des[i] += self.inc[i]
+        for i in (1, 2, 3):
+            d = self.des[i] - pos[i]
+            if (d >= 1 and pos[i+1] - pos[i] > 1) or (d <= -1 and pos[i-1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                hp = h[i] + d / (pos[i+1] - pos[i-1]) * ((pos[i] - pos[i-1] + d) * (h[i+1] - h[i]) / (pos[i+1] - pos[i])
+                                                       + (pos[i+1] - pos[i] - d) * (h[i] - h[i-1]) / (pos[i] - pos[i-1]))
+                if not h[i-1] < hp < h[i+1]: hp = h[i] + d * (h[i+d] - h[i]) / (pos[i+d] - pos[i])
+                h[i] = hp; pos[i] += d
+
+    def state(self):
+        # n, marker count, heights, positions, desired positions: 17 floats
+        return [self.n, len(self.h)] + self.h + [0.0] * (5 - len(self.h)) + self.pos + self.des
+
+    def load_state(self, v):
+        self.n = int(v[0]); self.h = list(v[2:2+int(v[1])]); self.pos = [int(p) for p in v[7:12]]; self.des = list(v[12:17])
+
+    def value(self):
+        if self.n > 5: return self.h[2]
+        if not self.h: return 0.0
+        pos = self.q * (len(self.h) - 1); lo = int(pos)
+        return self.h[lo] if lo + 1 >= len(self.h) else self.h[lo] + (pos - lo) * (self.h[lo+1] - self.h[lo])
+
+class _P2Epoch:
+    def __init__(self):
+        self.base = P2Quantile(0.2); self.med = P2Quantile(0.5); self.dev = P2Quantile(0.5)
+        self.n = 0; self.total = 0.0
+
+    def add(self, e, center):
+        self.n += 1; self.total += e
+        self.base.add(e); self.med.add(e); self.dev.add(abs(e - center))
+
+class P2Window:
+    """Approximate engine in constant memory: two staggered P-square epochs restarted every
+       window/2 frames, so statistics always cover the last window/2..window frames. The MAD
+       is tracked as the P-square median of deviations from the running median estimate."""
+    def __init__(self, window=300):
+        self.window = int(window); self.half = max(1, self.window // 2)
+        self.count = 0; self.epochs = [_P2Epoch()]
+
+    def push(self, e):
+        e = float(np.float32(e))
+        if self.count and self.count % self.half == 0:
+            self.epochs.append(_P2Epoch())
+            if len(self.epochs) > 2: self.epochs.pop(0)
+        cur = self.epochs[0]
+        center = cur.med.value() if cur.n else e
+        for ep in self.epochs: ep.add(e, center)
+        self.count += 1
+        base = cur.base.value() if cur.n > 20 else cur.total / cur.n
+        return base, _floor(cur.dev.value())
+
+    def update_batch(self, E):
+        out = [self.push(e) for e in np.asarray(E, dtype=np.float64).tolist()]
+        base, mad = zip(*out) if out else ((), ())
+        return np.array(base, dtype=np.float64), np.array(mad, dtype=np.float64)
+
+    def state(self):
+        return {"count": self.count, "epochs": np.array([[e.n, e.total] for e in self.epochs]),
+                "markers": np.array([[q.state() for q in (e.base, e.med, e.dev)] for e in self.epochs])}
+
+    def load_state(self, st):
+        self.count = int(st["count"]); self.epochs = []
+        for (n, total), marks in zip(np.asarray(st["epochs"]).tolist(), np.asarray(st["markers"]).tolist()):
+            e = _P2Epoch(); e.n = int(n); e.total = total
+            for q, v in zip((e.base, e.med, e.dev), marks): q.load_state(v)
+            self.epochs.append(e)
+
+ESTIMATORS = {"numpy": NumpyWindow, "exact": OrderStatWindow, "p2": P2Window}
+
+def make_estimator(kind="numpy", window=300):
+    try: cls = ESTIMATORS[kind]
+    except KeyError: raise ValueError(f"unknown estimator {kind!r}; choose from {sorted(ESTIMATORS)}")
+    return cls(window)
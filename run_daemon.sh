@@ -0,0 +1,6 @@
+#!/usr/bin/env bash
+set -euo pipefail
+cd "$(dirname "$0")"
+mount | grep -q "/sys/kernel/debug" || sudo mount -t debugfs none /sys/kernel/debug || true
+source .venv/bin/activate
+exec python radard.py -c "${1:-radar.yaml}"
@@ -1,4 +1,5 @@
-import os, time, errno, subprocess
+import os, time, errno
+from channel import backend as channel_backend
 
 def _find_phy_guess():
     base = "/sys/kernel/debug/ieee80211"
@@ -37,8 +38,9 @@ def spectral_stream_path(phy=None):
     if not os.path.exists(p): raise FileNotFoundError(p)
     return p
 
+def trigger_spectral(phy=None):
+    write(os.path.join(dbgpath(phy), "spectral_scan_ctl"), "trigger")
+
 def set_channel(iface, channel, bw="HT20"):
-    subprocess.check_call(["ip","link","set",iface,"down"])
-    subprocess.check_call(["iw","dev",iface,"set","type","monitor"])
-    subprocess.check_call(["ip","link","set",iface,"up"])
-    subprocess.check_call(["iw","dev",iface,"set","channel",str(channel),bw])
+    """Monitor mode on `channel`: over netlink when available, else ip/iw (see channel.py)."""
+    channel_backend().setup(iface, channel, bw)
@@ -0,0 +1,48 @@
+from spectral_parser import TLV_HDR, tlv_runs
+
+MAX_TLV = TLV_HDR.size + 0xFFFF
+
+class TLVStream:
+    """Zero-copy reader for a spectral_scan debugfs stream.
+
+    Reads go straight into a small pool of preallocated buffers with readinto(); a TLV cut
+    off at the end of one read is carried to the head of the next buffer, so every slice
+    handed out holds only complete TLVs. Slices are memoryviews into the pool and stay
+    valid for the next `pool - 1` reads; `runs` holds the TLV runs (tlv_runs) of the last
+    slice, so a consumer that only needs headers does not walk them again."""
+    def __init__(self, f, chunk=65536, pool=3):
+        self.f = f; self.chunk = int(chunk)
+        self._pool = [bytearray(self.chunk + MAX_TLV) for _ in range(max(2, int(pool)))]
+        self._views = [memoryview(b) for b in self._pool]
+        self._k = 0; self._carry = 0; self._tail = 0; self.eof = False
+        self.bytes = 0; self.frames = 0; self.carries = 0; self.malformed = 0; self.skipped = 0; self.runs = []
+
+    def read(self):
+        """Next memoryview of complete TLVs; None when the stream had no new data
+           (`eof` tells end-of-file apart from a non-blocking read with nothing ready)."""
+        prev = self._views[self._k]; self._k = (self._k + 1) % len(self._pool)
+        mv = self._views[self._k]; c = self._carry
+        if c: mv[:c] = prev[self._tail:self._tail+c]
+        n = self.f.readinto(mv[c:c+self.chunk]); self.eof = n == 0
+        if not n:
+            self._tail = 0; self.runs = []
+            return None
+        self.bytes += n; total = c + n
+        self.runs, end, partial = tlv_runs(mv[:total])
+        self.frames += sum(r[3] for r in self.runs)
+        if partial:
+            self._tail = end; self._carry = total - end
+            self.carries += 1
+        else:
+            if end < total: self.malformed += 1; self.skipped += total - end  # zero-length header: rest of the read dropped
+            self._tail = 0; self._carry = 0
+        return mv[:end]
+
+    @property
+    def pending(self):
+        """Bytes of a TLV still waiting for the rest of it (cut off, if the stream has ended)."""
+        return self._carry
+
+    def stats(self):
+        return {"bytes": self.bytes, "frames": self.frames, "carries": self.carries, "malformed": self.malformed,
+                "skipped": self.skipped}
@@ -7,50 +7,97 @@ SPECTRAL_HT20_NUM_BINS    = 56
 SPECTRAL_HT20_40_NUM_BINS = 128
 TLV_HDR = struct.Struct(">BH")
 
-def parse_frames(raw: bytes):
-    i = 0; n = len(raw)
+# Packed on-wire payload layouts; a TLV payload may be longer than the record, never shorter.
+HT20_DTYPE = np.dtype([("max_exp","u1"),("freq",">u2"),("rssi","i1"),("noise","i1"),("max_mag",">u2"),
+                       ("max_index","u1"),("bitmap_weight","u1"),("tsf",">u8"),
+                       ("bins","u1",(SPECTRAL_HT20_NUM_BINS,))])
+HT40_DTYPE = np.dtype([("chan_type","u1"),("freq",">u2"),("lower_rssi","i1"),("upper_rssi","i1"),("tsf",">u8"),
+                       ("lower_noise","i1"),("upper_noise","i1"),("lower_max_mag",">u2"),("upper_max_mag",">u2"),
+                       ("lower_max_index","u1"),("upper_max_index","u1"),("lower_bw","u1"),("upper_bw","u1"),
+                       ("max_exp","u1"),("bins","u1",(SPECTRAL_HT20_40_NUM_BINS,))])
+FRAME_DTYPES = {ATH_FFT_SAMPLE_HT20:("HT20",HT20_DTYPE), ATH_FFT_SAMPLE_HT20_40:("HT40",HT40_DTYPE)}
+
+def tlv_runs(raw):
+    """Walk the TLV chain of `raw`, collapsing consecutive same-type/same-length TLVs
+       into one strided run. Returns ([(tlv_type, tlv_len, payload_off, count)], end, partial)
+       where `end` is the offset of the first byte not covered by a complete TLV and
+       `partial` says the walk stopped on a TLV cut off by the end of `raw` (as opposed
+       to a malformed zero-length header)."""
+    u8 = np.frombuffer(raw, dtype=np.uint8); n = u8.size
+    i = 0; runs = []
     while i + TLV_HDR.size <= n:
-        tlv_type, tlv_len = TLV_HDR.unpack_from(raw, i); i += TLV_HDR.size
-        if tlv_len <= 0 or i + tlv_len > n: break
-        payload = raw[i:i+tlv_len]; i += tlv_len
-
-        if tlv_type == ATH_FFT_SAMPLE_HT20:
-            if tlv_len < (1+2+1+1+2+1+1+8+SPECTRAL_HT20_NUM_BINS): continue
-            off=0
-            max_exp = payload[off]; off+=1
-            (freq,) = struct.unpack_from(">H", payload, off); off+=2
-            (rssi,) = struct.unpack_from("b", payload, off); off+=1
-            (noise,) = struct.unpack_from("b", payload, off); off+=1
-            (max_mag,) = struct.unpack_from(">H", payload, off); off+=2
-            max_index = payload[off]; off+=1
-            bitmap_weight = payload[off]; off+=1
-            (tsf,) = struct.unpack_from(">Q", payload, off); off+=8
-            bins = np.frombuffer(payload, dtype=np.uint8, count=SPECTRAL_HT20_NUM_BINS, offset=off).astype(np.float32)
-            yield {"type":"HT20","freq":int(freq),"tsf":int(tsf),"rssi":int(rssi),"noise":int(noise),
-                   "max_mag":int(max_mag),"max_index":int(max_index),"bitmap_weight":int(bitmap_weight),
-                   "max_exp":int(max_exp),"bins":bins}
-
-        elif tlv_type == ATH_FFT_SAMPLE_HT20_40:
-            if tlv_len < (1+2+1+1+8+1+1+2+2+1+1+1+1+SPECTRAL_HT20_40_NUM_BINS): continue
-            off=0
-            chan_type = payload[off]; off+=1
-            (freq,) = struct.unpack_from(">H", payload, off); off+=2
-            (lower_rssi,) = struct.unpack_from("b", payload, off); off+=1
-            (upper_rssi,) = struct.unpack_from("b", payload, off); off+=1
-            (tsf,) = struct.unpack_from(">Q", payload, off); off+=8
-            (lower_noise,) = struct.unpack_from("b", payload, off); off+=1
-            (upper_noise,) = struct.unpack_from("b", payload, off); off+=1
-            (lower_max_mag,) = struct.unpack_from(">H", payload, off); off+=2
-            (upper_max_mag,) = struct.unpack_from(">H", payload, off); off+=2
-            lower_max_index = payload[off]; off+=1
-            upper_max_index = payload[off]; off+=1
-            lower_bw = payload[off]; off+=1
-            upper_bw = payload[off]; off+=1
-            max_exp = payload[off]; off+=1
-            bins = np.frombuffer(payload, dtype=np.uint8, count=SPECTRAL_HT20_40_NUM_BINS, offset=off).astype(np.float32)
-            yield {"type":"HT40","freq":int(freq),"tsf":int(tsf),
-                   "lower_rssi":int(lower_rssi),"upper_rssi":int(upper_rssi),
-                   "lower_noise":int(lower_noise),"upper_noise":int(upper_noise),
-                   "lower_max_mag":int(lower_max_mag),"upper_max_mag":int(upper_max_mag),
-                   "lower_max_index":int(lower_max_index),"upper_max_index":int(upper_max_index),
-                   "max_exp":int(max_exp),"bins":bins,"chan_type":int(chan_type)}
+        tlv_type, tlv_len = TLV_HDR.unpack_from(raw, i)
+        if tlv_len <= 0: return runs, i, False
+        if i + TLV_HDR.size + tlv_len > n: break
+        step = TLV_HDR.size + tlv_len
+        kmax = (n - i) // step; k = 1; w = 8
+        while k < kmax:  # look ahead 8, 16, 32, ... headers: short runs (mixed streams) stay cheap
+            m = min(w, kmax - k); j = i + k*step
+            hdr = u8[j:j+m*step].reshape(m, step)[:, :TLV_HDR.size]
+            same = (hdr[:,0]==tlv_type) & (hdr[:,1]==(tlv_len>>8)) & (hdr[:,2]==(tlv_len&0xff))
+            if not same.all(): k += int(np.argmin(same)); break
+            k += m; w *= 2
+        runs.append((tlv_type, tlv_len, i + TLV_HDR.size, k))
+        i += k*step
+    return runs, i, i < n
+
+def scan_tlvs(raw):
+    """Header-only walk: (complete TLV count, end offset, partial) without touching payloads."""
+    runs, end, partial = tlv_runs(raw)
+    return sum(r[3] for r in runs), end, partial
+
+TSF_OFFSET = {ATH_FFT_SAMPLE_HT20: HT20_DTYPE.fields["tsf"][1], ATH_FFT_SAMPLE_HT20_40: HT40_DTYPE.fields["tsf"][1]}
+
+def frame_index(raw):
+    """Per-TLV (offset, type, tsf) arrays in stream order for the complete TLVs in `raw`;
+       offsets point at the TLV header, tsf is 0 for types without one."""
+    runs = tlv_runs(raw)[0]
+    if not runs: return np.empty(0, np.int64), np.empty(0, np.uint8), np.empty(0, np.uint64)
+    offs = []; types = []; tsf = []
+    for tlv_type, tlv_len, off, count in runs:
+        step = TLV_HDR.size + tlv_len
+        offs.append(off - TLV_HDR.size + step*np.arange(count, dtype=np.int64))
+        types.append(np.full(count, tlv_type, dtype=np.uint8))
+        to = TSF_OFFSET.get(tlv_type)
+        if to is None or tlv_len < to + 8: tsf.append(np.zeros(count, np.uint64))
+        else: tsf.append(np.ndarray((count,), dtype=">u8", buffer=raw, offset=off+to, strides=(step,)).astype(np.uint64))
+    return np.concatenate(offs), np.concatenate(types), np.concatenate(tsf)
+
+def _run_view(raw, tlv_type, tlv_len, off, count):
+    spec = FRAME_DTYPES.get(tlv_type)
+    if spec is None or tlv_len < spec[1].itemsize: return None
+    return np.ndarray(shape=(count,), dtype=spec[1], buffer=raw, offset=off, strides=(TLV_HDR.size+tlv_len,))
+
+def decode_frames(raw):
+    """Batch-decode every complete TLV in `raw` into one structured array per frame type:
+       {"HT20": HT20_DTYPE records, "HT40": HT40_DTYPE records}; `rec["bins"]` is the (N, bins)
+       uint8 matrix. Single-run results are views into `raw`, so copy them if `raw` gets reused."""
+    per = {"HT20":[], "HT40":[]}
+    runs = tlv_runs(raw)[0]
+    for r in runs:
+        v = _run_view(raw, *r)
+        if v is not None: per[FRAME_DTYPES[r[0]][0]].append(v)
+    out = {}
+    for typ, parts in per.items():
+        dt = HT20_DTYPE if typ=="HT20" else HT40_DTYPE
+        out[typ] = parts[0] if len(parts)==1 else (np.concatenate(parts) if parts else np.empty(0, dtype=dt))
+    return out
+
+def parse_frames(raw: bytes):
+    runs = tlv_runs(raw)[0]
+    for r in runs:
+        rec = _run_view(raw, *r)
+        if rec is None: continue
+        if r[0] == ATH_FFT_SAMPLE_HT20:
+            for s in rec:
+                yield {"type":"HT20","freq":int(s["freq"]),"tsf":int(s["tsf"]),"rssi":int(s["rssi"]),"noise":int(s["noise"]),
+                       "max_mag":int(s["max_mag"]),"max_index":int(s["max_index"]),"bitmap_weight":int(s["bitmap_weight"]),
+                       "max_exp":int(s["max_exp"]),"bins":s["bins"].astype(np.float32)}
+        else:
+            for s in rec:
+                yield {"type":"HT40","freq":int(s["freq"]),"tsf":int(s["tsf"]),
+                       "lower_rssi":int(s["lower_rssi"]),"upper_rssi":int(s["upper_rssi"]),
+                       "lower_noise":int(s["lower_noise"]),"upper_noise":int(s["upper_noise"]),
+                       "lower_max_mag":int(s["lower_max_mag"]),"upper_max_mag":int(s["upper_max_mag"]),
+                       "lower_max_index":int(s["lower_max_index"]),"upper_max_index":int(s["upper_max_index"]),
+                       "max_exp":int(s["max_exp"]),"bins":s["bins"].astype(np.float32),"chan_type":int(s["chan_type"])}
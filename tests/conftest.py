@@ -0,0 +1,4 @@
+import os, sys
+
+# the app's modules live at the repository root (run_gui.sh / radard.py import them flat)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+import os
+import numpy as np
+from archive import Archive
+
+COLS = ("t", "presence", "motion")
+
+def _block(t, seed=0):
+    rng = np.random.default_rng(seed); t = np.asarray(t, dtype=np.float64)
+    return {"t": t, "presence": rng.random(len(t)), "motion": rng.random(len(t))}
+
+def test_flush_keeps_the_open_bucket(tmp_path):
+    a = Archive(str(tmp_path), columns=COLS); blocks = [_block(np.arange(i, i + 50) * 0.01, i) for i in range(0, 250, 50)]
+    for b in blocks:
+        a.append("s0", b); a.flush()  # every flush lands inside the same open second
+    assert a.query("s0", tier="1s")["t"].tolist() == [0.0, 1.0, 2.0]  # one row per second, the open one included
+    assert a.query("s0", tier="1m")["n"].tolist() == [250]
+    a.close()
+    allp = np.concatenate([b["presence"] for b in blocks])
+    for tier, n in (("1s", [100, 100, 50]), ("1m", [250])):
+        q = Archive(str(tmp_path), columns=COLS).query("s0", tier=tier)  # what is on disk after close
+        assert q["n"].tolist() == n
+        assert np.isclose(q["presence_max"].max(), allp.max()) and np.isclose(q["presence_min"].min(), allp.min())
+        assert np.isclose((q["presence_mean"] * q["n"]).sum(), allp.sum())
+
+def test_query_unknown_sensor_creates_nothing(tmp_path):
+    a = Archive(str(tmp_path), columns=COLS)
+    q = a.query("nobody", tier="1s")
+    assert set(q) == {"t", "n"} | {f"{c}_{s}" for c in COLS[1:] for s in ("min", "mean", "max")} and all(len(v) == 0 for v in q.values())
+    assert a.query("nobody", columns=("motion",))["motion"].size == 0
+    assert os.listdir(tmp_path) == [] and a.sensors() == []
+
+def test_rollup_ignores_samples_older_than_the_open_bucket(tmp_path):
+    a = Archive(str(tmp_path), columns=COLS)
+    a.append("s0", _block([10.2, 10.5, 11.1, 12.3], 1))  # 12 is open
+    a.append("s0", _block([9.5, 11.7, 12.8, 13.4], 2))   # 9 and 11 were emitted already
+    a.close()
+    q = Archive(str(tmp_path), columns=COLS).query("s0", tier="1s")
+    assert q["t"].tolist() == [10.0, 11.0, 12.0, 13.0] and q["n"].tolist() == [2, 1, 2, 1]
+    assert a._rollups[("s0", "1s")].late == 2
+    assert len(a.query("s0")["t"]) == 8  # raw keeps every sample
+
+def test_segments_with_the_same_time_span_are_all_kept(tmp_path):
+    a = Archive(str(tmp_path), columns=COLS)
+    for seed in range(3):
+        a.append("s0", _block([5.0] * 4, seed)); a.flush()  # one poll stamps all its rows with the same t
+    assert len(os.listdir(tmp_path / "s0" / "raw")) == 3
+    assert len(a.query("s0")["t"]) == 12 and len(Archive(str(tmp_path), columns=COLS).query("s0")["t"]) == 12
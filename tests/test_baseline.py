@@ -0,0 +1,53 @@
+import os, queue, time
+import numpy as np
+import baseline
+from baseline import BaselineStore, MAX_AGE
+from bench import synth
+from features import SpectralFeatures
+from multi import SensorReader
+
+STATE = {"kind": "spectral", "count": 12, "history": 300, "estimator": "exact", "last": np.arange(128.0), "est_buf": np.ones((3, 4))}
+
+def test_save_and_load(tmp_path):
+    s = BaselineStore(str(tmp_path)); k = baseline.key("spectral", "phy0.mon0", 6, "HT20")
+    s.save(k, STATE); s.flush()
+    st, why = s.load(k)
+    assert why is None and s.saved == 1 and abs(st.pop("saved") - time.time()) < 5
+    assert set(st) == set(STATE) and all(np.array_equal(st[n], v) if isinstance(v, np.ndarray) else st[n] == v for n, v in STATE.items())
+    assert [f for f in os.listdir(tmp_path)] == [k + ".npz"]  # no temp file left behind
+
+def test_stale_and_foreign_snapshots_start_cold(tmp_path):
+    s = BaselineStore(str(tmp_path)); k = baseline.key("rssi", "mon0", 11, "HT20")
+    assert s.load(k) == (None, "no snapshot")
+    s._write(k, STATE, time.time() - MAX_AGE - 60)
+    st, why = s.load(k); assert st is None and "min old" in why
+    assert s.load(k, max_age=MAX_AGE + 3600)[0] is not None
+    s._write(k, STATE, time.time() + 3600); assert s.load(k)[0] is None  # from the future: clock trouble
+    s._write(k, STATE, time.time()); os.replace(s.path(k), s.path("other"))
+    assert s.load("other") == (None, "snapshot from another version or sensor")
+    with open(s.path(k), "wb") as f: f.write(b"garbage")
+    assert s.load(k)[1].startswith("unreadable snapshot")
+
+def test_burst_writes_newest(tmp_path):
+    s = BaselineStore(str(tmp_path))
+    for i in range(50): s.save("k", dict(STATE, count=i))
+    s.flush(); assert s.load("k")[0]["count"] == 49 and s.errors == 0
+
+def test_warm_start_matches_uninterrupted_model(tmp_path):
+    rng = np.random.default_rng(0); bins = rng.integers(0, 60, (3000, 56)).astype(np.uint8)
+    a = SpectralFeatures(target_bins=128, history=300, estimator="exact"); a.update_batch(bins[:2000])
+    s = BaselineStore(str(tmp_path)); s.save("k", a.state()); s.flush()
+    b = SpectralFeatures(target_bins=128, history=300, estimator="exact"); b.load_state(s.load("k")[0])
+    ra = a.update_batch(bins[2000:]); rb = b.update_batch(bins[2000:])
+    assert all(np.allclose(ra[k], rb[k]) for k in ("presence", "motion", "p_lo", "p_mid", "p_hi"))
+
+def test_reader_restores_its_baseline(tmp_path):
+    p = tmp_path / "s.bin"; p.write_bytes(synth.tlv_stream(3000)); d = str(tmp_path / "baselines")
+    def run():
+        q = queue.Queue(); r = SensorReader("s0", "", "", stream=str(p), baselines=d, out_queue=q); r.open()
+        while not r.at_eof(): r.poll()
+        r.close(); out = []
+        while not q.empty(): out.append(q.get())
+        return [m for m in out if m.get("type") == "baseline"]
+    assert run() == []  # first run: nothing to restore, a snapshot is written on close
+    msgs = run(); assert len(msgs) == 1 and msgs[0]["restored"] and msgs[0]["age_s"] < 60
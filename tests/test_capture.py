@@ -0,0 +1,62 @@
+import time
+import numpy as np
+from bench import synth
+from capture import Capture, CaptureWriter, ReplayStream
+from spectral_parser import decode_frames
+
+FB = synth.HT20_FRAME_BYTES
+
+def _record(prefix, n=1000, reads=((0, 300), (300, 310), (310, 1000)), t0=50.0, dt=0.1, seed=0):
+    # n frames written as one chunk per read, read i stamped t0 + i*dt
+    data = synth.tlv_stream(n, seed=seed); w = CaptureWriter(prefix)
+    for k, (a, b) in enumerate(reads): w.write(data[a * FB:b * FB], t=t0 + k * dt)
+    w.close()
+    return data
+
+def test_index_and_frames(tmp_path):
+    prefix = str(tmp_path / "cap" / "s0"); data = _record(prefix)
+    cap = Capture(prefix)
+    assert len(cap) == 1000 and cap.size == len(data) and (cap.t0, cap.t1) == (50.0, 50.2)
+    assert np.array_equal(cap.index["off"], np.arange(1000) * FB)
+    assert np.array_equal(cap.index["tsf"], decode_frames(data)["HT20"]["tsf"])
+    assert bytes(cap.frames(250, 320)) == data[250 * FB:320 * FB] and bytes(cap.frames(990, 2000)) == data[990 * FB:]
+    assert (cap.seek(50.1), cap.seek_after(50.1), cap.seek(50.05), cap.seek(0), cap.seek_after(99)) == (300, 310, 300, 0, 1000)
+    cap.close()
+
+def test_append_and_torn_index(tmp_path):
+    prefix = str(tmp_path / "s0"); a = _record(prefix, reads=((0, 1000),)); b = _record(prefix, reads=((0, 500),), t0=60.0, seed=1)
+    cap = Capture(prefix)
+    assert len(cap) == 1500 and bytes(cap.frames(0, 1500)) == a + b[:500 * FB] and cap.seek(60.0) == 1000
+    cap.close()
+    with open(prefix + ".tlv", "r+b") as f: f.truncate(1400 * FB + 10)  # crash: the index got ahead of the data
+    cap = Capture(prefix); assert len(cap) == 1401 and cap.offset(len(cap)) == 1400 * FB + 10; cap.close()
+
+def _replay(prefix, **kw):
+    r = ReplayStream(prefix, **kw); out = []
+    while True:
+        mv = r.read()
+        if mv is None:
+            if r.eof: break
+            time.sleep(0.001); continue
+        out.append((bytes(mv), r.t, time.monotonic()))
+    r.close()
+    return out, r
+
+def test_replay_order_and_chunking(tmp_path):
+    prefix = str(tmp_path / "s0"); data = _record(prefix)
+    out, r = _replay(prefix, speed=0, chunk=10 * FB + 5)
+    assert b"".join(o[0] for o in out) == data and all(len(o[0]) <= 10 * FB for o in out)
+    assert r.frames == 1000 and r.bytes == len(data) and [o[1] for o in out] == sorted(o[1] for o in out)
+    out, _ = _replay(prefix, speed=0, start=50.1)
+    assert b"".join(o[0] for o in out) == data[300 * FB:]
+    out, _ = _replay(prefix, speed=0, chunk=1)  # a chunk smaller than a frame still moves one frame at a time
+    assert len(out) == 1000
+
+def test_replay_paces_by_read_time(tmp_path):
+    prefix = str(tmp_path / "s0")
+    data = _record(prefix, reads=tuple((i * 100, (i + 1) * 100) for i in range(10)), dt=0.5)
+    out, _ = _replay(prefix, speed=20.0)  # 4.5 s recorded, ~0.225 s replayed
+    assert b"".join(o[0] for o in out) == data
+    w0 = out[0][2]
+    for _, t, wall in out: assert (t - 50.0) / 20.0 <= wall - w0 + 0.01  # never ahead of the recorded time
+    assert out[-1][2] - w0 >= 4.5 / 20.0 - 0.01
@@ -0,0 +1,50 @@
+import queue
+import pytest
+from bench import synth
+from channel import FakeChannel, Sweep, parse_plan, channel_to_freq
+from multi import SensorReader
+
+class Clock:
+    def __init__(self): self.t = 100.0
+    def __call__(self): return self.t
+
+def test_parse_plan():
+    assert parse_plan("1,6/0.5, 11", bw="HT40+", dwell=0.2) == [(1, "HT40+", 0.2), (6, "HT40+", 0.5), (11, "HT40+", 0.2)]
+    assert parse_plan("36,") == [(36, "HT20", 0.25)]
+    with pytest.raises(ValueError): parse_plan("1,x")
+
+def test_sweep_follows_plan_and_dwell():
+    ctl = FakeChannel(); clk = Clock(); sw = Sweep(ctl, "mon0", parse_plan("1,6/0.5,11", dwell=0.2), clock=clk)
+    sw.start()
+    assert ctl.calls == [("setup", "mon0", 1, "HT20")] and sw.channel == 1
+    hops = []
+    for _ in range(200):  # 2 s in 10 ms polls
+        clk.t += 0.01
+        if sw.step(): hops.append((round(clk.t - 100.0, 2), sw.channel))
+    assert hops[:4] == [(0.2, 6), (0.7, 11), (0.9, 1), (1.1, 6)]  # each channel held for its own dwell
+    assert [c[2] for c in ctl.calls[1:]] == [h[1] for h in hops] and all(c[0] == "tune" for c in ctl.calls[1:])
+    assert sw.retunes == len(hops) and sw.stats()["retune_ms_p50"] is not None and ctl.channel["mon0"] == (sw.channel, "HT20")
+
+def test_sweep_skips_a_rejected_channel():
+    ctl = FakeChannel(fail={6}); clk = Clock(); sw = Sweep(ctl, "mon0", parse_plan("1,6,11", dwell=1.0), clock=clk); sw.start()
+    got = []
+    for _ in range(4):
+        clk.t += 1.0; got.append((sw.step(), sw.channel))
+    assert got == [(False, 6), (True, 11), (True, 1), (False, 6)]  # 6 keeps its slot, the adapter stays on 1
+    assert sw.errors == 2 and "channel 6" in sw.last_error and ctl.channel["mon0"] == (1, "HT20")
+
+def test_sweep_single_channel_and_empty_plan():
+    ctl = FakeChannel(); clk = Clock(); sw = Sweep(ctl, "mon0", [(6, "HT20", 0.1)], clock=clk); sw.start()
+    clk.t += 10.0; assert not sw.step() and len(ctl.calls) == 1
+    with pytest.raises(ValueError): Sweep(ctl, "mon0", [])
+
+def test_reader_sweeps_on_a_fake_adapter(tmp_path):
+    p = tmp_path / "s.bin"; p.write_bytes(synth.tlv_stream(2000, freq=channel_to_freq(11)))
+    q = queue.Queue(); ctl = FakeChannel(latency=0.002)
+    r = SensorReader("s0", "", "mon0", stream=str(p), sweep="1,6,11", dwell=0.0, channel_ctl=ctl, out_queue=q)
+    r.open()
+    while not r.at_eof(): r.poll()
+    r.close()
+    assert ctl.calls[0] == ("setup", "mon0", 1, "HT20") and r.sweep.retunes >= 1 and r.sweep.latency.snapshot()[2] == r.sweep.retunes
+    cols = r.ring.read(0)[0]
+    assert len(cols["t"]) and set(cols["channel"].tolist()) == {11.0}  # samples carry the frames' own channel
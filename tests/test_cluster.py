@@ -0,0 +1,92 @@
+import json, selectors, socket, time
+import numpy as np
+import pytest
+from cluster import Aggregator, NodeStreamer, HDR, MAGIC, VERSION, CLOCK, _Conn, _frames
+from ring import SampleRing, SAMPLE_COLUMNS
+
+def _rows(ring, lo, hi):
+    i = np.arange(lo, hi, dtype=np.float64)
+    cols = {c: np.zeros(hi - lo) for c in SAMPLE_COLUMNS}; cols["t"] = time.time() + i * 1e-3; cols["presence"] = i / 1e4
+    ring.append(cols)
+
+def _wait(cond, timeout=10.0):
+    end = time.time() + timeout
+    while not cond():
+        if time.time() > end: return False
+        time.sleep(0.02)
+    return True
+
+def _got(agg, name):
+    ring = agg.rings.get(name)
+    return ring.read(0)[0]["presence"] if ring is not None else np.empty(0)
+
+def _frame(kind, payload, seq=1):
+    return HDR.pack(MAGIC, VERSION, kind, seq, len(payload), time.time(), 0.0, -1.0) + payload
+
+@pytest.fixture
+def agg():
+    a = Aggregator(host="127.0.0.1", port=0, report_s=3600.0); a.start()
+    yield a
+    a.stop()
+
+@pytest.fixture
+def nodes(agg):
+    rings = {f"n{i}": SampleRing(1 << 14) for i in range(3)}; sts = []
+    for name, ring in rings.items():
+        _rows(ring, 0, 500)
+        st = NodeStreamer(name, {"s0": ring}, "127.0.0.1", agg.port, batch_s=0.01, ping_s=0.1); st.start(); sts.append(st)
+    yield rings, sts
+    for st in sts: st.stop()
+
+def _complete(agg, name, n):
+    return lambda: len(_got(agg, f"{name}/s0")) == n
+
+def test_rows_land_in_node_sensor_rings(agg, nodes):
+    rings, _ = nodes
+    for name in rings: assert _wait(_complete(agg, name, 500)), name
+    for name in rings: assert np.allclose(_got(agg, f"{name}/s0"), np.arange(500) / 1e4)
+    assert set(agg.nodes) == set(rings) and agg.bad_frames == 0
+
+def test_cut_node_resends_backlog(agg, nodes):
+    rings, sts = nodes
+    assert _wait(_complete(agg, "n1", 500))
+    sts[1].sock.shutdown(socket.SHUT_RDWR)  # cut n1; rows written meanwhile wait in its ring
+    _rows(rings["n1"], 500, 2000); _rows(rings["n0"], 500, 800)
+    assert _wait(_complete(agg, "n1", 2000)) and _wait(_complete(agg, "n0", 800))
+    assert np.allclose(_got(agg, "n1/s0"), np.arange(2000) / 1e4)  # nothing lost or repeated across the cut
+    assert sts[1].connects == 2 and agg.nodes["n1"].reconnects == 1
+
+@pytest.mark.parametrize("bad", [
+    _frame(b"H", json.dumps({"node": "evil", "sensors": [], "columns": list(SAMPLE_COLUMNS)}).encode()) + _frame(b"J", b"[1,2]", 2),
+    _frame(b"H", json.dumps({"node": "evil", "sensors": ["s0"], "columns": list(SAMPLE_COLUMNS)}).encode()),
+    _frame(b"H", b"[]"), _frame(b"H", b"{not json")], ids=["side message a list", "sensors as strings", "hello a list", "hello not JSON"])
+def test_bad_frame_drops_only_its_connection(agg, nodes, bad):
+    rings, _ = nodes
+    assert _wait(_complete(agg, "n0", 500))
+    s = socket.create_connection(("127.0.0.1", agg.port)); s.sendall(bad)
+    assert _wait(lambda: agg.bad_frames == 1)
+    assert s.recv(1) == b""  # the aggregator closed this connection...
+    s.close()
+    _rows(rings["n0"], 500, 1000); _rows(rings["n2"], 500, 1000)
+    assert _wait(_complete(agg, "n0", 1000)) and _wait(_complete(agg, "n2", 1000))  # ...and kept serving the rest
+    assert agg._thread.is_alive()
+
+def test_replies_are_never_cut_short():
+    a = Aggregator(); a.sel = selectors.DefaultSelector()
+    mine, peer = socket.socketpair(); mine.setblocking(False)
+    mine.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    c = _Conn(mine, ("peer", 0)); a.sel.register(mine, selectors.EVENT_READ, c)
+    reply = _frame(b"R", CLOCK.pack(1.0, 2.0, 3.0), 0)
+    for _ in range(2000): a._reply(c, reply)  # far more than the send buffer holds
+    assert c.out and c.writing
+    buf = bytearray(); peer.setblocking(False)
+    for _ in range(1000):
+        try: buf += peer.recv(1 << 16)
+        except BlockingIOError: pass
+        if c.out: a._write_tcp(c)
+        elif not c.writing: break
+    try: buf += peer.recv(1 << 16)
+    except BlockingIOError: pass
+    frames = list(_frames(buf))
+    assert not buf and len(frames) >= 1 and all(f[0] == b"R" and CLOCK.unpack(f[5]) == (1.0, 2.0, 3.0) for f in frames)
+    mine.close(); peer.close(); a.sel.close()
@@ -0,0 +1,110 @@
+import json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from events import EventWriter, WebhookSender, _requests
+
+needs_requests = pytest.mark.skipif(not _requests(), reason="requests not installed")
+
+class Stub:
+    """Local webhook: answers POSTs with the scripted status codes (then 200) and keeps the bodies."""
+    def __init__(self, statuses=(), delay=0.0):
+        self.statuses = list(statuses); self.delay = delay; self.bodies = []; stub = self
+        class H(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.bodies.append(body); time.sleep(stub.delay)
+                self.send_response(stub.statuses.pop(0) if stub.statuses else 200); self.send_header("Content-Length", "0"); self.end_headers()
+            def log_message(self, *a): pass
+        self.srv = ThreadingHTTPServer(("127.0.0.1", 0), H)
+        self.url = f"http://127.0.0.1:{self.srv.server_address[1]}/hook"
+        threading.Thread(target=self.srv.serve_forever, daemon=True).start()
+
+    def close(self): self.srv.shutdown(); self.srv.server_close()
+
+@pytest.fixture
+def stub(request):
+    s = Stub(getattr(request, "param", ())); yield s; s.close()
+
+def _wait(cond, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not cond() and time.monotonic() < end: time.sleep(0.01)
+    return cond()
+
+@pytest.mark.parametrize("stub", [(500,)], indirect=True)
+@needs_requests
+def test_5xx_is_retried_then_delivered(stub):
+    w = WebhookSender(stub.url, backoff=0.01); w.start()
+    w.submit([{"type": "zone_change", "zone": "a"}])
+    assert _wait(lambda: w.sent == 1)
+    w.close()
+    assert (w.sent, w.retried, w.failed, w.dropped) == (1, 1, 0, 0)
+    assert stub.bodies == [{"type": "zone_change", "zone": "a"}] * 2
+
+@pytest.mark.parametrize("stub", [(404,)], indirect=True)
+@needs_requests
+def test_4xx_is_not_retried_and_counted_once(stub):
+    w = WebhookSender(stub.url, backoff=0.01); w.start()
+    w.submit([{"type": "zone_change", "zone": "a"}])
+    assert _wait(lambda: w.failed == 1)
+    w.close()
+    assert (w.sent, w.retried, w.failed, w.dropped) == (0, 0, 1, 0)
+    assert len(stub.bodies) == 1
+
+@needs_requests
+def test_batch_posts_a_json_list(stub):
+    w = WebhookSender(stub.url, batch=True)
+    w.submit([{"n": i} for i in range(3)]); w.start()  # queued before the thread runs: one batch
+    assert _wait(lambda: w.sent == 3)
+    w.close()
+    assert stub.bodies == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+
+@needs_requests
+def test_queue_overflow_drops_oldest(stub):
+    w = WebhookSender(stub.url, capacity=2)
+    w.submit([{"n": i} for i in range(5)])
+    assert w.dropped == 3 and [i[0]["n"] for i in w.pending] == [3, 4]
+    w.start(); assert _wait(lambda: w.sent == 2); w.close()
+    assert stub.bodies == [{"n": 3}, {"n": 4}] and w.dropped == 3
+
+@needs_requests
+def test_retry_into_a_full_queue_is_dropped():
+    stub = Stub((500,), delay=0.3)
+    try:
+        w = WebhookSender(stub.url, capacity=1, backoff=0.01); w.start()
+        w.submit([{"n": 0}])
+        assert _wait(lambda: len(stub.bodies) == 1)
+        w.submit([{"n": 1}])  # fills the queue while n=0 is in flight; its retry has no room
+        assert _wait(lambda: w.sent == 1)
+        w.close()
+        assert (w.sent, w.retried, w.failed, w.dropped) == (1, 0, 0, 1)
+        assert stub.bodies == [{"n": 0}, {"n": 1}]
+    finally: stub.close()
+
+def _lines(path):
+    with open(path) as f: return [json.loads(l) for l in f]
+
+def test_unserializable_event_is_counted_and_writer_goes_on(tmp_path):
+    w = EventWriter(str(tmp_path / "ev.jsonl"), echo=False)
+    w.emit("a"); w.emit("bad", value=object()); w.emit("b")
+    assert _wait(lambda: w.written + w.errors == 3)
+    w.emit("c"); w.close()
+    assert [e["type"] for e in _lines(tmp_path / "ev.jsonl")] == ["a", "b", "c"]
+    assert w.stats()["errors"] == 1 and "TypeError" in w.last_error and not w._writer.is_alive()
+
+def test_write_error_keeps_the_writer_alive(tmp_path):
+    import errno
+    w = EventWriter(str(tmp_path / "ev.jsonl"), echo=False); f = w.f
+    class Full:
+        def write(self, s): raise OSError(errno.ENOSPC, "No space left on device")
+    w.f = Full(); w.emit("lost")
+    assert _wait(lambda: w.errors == 1) and w._writer.is_alive()
+    w.f = f; w.emit("kept"); w.close()
+    assert [e["type"] for e in _lines(tmp_path / "ev.jsonl")] == ["kept"] and "No space" in w.last_error
+
+def test_event_behind_the_close_sentinel_ends_the_writer(tmp_path):
+    w = EventWriter(str(tmp_path / "ev.jsonl"), echo=False)
+    w.q.put(None); w._writer.join(2.0)
+    w.q.put({"type": "a"}); w.q.put(None); w.q.put({"type": "late"})  # emit() racing close()
+    t = threading.Thread(target=w._run, daemon=True); t.start(); t.join(2.0)
+    assert not t.is_alive() and w.written == 2
+    w.f.close()
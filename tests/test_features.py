@@ -0,0 +1,26 @@
+import numpy as np
+from features import FEATURE_KEYS, SpectralFeatures
+
+def _reference(v, bins):
+    """One frame the slow way, all in float64 on the float32 bin grid: interpolate, log1p, weighted moments."""
+    grid = lambda n: np.linspace(0.0, 1.0, n, dtype=np.float32).astype(np.float64)
+    x = np.log1p(np.interp(grid(bins), grid(len(v)), np.asarray(v, dtype=np.float64)))
+    w = x + 1e-6; idx = np.arange(bins, dtype=np.float64); c = (idx * w).sum() / w.sum(); b = bins // 3
+    return {"centroid": c, "spread": np.sqrt(((idx - c) ** 2 * w).sum() / w.sum()),
+            "p_lo": w[:b].sum() / w.sum(), "p_mid": w[b:2*b].sum() / w.sum(), "p_hi": w[2*b:].sum() / w.sum()}
+
+def test_batch_is_float64_and_matches_reference():
+    rng = np.random.default_rng(1)
+    for n in (56, 128):  # resampled, and already at target_bins
+        bins = rng.integers(0, 250, (400, n)).astype(np.uint8)
+        out = SpectralFeatures(target_bins=128).update_batch(bins)
+        assert all(out[k].dtype == np.float64 and len(out[k]) == 400 for k in FEATURE_KEYS)
+        for i in (0, 1, 217, 399):
+            ref = _reference(bins[i], 128)
+            assert all(abs(out[k][i] - ref[k]) <= 1e-9 * max(1.0, abs(ref[k])) for k in ref), (n, i)
+
+def test_batch_matches_successive_updates():
+    rng = np.random.default_rng(2); bins = rng.integers(0, 60, (300, 56)).astype(np.uint8)
+    a = SpectralFeatures(history=100, estimator="exact"); b = SpectralFeatures(history=100, estimator="exact")
+    ra = a.update_batch(bins); rb = [b.update(v) for v in bins]
+    assert all(np.allclose(ra[k], [r[k] for r in rb], rtol=1e-9, atol=1e-12) for k in FEATURE_KEYS)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from flow import FlowControl, POLICIES
+from ring import SampleRing, SAMPLE_COLUMNS
+
+def _blocks(n=20000, rate=1000.0, seed=0):
+    rng = np.random.default_rng(seed); i = 0
+    while i < n:
+        k = int(rng.integers(1, 300)); k = min(k, n - i)
+        cols = {c: rng.random(k) for c in SAMPLE_COLUMNS}
+        cols["t"] = (i + np.arange(k)) / rate; cols["frames"] = rng.integers(1, 4, k).astype(np.float64)
+        yield cols; i += k
+
+@pytest.mark.parametrize("policy", POLICIES)
+def test_frames_are_conserved(policy):
+    fc = FlowControl(policy, rate=150.0, n=7, adaptive=False); fin = fout = 0.0; rows_in = rows_out = 0; ts = []
+    for cols in _blocks():
+        fin += cols["frames"].sum(); rows_in += len(cols["t"])
+        out = fc.shape(cols); fout += out["frames"].sum(); rows_out += len(out["t"]); ts.append(out["t"])
+        assert set(out) == set(SAMPLE_COLUMNS) and all(len(v) == len(out["t"]) for v in out.values())
+    pending = fc._owed + (fc._carry["frames"].sum() if fc._carry is not None else 0.0)
+    assert fout + pending == fin  # every frame is in a published sample or still owed to the next one
+    assert rows_in - rows_out == fc.shed_samples + (len(fc._carry["t"]) if fc._carry is not None else 0)
+    t = np.concatenate(ts); assert np.all(np.diff(t) > 0)
+    if policy == "decimate": assert rows_out <= 150.0 * 20.0 + 15
+    if policy == "aggregate": assert rows_out == 20000 // 7
+
+def test_aggregate_summaries():
+    fc = FlowControl("aggregate", n=4, adaptive=False)
+    cols = {c: np.arange(8, dtype=np.float64) for c in SAMPLE_COLUMNS}; cols["presence"] = np.array([0, 9, 1, 2, 3, 4, 8, 5.0])
+    a = fc.shape({c: v[:3] for c, v in cols.items()}); b = fc.shape({c: v[3:] for c, v in cols.items()})  # groups straddle blocks
+    assert len(a["t"]) == 0 and b["t"].tolist() == [3, 7] and b["presence"].tolist() == [9, 8]
+    assert b["p_lo"].tolist() == [1.5, 5.5] and b["frames"].tolist() == [6, 22] and b["channel"].tolist() == [3, 7]
+
+def test_stride_phase_carries_over():
+    fc = FlowControl(adaptive=False); fc.stride = 4; picked = []; base = 0
+    for n in (3, 5, 1, 10, 6):
+        idx = fc.select(n); picked += (base + idx).tolist(); base += n
+    assert picked == list(range(0, 25, 4)) and fc.shed_frames == 25 - len(picked)
+
+def test_adaptive_stride_follows_consumer_lag():
+    ring = SampleRing(1000); fc = FlowControl(max_stride=8)
+    def strides(k):
+        out = []
+        for _ in range(k): fc.update(ring); out.append(fc.stride)
+        return out
+    ring.append({c: np.zeros(900) for c in SAMPLE_COLUMNS}); ring.ack(0)  # consumer 900 rows behind
+    assert strides(4) == [2, 4, 8, 8]
+    ring.ack(300); assert not fc.update(ring) and fc.stride == 8  # between low and high: hold
+    ring.ack(880); assert strides(4) == [4, 2, 1, 1]
+    with pytest.raises(ValueError): FlowControl("bogus")
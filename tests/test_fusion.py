@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from fusion import FusionEngine
+
+SENSORS = [{"name": "a", "label": "kitchen"}, {"name": "b", "label": "kitchen"}, {"name": "c", "label": "hall"}]
+
+def _streams(seconds=60.0, seed=0):
+    """Per sensor: jittered sample times at its own rate and a presence random walk."""
+    rng = np.random.default_rng(seed); out = {}
+    for name, rate in (("a", 20.0), ("b", 7.0), ("c", 13.0)):
+        t = np.cumsum(rng.uniform(0.3, 1.7, int(seconds * rate)) / rate) + rng.uniform(0, 0.5)
+        p = np.clip(0.5 + np.cumsum(rng.normal(0, 0.08, len(t))), 0, 1)
+        out[name] = (t, p)
+    return out
+
+def _arrivals(streams, seed=0, late=0.2):
+    """Blocks of random size, shuffled inside, arriving in order of their last sample plus a
+       lag; a fraction `late` of them lag past the fusion delay."""
+    rng = np.random.default_rng(seed); blocks = []
+    for name, (t, p) in streams.items():
+        i = 0
+        while i < len(t):
+            j = min(i + int(rng.integers(1, 12)), len(t)); o = rng.permutation(j - i) + i
+            lag = rng.uniform(0.6, 2.0) if rng.random() < late else rng.uniform(0, 0.2)
+            blocks.append((t[j-1] + lag, name, t[o], p[o])); i = j
+    blocks.sort(key=lambda b: b[0])
+    return [b[1:] for b in blocks]
+
+class Reference:
+    """Tick by tick with scalars: held value = newest sample that had arrived when the tick
+       was evaluated, zone score = max over its sensors, then per-zone hysteresis."""
+    def __init__(self, fe, sensors, on=0.7, off=0.4, cooldown=0.75, diff_thr=0.1):
+        self.fe = fe; self.zone_of = {s["name"]: s["label"] for s in sensors}; self.zones = fe.zones
+        self.on = on; self.off = off; self.cooldown = cooldown; self.diff_thr = diff_thr
+        self.arrived = {s["name"]: [] for s in sensors}
+        self.occ = {z: False for z in self.zones}; self.changed_at = {z: -np.inf for z in self.zones}; self.best = None
+
+    def held(self, name, g):
+        best = None
+        for t, p in self.arrived[name]:
+            if t <= g and (best is None or t > best[0]): best = (t, p)
+        return 0.0 if best is None or g - best[0] > self.fe.max_age else best[1]
+
+    def ticks(self, G):
+        changes = []; s = None
+        for g in G:
+            s = {z: max(self.held(n, g) for n, zz in self.zone_of.items() if zz == z) for z in self.zones}
+            for z in self.zones:
+                if g - self.changed_at[z] < self.cooldown: continue
+                if not self.occ[z] and s[z] >= self.on: self.occ[z] = True; self.changed_at[z] = g
+                elif self.occ[z] and s[z] < self.off: self.occ[z] = False; self.changed_at[z] = g
+            best = self.best; occupied = [z for z in self.zones if self.occ[z]]
+            if not occupied: best = None
+            else:
+                b = max(occupied, key=lambda z: (s[z], -self.zones.index(z)))
+                if best is None or not self.occ[best] or s[b] >= s[best] + self.diff_thr: best = b
+            if best != self.best: self.best = best; changes.append((g, best))
+        return changes, s
+
+@pytest.mark.parametrize("seed", range(3))
+def test_engine_matches_per_tick_reference(seed):
+    blocks = _arrivals(_streams(seed=seed), seed=seed, late=0.2)
+    fe = FusionEngine(SENSORS); ref = Reference(fe, SENSORS)
+    changes = []; want = []; late = 0
+    for name, t, p in blocks:
+        done = -np.inf if fe.next_k is None else (fe.next_k - 1) * fe.period
+        late += int(np.sum(t <= done))
+        fe.push(name, t, p); ref.arrived[name].extend(zip(t.tolist(), p.tolist()))
+        k0 = fe.next_k; got = fe.step()
+        G = [k * fe.period for k in range(k0, fe.next_k)]
+        exp, s = ref.ticks(G); changes += got; want += exp
+        if G: assert np.allclose(fe.scores, [s[z] for z in fe.zones])  # zone scores at the step's last tick
+    assert late > 0  # some samples did arrive after their tick was evaluated
+    assert len(want) >= 4 and [z for _, z in changes] == [z for _, z in want]
+    assert np.allclose([g for g, _ in changes], [g for g, _ in want])
+
+def test_hysteresis_and_cooldown():
+    fe = FusionEngine([{"name": "a", "label": "kitchen"}, {"name": "c", "label": "hall"}], delay=0.0)
+    def feed(name, t0, t1, p):
+        t = np.arange(round(t0 / 0.05), round(t1 / 0.05)) * 0.05; fe.push(name, t, np.full(len(t), p))
+    feed("a", 0.0, 2.0, 0.5); assert fe.step() == []  # between off and on: stays empty
+    feed("a", 2.0, 3.0, 0.75); ch = fe.step()
+    assert [z for _, z in ch] == ["kitchen"] and np.isclose(ch[0][0], 2.0)
+    feed("a", 3.0, 3.5, 0.45); assert fe.step() == []  # above presence_off: still occupied
+    feed("c", 3.5, 4.0, 0.8); feed("a", 3.5, 4.0, 0.75); assert fe.step() == []  # hall occupied, but not ahead by diff_thr
+    feed("c", 4.0, 5.0, 0.9); feed("a", 4.0, 5.0, 0.1); ch = fe.step()
+    assert [z for _, z in ch] == ["hall"] and np.isclose(ch[0][0], 4.0)  # kitchen drops out (its cooldown ran out long ago)
+    feed("c", 5.0, 5.2, 0.1); ch = fe.step(); feed("c", 5.2, 7.0, 0.1); ch += fe.step()
+    assert [z for _, z in ch] == [None] and np.isclose(ch[0][0], 5.0)
+    feed("c", 7.0, 7.3, 0.1); feed("c", 7.3, 9.0, 0.9); ch = fe.step()
+    assert [z for _, z in ch] == ["hall"] and np.isclose(ch[0][0], 7.3)
+    feed("c", 9.0, 9.3, 0.1); feed("c", 9.3, 11.0, 0.9); ch = fe.step()  # off at 9.0, but back on at the first tick after the 0.75 s cooldown
+    assert [z for _, z in ch] == [None, "hall"] and np.isclose(ch[0][0], 9.0) and np.isclose(ch[1][0], 9.8)
+
+def test_clock_gap_is_capped():
+    fe = FusionEngine(SENSORS, max_ticks=100)
+    fe.push("a", np.arange(10) * 0.1, np.full(10, 0.9)); fe.step()
+    fe.push("c", np.array([1e7]), np.array([0.9]))  # a sensor on another clock
+    fe.step()
+    assert fe.ticks <= 200 and fe.skipped > 9e7 and np.isclose((fe.next_k - 1) * fe.period, 1e7 - fe.delay, atol=fe.period)
+    fe.push("c", 1e7 + np.arange(1, 11) * 0.1, np.full(10, 0.9)); ch = fe.step()
+    assert fe.zone == "hall" and [z for _, z in ch] in ([], ["hall"])
@@ -0,0 +1,33 @@
+from bench import synth
+from multi import SensorReader
+from robust import OrderStatWindow, P2Window, NumpyWindow
+
+def _stream(tmp_path, frames=2000):
+    p = tmp_path / "s.bin"; p.write_bytes(synth.tlv_stream(frames, rate=1000)); return str(p)
+
+def test_sensor_estimator_and_window_from_config(tmp_path):
+    r = SensorReader("s0", "", "", stream=_stream(tmp_path), estimator="exact", window=120)
+    assert isinstance(r.feats.baseline, OrderStatWindow) and r.feats.history == 120
+    r.open()
+    while not r.at_eof(): r.poll()
+    r.close()
+    assert r.feats.count == 2000
+    assert isinstance(r._features(11).baseline, OrderStatWindow)  # later channels get the same engine
+    assert isinstance(SensorReader("s1", "", "", estimator="p2").feats.baseline, P2Window)
+    assert isinstance(SensorReader("s2", "", "").feats.baseline, NumpyWindow)
+
+def test_ioloop_contains_a_failing_reader(tmp_path):
+    import queue, struct, time
+    from multi import IOLoop
+    q = queue.Queue(); path = _stream(tmp_path, 5000)
+    good = SensorReader("good", "", "", stream=path, out_queue=q); bad = SensorReader("bad", "", "", stream=path, out_queue=q)
+    def boom(): raise struct.error("unpack requires a buffer of 12 bytes")
+    bad.poll = boom
+    loop = IOLoop([bad, good]); loop.start()
+    end = time.time() + 5.0
+    while not good.at_eof() and time.time() < end: time.sleep(0.01)
+    loop.stop(); loop.join(2.0)
+    assert good.feats.count == 5000  # the good reader read its whole stream after the bad one failed
+    errors = [m for m in list(q.queue) if m["type"] == "error"]
+    assert [m["sensor"] for m in errors] == ["bad"]
+    assert errors[0]["msg"].startswith("reader stopped:") and "unpack requires" in errors[0]["msg"]
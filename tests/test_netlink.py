@@ -0,0 +1,95 @@
+import struct
+import netlink
+from netlink import Nl80211, Socket, attrs, messages, parse_family, parse_link
+
+# Netlink traffic in the layout the kernel sends (nl80211 family id 0x1c, port id 4242): unknown and
+# nested attributes (NLA_F_NESTED set) included, dumps spread over several recv() buffers.
+# GET_INTERFACE dump, seq 7: wlan0 (managed, 2437 MHz HT20), mon0 (monitor, 5180 MHz 40 MHz wide, center 5190)
+GET_INTERFACE_1 = bytes.fromhex(
+    "880000001c00020007000000921000000701000008000300030000000a000400776c616e300000000800050002000000"
+    "08000100000000000c00990001000000000000000a00060000c0ca123456000008002e004d0000000500e30000000000"
+    "080026008509000008009f00010000000800a00085090000080027000100000008006200d0070000800000001c000200"
+    "0700000092100000070100000800030005000000090004006d6f6e300000000008000500060000000800010001000000"
+    "0c00990001000000010000000a00060000c0ca123456000008002e004d0000000500e30000000000080026003c140000"
+    "08009f00020000000800a0004614000008006200d0070000"
+)
+# ...an nl80211 notification (seq 0), mon1 (2462 MHz HT40-), wlan2 (down, no channel), NLMSG_DONE
+GET_INTERFACE_2 = bytes.fromhex(
+    "280000001c00000000000000000000000701000008000300090000000a000400776c616e39000000880000001c000200"
+    "0700000092100000070100000800030006000000090004006d6f6e310000000008000500060000000800010002000000"
+    "0c00990001000000020000000a00060000c0ca123456000008002e004d0000000500e30000000000080026009e090000"
+    "08009f00020000000800a00094090000080027000200000008006200d0070000680000001c0002000700000092100000"
+    "0701000008000300080000000a000400776c616e32000000080005000200000008000100020000000c00990001000000"
+    "020000000a00060000c0ca123456000008002e004d0000000500e3000000000008006200d00700001400000003000200"
+    "070000009210000000000000"
+)
+# GET_WIPHY dump, seq 8: phy0, then phy1 split over two messages (only the first carries the name)...
+GET_WIPHY_1 = bytes.fromhex(
+    "540000001c000200080000009210000003010000080001000000000009000200706879300000000008002e004d000000"
+    "24001680200000801c0001800c000180080001006c0900000c0002800800010071090000300000001c00020008000000"
+    "9210000003010000080001000100000009000200706879310000000008002e004d000000"
+)
+# ...the rest of phy1 and NLMSG_DONE
+GET_WIPHY_2 = bytes.fromhex(
+    "480000001c000200080000009210000003010000080001000100000008002e004d00000024001680200000801c000180"
+    "0c000180080001006c0900000c00028008000100710900001400000003000200080000009210000000000000"
+)
+# CTRL_CMD_GETFAMILY "nl80211", seq 1: the NEWFAMILY reply (ops, six multicast groups) and the ACK
+GETFAMILY = bytes.fromhex(
+    "ec000000100000000100000092100000010200000c0002006e6c383032313100060001001c0000000800030001000000"
+    "0800040000000000080005004201000018000680140001800800010001000000080002000e0000009400078018000180"
+    "08000200050000000b000100636f6e6669670000180002800800020006000000090001007363616e000000001c000380"
+    "08000200070000000f000100726567756c61746f72790000180004800800020008000000090001006d6c6d6500000000"
+    "1800058008000200090000000b00010076656e646f72000014000680080002000a000000080001006e616e0024000000"
+    "0200000101000000921000000000000020000000100005000100000000000000"
+)
+# rtnetlink RTMGRP_LINK events: RTM_NEWLINK mon0 (index 5), RTM_DELLINK mon1 (index 6)
+LINK_EVENTS = bytes.fromhex(
+    "60000000100000000000000000000000000023030500000043100100ffffffff090003006d6f6e300000000008000d00"
+    "e8030000080004000809000005001000060000000a00010000c0ca12345600001000128009000100776c616e00000000"
+    "34000000110000000000000000000000000023030600000002100000ffffffff090003006d6f6e310000000008000400"
+    "08090000"
+)
+
+class _Replay:
+    """Stands in for the kernel end of a netlink socket: recv() returns recorded buffers."""
+    def __init__(self, *bufs): self.bufs = list(bufs); self.sent = []
+    def send(self, b): self.sent.append(b); return len(b)
+    def recv(self, n): return self.bufs.pop(0)
+
+def _nl(*bufs, seq):
+    nl = Nl80211.__new__(Nl80211); nl.family = 0x1c
+    nl.sock = Socket.__new__(Socket); nl.sock.sock = _Replay(*bufs); nl.sock.seq = seq - 1
+    return nl
+
+def test_messages_split_and_done():
+    got = [(typ, flags, seq) for typ, flags, seq, _ in messages(GET_INTERFACE_2)]
+    assert got == [(0x1c, 0, 0), (0x1c, 2, 7), (0x1c, 2, 7), (netlink.NLMSG_DONE, 2, 7)]
+    assert len(list(messages(GET_INTERFACE_1[:-8]))) == 1  # a cut-off message is not yielded
+
+def test_get_interface_dump():
+    nl = _nl(GET_INTERFACE_1, GET_INTERFACE_2, seq=7)
+    got = nl.interfaces()
+    typ, flags, seq = struct.unpack_from("=HHI", nl.sock.sock.sent[0], 4)
+    assert (typ, flags, seq) == (0x1c, netlink.NLM_F_REQUEST | netlink.NLM_F_DUMP, 7) and nl.sock.sock.sent[0][16] == netlink.NL80211_CMD_GET_INTERFACE
+    assert [(i["iface"], i["ifindex"], i["wiphy"], i["type"]) for i in got] == [("wlan0", 3, 0, "managed"), ("mon0", 5, 1, "monitor"), ("mon1", 6, 2, "monitor"), ("wlan2", 8, 2, "managed")]
+    assert [(i["freq"], i["channel"], i["bw"]) for i in got] == [(2437, 6, "HT20"), (5180, 36, "HT40+"), (2462, 11, "HT40-"), (None, None, "HT20")]
+    assert {i["cmd"] for i in got} == {netlink.NL80211_CMD_NEW_INTERFACE}
+
+def test_dump_spread_over_reads():
+    # a GET_WIPHY dump: the request collects every part of seq 8 up to NLMSG_DONE
+    s = Socket.__new__(Socket); s.sock = _Replay(GET_WIPHY_1, GET_WIPHY_2); s.seq = 7
+    got = s.request(0x1c, b"", netlink.NLM_F_REQUEST | netlink.NLM_F_DUMP)
+    assert [(netlink._u32(a, 1), netlink._str(a, 2)) for a in (attrs(p, netlink.GENL_HDR.size) for p in got)] == [(0, "phy0"), (1, "phy1"), (1, None)]
+    assert 22 in attrs(got[0], netlink.GENL_HDR.size) and s.sock.bufs == []  # nested attribute found, both reads consumed
+
+def test_getfamily():
+    (typ, _, _, reply), (ack, _, _, _) = messages(GETFAMILY)
+    assert (typ, ack) == (netlink.GENL_ID_CTRL, netlink.NLMSG_ERROR)
+    assert parse_family(reply) == (0x1c, {"config": 5, "scan": 6, "regulatory": 7, "mlme": 8, "vendor": 9, "nan": 10})
+    s = Socket.__new__(Socket); s.sock = _Replay(GETFAMILY); s.seq = 0
+    assert s.request(netlink.GENL_ID_CTRL, b"") == [reply]  # the ACK ends the request
+
+def test_link_events():
+    got = [parse_link(typ, p) for typ, _, _, p in messages(LINK_EVENTS)]
+    assert got == [("new", 5, "mon0"), ("del", 6, "mon1")]
@@ -0,0 +1,26 @@
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from plotting import Waterfall
+
+def _waterfall(rows=40, bins=16):
+    fig = Figure(figsize=(4, 3), dpi=50); FigureCanvasAgg(fig)
+    return fig, Waterfall(fig, ["a", "b"], rows=rows, bins=bins)
+
+def test_draw_maps_in_place():
+    fig, w = _waterfall(); rng = np.random.default_rng(0)
+    rgba = {n: im.get_array() for n, im in w.images.items()}
+    for k in range(5):
+        block = rng.random((7, 16)).astype(np.float32) * (k + 1)
+        w.push("a", block); w.draw()
+        assert all(im.get_array() is rgba[n] for n, im in w.images.items())
+    view = w.bufs["a"][w.pos["a"]:w.pos["a"] + w.rows]; lo, hi = w.clim["a"]
+    idx = np.clip((view - lo) * (255.0 / max(hi - lo, 1e-3)), 0, 255).astype(np.uint8)
+    assert np.array_equal(rgba["a"], w.lut[idx]) and np.array_equal(view[0], block[-1])  # newest on top
+
+def test_redraw_shows_new_rows():
+    fig, w = _waterfall(); fig.canvas.draw()
+    w.push("a", np.tile(np.linspace(0, 1, 16, dtype=np.float32), (40, 1))); w.draw()
+    before = np.asarray(fig.canvas.buffer_rgba()).copy()
+    w.push("a", np.tile(np.linspace(1, 0, 16, dtype=np.float32), (40, 1))); w.draw()
+    assert not np.array_equal(before, np.asarray(fig.canvas.buffer_rgba()))
@@ -0,0 +1,68 @@
+import socket, struct
+import pytest
+import radiotap
+from radiotap import PacketCapture, PACKET_STATISTICS, SOL_PACKET
+
+class _Sock:
+    """getsockopt(PACKET_STATISTICS) as the kernel answers it: tpacket_stats without a ring."""
+    def __init__(self, st): self.st = st
+    def getsockopt(self, level, opt, n):
+        assert (level, opt) == (SOL_PACKET, PACKET_STATISTICS); return self.st[:n]
+
+def test_stats_without_ring():
+    cap = PacketCapture.__new__(PacketCapture); cap.ring = None; cap.sock = _Sock(struct.pack("<II", 120, 7))
+    assert cap.stats() == (120, 7)
+    cap.sock = _Sock(struct.pack("<III", 120, 7, 1))  # tpacket_stats_v3 on a TPACKET_V3 socket
+    assert cap.stats() == (120, 7)
+
+def test_stats_on_loopback(monkeypatch):
+    def no_ring(*a, **k): raise OSError("no ring")
+    for ring in (True, False):
+        if not ring: monkeypatch.setattr(radiotap.mmap, "mmap", no_ring)  # take the recv() fallback
+        try: cap = PacketCapture("lo")
+        except OSError as e: pytest.skip(f"no AF_PACKET here: {e}")
+        try:
+            if not ring: assert cap.ring is None
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM); s.sendto(b"x", ("127.0.0.1", 9)); s.close()
+            pk, dr = cap.stats()
+            assert pk >= 1 and dr >= 0
+        finally: cap.close()
+
+TA = bytes.fromhex("00c0ca123456")
+DATA = bytes.fromhex("0801 0000 ffffffffffff") + TA + TA + bytes.fromhex("1000") + bytes(8)  # 802.11 data frame from TA
+# radiotap headers with known fields
+RT_FULL = bytes.fromhex("00 00 1800 6f000000"    # TSFT, flags, rate, channel, dBm signal, dBm noise
+                        "0807060504030201"      # TSFT
+                        "10 0c 8509 a000"       # flags (FCS at end), 6 Mb/s, 2437 MHz, 2 GHz OFDM
+                        "d6 a1")                # -42 dBm, -95 dBm
+RT_EXT = bytes.fromhex("00 00 1300 2a000080 00000000"  # flags, channel, signal + a second present word
+                       "00 00 3c14 4001 c4")           # flags, pad, 5180 MHz, -60 dBm
+RT_BADFCS = RT_FULL[:16] + b"\x50" + RT_FULL[17:]
+ACK = bytes.fromhex("d400 0000") + TA + bytes(4)
+
+def test_parse_known_headers():
+    assert radiotap.parse(RT_FULL + DATA) == (-42, -95, 6.0, 2437, TA)
+    assert radiotap.parse(RT_EXT + DATA) == (-60, None, None, 5180, TA)
+    assert radiotap.parse(RT_FULL + ACK) == (-42, -95, 6.0, 2437, None)  # control frame: no transmitter address
+    assert radiotap.parse(RT_FULL) == (-42, -95, 6.0, 2437, None)
+    assert radiotap.parse(RT_BADFCS + DATA) is None
+    assert radiotap.parse(b"\x01" + RT_FULL[1:] + DATA) is None and radiotap.parse(RT_FULL[:20]) is None
+
+def test_pcap_round_trip(tmp_path):
+    pkts = [(1.7e9 + 0.000125 * i, (RT_FULL, RT_EXT)[i % 2] + DATA) for i in range(50)] + [(1.7e9 + 1.0, RT_BADFCS + DATA)]
+    path = str(tmp_path / "rt.pcap"); radiotap.write_pcap(path, pkts)
+    r = radiotap.PcapReader(path, chunk=37); got = []  # records straddle reads
+    while not r.eof: got += r.read()
+    r.close()
+    assert [p for _, p in got] == [p for _, p in pkts] and r.packets == 51
+    assert max(abs(a[0] - b[0]) for a, b in zip(got, pkts)) < 1e-6
+    parsed = [radiotap.parse(p) for _, p in got]
+    assert parsed[:2] == [(-42, -95, 6.0, 2437, TA), (-60, None, None, 5180, TA)] and parsed[-1] is None
+
+def test_pcap_big_endian_nanoseconds(tmp_path):
+    path = tmp_path / "be.pcap"; pkt = RT_FULL + DATA
+    path.write_bytes(struct.pack(">IHHiIII", 0xa1b23c4d, 2, 4, 0, 0, 65535, 127) + struct.pack(">IIII", 100, 250, len(pkt), len(pkt)) + pkt)
+    r = radiotap.PcapReader(str(path)); (ts, p), = r.read(); r.close()
+    assert ts == 100 + 250e-9 and radiotap.parse(p)[0] == -42
+    (tmp_path / "eth.pcap").write_bytes(struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1))
+    with pytest.raises(ValueError): radiotap.PcapReader(str(tmp_path / "eth.pcap"))
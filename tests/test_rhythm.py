@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from features import SlidingDFT, SpectralFeatures, BREATH_CONF
+
+def _ticks(x, tick=0.1, per=1, seed=0):
+    # `per` frames per tick at jittered times inside it, averaging to the tick's value
+    rng = np.random.default_rng(seed); n = len(x)
+    t = ((np.arange(n)[:, None] + np.sort(rng.uniform(0.01, 0.99, (n, per)), axis=1)) * tick).ravel()
+    noise = rng.normal(0, 0.1, (n, per, x.shape[1])); noise -= noise.mean(axis=1, keepdims=True)
+    return t, (x[:, None, :] + noise).reshape(n * per, -1)
+
+def _feed(d, t, E, seed=0):
+    rng = np.random.default_rng(seed); i = 0; out = []
+    while i < len(t):
+        k = int(rng.integers(1, 50)); out.append(d.update(t[i:i+k], E[i:i+k])); i += k
+    return np.concatenate(out)
+
+def _fft(d, x):
+    # DFT of the last N closed ticks (the newest tick is still open), at the tracked bins
+    return np.fft.fft(x[:-1][-d.N:], axis=0)[d.k].T
+
+@pytest.mark.parametrize("per", [1, 5])
+def test_matches_fft_of_the_window(per):
+    x = np.random.default_rng(1).random((700, 3)); d = SlidingDFT(bands=3, window=8.0, r=1.0)
+    _feed(d, *_ticks(x, per=per))
+    assert np.allclose(d.X, _fft(d, x), atol=1e-9)
+
+def test_damped_recursion_stays_close():
+    x = np.random.default_rng(2).random((20000, 4)); d = SlidingDFT(bands=4, window=32.0)
+    _feed(d, *_ticks(x))
+    F = _fft(d, x); assert np.abs(d.X - F).max() < 0.01 * np.abs(F).max()  # r**N damping only
+
+def test_skipped_ticks_hold_the_last_value():
+    x = np.random.default_rng(3).random((300, 2)); d = SlidingDFT(bands=2, window=4.0, r=1.0)
+    keep = np.ones(300, bool); keep[[100, 101, 102, 250]] = False  # no frames in these ticks (gap < `gap`)
+    t, E = _ticks(x); _feed(d, t[keep], E[keep])
+    held = x.copy()
+    for i in np.flatnonzero(~keep): held[i] = held[i - 1]
+    assert np.allclose(d.X, _fft(d, held), atol=1e-9)
+
+def test_breathing_rate_and_confidence():
+    n = 600; tt = np.arange(n) * 0.1
+    sine = 1.0 + 0.3 * np.sin(2 * np.pi * 0.25 * tt)[:, None] * np.ones((1, 4))
+    d = SlidingDFT(); out = _feed(d, *_ticks(sine, per=3))
+    assert abs(out[-1, 0] - 0.25) < 0.02 and out[-1, 2] > BREATH_CONF and out[-1, 1] > 0
+    flat = SlidingDFT(); assert _feed(flat, *_ticks(np.ones((n, 4)), per=3))[-1].tolist() == [0.0, 0.0, 0.0]
+    d.update(np.array([1.0]), np.ones((1, 4)))  # time went backwards (TSF reset): start over
+    assert d.n == 0 and d.out.tolist() == [0.0, 0.0, 0.0]
+
+def test_spectral_features_rhythm_columns():
+    rng = np.random.default_rng(4); n = 4000; t = np.arange(n) * 0.01
+    bins = (20 + 10 * (1 + np.sin(2 * np.pi * 0.3 * t))[:, None] + rng.normal(0, 1, (n, 56))).clip(0, 255).astype(np.uint8)
+    f = SpectralFeatures(rhythm={"window": 16.0}); out = f.update_batch(bins, t)
+    assert abs(np.median(out["motion_hz"][-500:]) - 0.3) < 0.03 and np.median(out["breath_conf"][-500:]) > BREATH_CONF
+    assert np.all(SpectralFeatures().update_batch(bins)["breath_conf"] == 0)  # no frame times: no rhythm
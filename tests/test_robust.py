@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from robust import NumpyWindow, OrderStatWindow, P2Window, make_estimator
+
+WINDOW = 300
+N = 3000
+BLOCKS = (1, 7, 64, 300, 2, 513)  # reader reads hand out blocks of every size
+
+def _inputs():
+    rng = np.random.default_rng(1)
+    return {"random": rng.normal(5.0, 1.0, N), "constant": np.full(N, 3.0),
+            "step": np.r_[rng.normal(2.0, 0.3, N // 2), rng.normal(6.0, 0.3, N - N // 2)]}
+
+def _run(est, E, blocks=BLOCKS):
+    base = []; mad = []; i = 0; k = 0
+    while i < len(E):
+        b, m = est.update_batch(E[i:i + blocks[k % len(blocks)]]); i += blocks[k % len(blocks)]; k += 1
+        base.append(b); mad.append(m)
+    return np.concatenate(base), np.concatenate(mad)
+
+@pytest.mark.parametrize("name", ["random", "constant", "step"])
+def test_exact_matches_numpy(name):
+    E = _inputs()[name]
+    nb, nm = _run(NumpyWindow(WINDOW), E)
+    eb, em = _run(OrderStatWindow(WINDOW), E, blocks=(5, 333, 1, 40))
+    np.testing.assert_allclose(eb, nb, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(em, nm, rtol=1e-6, atol=1e-6)
+
+@pytest.mark.parametrize("name", ["random", "constant", "step"])
+def test_p2_within_bound(name):
+    # P2 statistics cover the last window/2..window frames; once a full window has passed
+    # (since the start, or since the step) the baseline is within 0.5 MAD of the exact one
+    # and the MAD within 25%
+    E = _inputs()[name]
+    nb, nm = _run(NumpyWindow(WINDOW), E)
+    pb, pm = _run(P2Window(WINDOW), E)
+    settled = np.r_[WINDOW:N // 2, N // 2 + WINDOW:N] if name == "step" else np.arange(WINDOW, N)
+    scale = np.maximum(nm[settled], 1e-3)
+    assert np.max(np.abs(pb - nb)[settled] / scale) <= 0.5
+    assert np.max(np.abs(pm - nm)[settled] / scale) <= 0.25
+
+def test_numpy_block_sizes_agree():
+    E = _inputs()["random"]
+    one = _run(NumpyWindow(WINDOW), E, blocks=(1,)); big = _run(NumpyWindow(WINDOW), E, blocks=(N,))
+    np.testing.assert_allclose(one[0], big[0]); np.testing.assert_allclose(one[1], big[1])
+
+@pytest.mark.parametrize("kind", ["numpy", "exact", "p2"])
+@pytest.mark.parametrize("cut", [10, 150, 1234])  # before the window fills, mid-window, long after
+def test_state_round_trip(kind, cut):
+    E = _inputs()["random"][:2000]
+    a = make_estimator(kind, WINDOW); _run(a, E[:cut])
+    b = make_estimator(kind, WINDOW); b.load_state(a.state())
+    ra = _run(a, E[cut:]); rb = _run(b, E[cut:])
+    np.testing.assert_array_equal(ra[0], rb[0]); np.testing.assert_array_equal(ra[1], rb[1])
+
+def test_unknown_estimator():
+    with pytest.raises(ValueError): make_estimator("median-of-medians")
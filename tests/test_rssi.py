@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from features import RSSIFeatures, FEATURE_KEYS
+
+def _mac(i): return bytes([2, 0, 0, 0, i >> 8, i & 0xff])
+
+def test_table_is_bounded_and_lru():
+    f = RSSIFeatures(capacity=4)
+    f.update_batch([_mac(i) for i in range(6)], [-50.0] * 6)  # 0 and 1 evicted
+    assert len(f) == 4 and f.evictions == 2 and list(f.slots) == [_mac(i) for i in range(2, 6)]
+    f.update_batch([_mac(2), _mac(6)], [-50.0, -50.0])  # 2 heard again, so 3 is the oldest now
+    assert list(f.slots) == [_mac(4), _mac(5), _mac(2), _mac(6)] and f.evictions == 3
+    f.update_batch([_mac(i % 1000) for i in range(50000)], np.full(50000, -60.0))
+    assert len(f) == 4 and len(f.mean) == 4 and sorted(f.slots.values()) == [0, 1, 2, 3]  # memory fixed by capacity
+
+def test_evicted_link_starts_cold():
+    f = RSSIFeatures(capacity=2, warmup=5)
+    f.update_batch([_mac(0)] * 10, [-50.0] * 10); assert f.n[f.slots[_mac(0)]] == 10
+    f.update_batch([_mac(1), _mac(2), _mac(0)], [-50.0] * 3)
+    assert f.n[f.slots[_mac(0)]] == 1
+
+def test_disturbed_link_scores_presence():
+    rng = np.random.default_rng(0); f = RSSIFeatures(warmup=50)
+    idx, quiet = f.update_batch([_mac(0)] * 2000, -50 + rng.normal(0, 0.5, 2000))
+    assert set(quiet) == set(FEATURE_KEYS) and idx[0] == 50 and len(idx) == 1950  # samples only once the link is stable
+    _, moving = f.update_batch([_mac(0)] * 500, -50 + rng.normal(0, 4.0, 500))
+    assert np.median(quiet["presence"][-500:]) < 0.2 and np.median(moving["presence"]) > 0.8
+    assert np.median(moving["motion"]) > np.median(quiet["motion"][-500:])
+    _, noisy = RSSIFeatures(warmup=50).update_batch([_mac(1)] * 500, -50 + rng.normal(0, 8.0, 500))
+    assert len(noisy["presence"]) == 0  # never stable: no samples
+
+def test_state_round_trip():
+    rng = np.random.default_rng(1); macs = [_mac(int(i)) for i in rng.integers(0, 20, 3000)]; x = -60 + rng.normal(0, 1, 3000)
+    a = RSSIFeatures(capacity=16); a.update_batch(macs[:2000], x[:2000])
+    b = RSSIFeatures(capacity=16); b.load_state(a.state())
+    ia, fa = a.update_batch(macs[2000:], x[2000:]); ib, fb = b.update_batch(macs[2000:], x[2000:])
+    assert np.array_equal(ia, ib) and all(np.allclose(fa[k], fb[k]) for k in FEATURE_KEYS)
+    small = RSSIFeatures(capacity=4); small.load_state(a.state())
+    assert list(small.slots) == list(a.slots)[-4:]  # the most recently heard links
+    with pytest.raises(ValueError): RSSIFeatures(alpha=0.2).load_state(a.state())
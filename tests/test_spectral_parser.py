@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from bench import synth
+from spectral_parser import TLV_HDR, tlv_runs
+
+def _walk(raw):
+    """One header at a time, runs merged afterwards: what tlv_runs must agree with."""
+    i = 0; runs = []
+    while i + TLV_HDR.size <= len(raw):
+        typ, ln = TLV_HDR.unpack_from(raw, i)
+        if ln <= 0: return runs, i, False
+        if i + TLV_HDR.size + ln > len(raw): break
+        if runs and runs[-1][:2] == (typ, ln) and runs[-1][2] + runs[-1][3] * (TLV_HDR.size + ln) == i + TLV_HDR.size:
+            runs[-1] = runs[-1][:3] + (runs[-1][3] + 1,)
+        else: runs.append((typ, ln, i + TLV_HDR.size, 1))
+        i += TLV_HDR.size + ln
+    return runs, i, i < len(raw)
+
+def _variable(n, seed=0):
+    # runs of random length (1..40 TLVs) with random types and payload lengths
+    rng = np.random.default_rng(seed); out = []; left = n
+    while left > 0:
+        k = min(left, int(rng.integers(1, 41))); typ = int(rng.integers(1, 4)); ln = int(rng.integers(1, 200))
+        out.append((TLV_HDR.pack(typ, ln) + bytes(rng.integers(0, 256, ln, dtype=np.uint8))) * k); left -= k
+    return b"".join(out)
+
+@pytest.mark.parametrize("raw", [
+    synth.tlv_stream(3000), synth.mixed_stream(3000, ht40_every=2), synth.mixed_stream(3000, ht40_every=7),
+    _variable(3000), synth.tlv_stream(300)[:-17], synth.tlv_stream(50) + TLV_HDR.pack(1, 0) + synth.tlv_stream(5), b""],
+    ids=["ht20", "alternating", "mixed", "variable", "cut off", "zero length", "empty"])
+def test_tlv_runs_match_a_header_walk(raw):
+    assert tlv_runs(raw) == _walk(raw)
@@ -0,0 +1,142 @@
+"""Stream profiler for Test mode: what an adapter's spectral_scan stream actually delivers.
+
+    python tlvprofile.py /sys/kernel/debug/ieee80211/phy0/ath9k_htc/spectral_scan0 --seconds 30 --out report.json
+
+Works on the TLV runs of each read (tlv_runs, the header walk TLVStream already does)
+plus the 8 TSF bytes of every frame, read through a strided view; payloads are never
+decoded. Per stream it keeps a frame-type histogram, TLVs of unknown type or shorter
+than their record, an inter-frame TSF spacing histogram and gaps in the TSF sequence:
+a spacing over `gap_factor` times the typical (running 95th percentile) spacing is a gap,
+and the frames it stands for are estimated from the mean spacing outside gaps, which
+includes the pauses between scan bursts. A negative or very long step (TSF reset,
+another adapter) is counted as a reset instead. snapshot() is a small JSON-able dict;
+report() bundles snapshots with adapter details (driver, USB port) for comparing
+adapters and ports.
+"""
+import argparse, json, os, platform, time
+from collections import deque
+import numpy as np
+from spectral_parser import FRAME_DTYPES, TSF_OFFSET, TLV_HDR, tlv_runs
+from spectral_io import TLVStream
+
+SPACING_US = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 1000000)  # bucket upper bounds
+
+class StreamProfiler:
+    def __init__(self, gap_factor=4.0, min_gap_us=1000, reset_us=10_000_000):
+        self.gap_factor = float(gap_factor); self.min_gap_us = int(min_gap_us); self.reset_us = int(reset_us)
+        self.types = {}; self.unknown = 0; self.short = 0; self.frames = 0
+        self.hist = np.zeros(len(SPACING_US) + 1, dtype=np.int64)
+        self.dt_sum = 0; self.dt_n = 0; self.dt_min = None; self.dt_max = 0  # spacings outside gaps, us
+        self.typical = None; self.last_tsf = None
+        self.gaps = 0; self.gap_us = 0; self.dropped = 0; self.resets = 0
+        self.recent_gaps = deque(maxlen=20)  # (tsf, spacing us, frames missing)
+        self.t0 = time.time()
+
+    def feed(self, raw, runs=None):
+        """Account for the complete TLVs of `raw`; `runs`: its tlv_runs() if already known."""
+        if runs is None: runs = tlv_runs(raw)[0]
+        parts = []
+        for typ, ln, off, k in runs:
+            spec = FRAME_DTYPES.get(typ); name = spec[0] if spec else f"type{typ}"
+            self.types[name] = self.types.get(name, 0) + k; self.frames += k
+            if spec is None: self.unknown += k; continue
+            if ln < spec[1].itemsize: self.short += k
+            to = TSF_OFFSET[typ]
+            if ln >= to + 8: parts.append(np.ndarray((k,), dtype=">u8", buffer=raw, offset=off + to, strides=(TLV_HDR.size + ln,)))
+        if not parts: return
+        tsf = (np.concatenate(parts) if len(parts) > 1 else parts[0]).astype(np.int64)
+        d = np.diff(tsf, prepend=tsf[0] if self.last_tsf is None else self.last_tsf)
+        if self.last_tsf is None: d = d[1:]
+        self.last_tsf = int(tsf[-1])
+        if not len(d): return
+        at = np.arange(len(tsf) - len(d), len(tsf))  # d[i] is the step into frame at[i]
+        ok = (d >= 0) & (d <= self.reset_us); self.resets += int(len(d) - ok.sum()); d = d[ok]; at = at[ok]
+        if not len(d): return
+        p95 = float(np.percentile(d, 95))
+        self.typical = p95 if self.typical is None else 0.9 * self.typical + 0.1 * p95
+        gap = d > max(self.gap_factor * self.typical, self.min_gap_us)
+        self.hist += np.bincount(np.searchsorted(SPACING_US, d), minlength=len(self.hist))
+        normal = d[~gap]
+        if len(normal):
+            self.dt_sum += int(normal.sum()); self.dt_n += len(normal); self.dt_max = max(self.dt_max, int(normal.max()))
+            m = int(normal.min()); self.dt_min = m if self.dt_min is None else min(self.dt_min, m)
+        if gap.any():
+            g = d[gap]; mean = self.dt_sum / self.dt_n if self.dt_n else float(g.min())
+            miss = np.maximum(np.rint(g / max(mean, 1.0)) - 1, 0).astype(np.int64)
+            self.gaps += len(g); self.gap_us += int(g.sum()); self.dropped += int(miss.sum())
+            keep = self.recent_gaps.maxlen
+            for i, us, k in zip(at[gap][-keep:].tolist(), g[-keep:].tolist(), miss[-keep:].tolist()):
+                self.recent_gaps.append((int(tsf[i]), us, k))
+
+    def quantile(self, q):
+        """Upper bucket bound (us) holding the q-quantile of the TSF spacing; None if empty."""
+        n = int(self.hist.sum())
+        if not n: return None
+        i = int(np.searchsorted(np.cumsum(self.hist), q * n))
+        return SPACING_US[i] if i < len(SPACING_US) else float("inf")
+
+    def snapshot(self, stream=None):
+        """Counters so far, plus the reader-side ones of `stream` (a TLVStream) when given."""
+        s = {"elapsed_s": time.time() - self.t0, "frames": self.frames, "types": dict(self.types),
+             "unknown_type": self.unknown, "short_payload": self.short,
+             "spacing_us": {"mean": self.dt_sum / self.dt_n if self.dt_n else None, "min": self.dt_min, "max": self.dt_max,
+                            "p50": self.quantile(0.5), "p99": self.quantile(0.99), "typical": self.typical,
+                            "buckets": list(SPACING_US), "counts": self.hist.tolist()},
+             "gaps": self.gaps, "gap_ms": self.gap_us / 1e3, "dropped_est": self.dropped,
+             "drop_pct": 100.0 * self.dropped / (self.frames + self.dropped) if self.frames + self.dropped else 0.0,
+             "tsf_resets": self.resets, "recent_gaps": [list(g) for g in self.recent_gaps]}
+        if stream is not None:
+            st = stream.stats()
+            s.update({"bytes": st["bytes"], "carries": st["carries"], "malformed": st["malformed"], "skipped_bytes": st.get("skipped", 0),
+                      "truncated_tail": getattr(stream, "pending", 0) if stream.eof else 0})
+        return s
+
+def adapter_info(phy):
+    """Driver and bus location of a wiphy (USB port such as "1-2"), for telling adapters and ports apart."""
+    info = {"phy": phy}
+    if not phy: return info
+    dev = os.path.realpath(f"/sys/class/ieee80211/{phy}/device")
+    if not os.path.exists(dev): return info
+    info["device"] = dev
+    drv = os.path.join(dev, "driver")
+    if os.path.exists(drv): info["driver"] = os.path.basename(os.path.realpath(drv))
+    usb = [p for p in dev.split("/") if p[:1].isdigit() and "-" in p and ":" not in p]
+    if usb: info["usb_port"] = usb[-1]
+    try:
+        with open(os.path.join(dev, "..", "speed")) as f: info["usb_speed_mbps"] = float(f.read())
+    except (OSError, ValueError): pass
+    return info
+
+def report(profiles, sensors=(), **meta):
+    """JSON-able report: {name: snapshot} plus each sensor's config and adapter details."""
+    cfg = {s["name"]: s for s in sensors}
+    return {"time": time.time(), "host": platform.node(), **meta,
+            "sensors": {name: {"config": {k: v for k, v in cfg.get(name, {}).items() if isinstance(v, (str, int, float, type(None)))},
+                               "adapter": adapter_info(cfg.get(name, {}).get("phy")), "profile": p}
+                        for name, p in profiles.items()}}
+
+def write_report(path, rep):
+    d = os.path.dirname(path)
+    if d: os.makedirs(d, exist_ok=True)
+    with open(path, "w") as f: json.dump(rep, f, indent=1)
+    return path
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Profile a spectral_scan stream (file, FIFO or debugfs)")
+    ap.add_argument("path"); ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--phy", help="wiphy of the adapter, for the report"); ap.add_argument("--out", help="write the JSON report here")
+    a = ap.parse_args(argv)
+    prof = StreamProfiler(); end = time.monotonic() + a.seconds
+    with open(a.path, "rb", buffering=0) as f:
+        stream = TLVStream(f)
+        while time.monotonic() < end:
+            chunk = stream.read()
+            if chunk is not None: prof.feed(chunk, stream.runs)
+            elif stream.eof and not a.path.startswith("/sys/"): break
+            else: time.sleep(0.01)
+    rep = report({"stream": prof.snapshot(stream)}, [{"name": "stream", "phy": a.phy, "path": a.path}])
+    if a.out: write_report(a.out, rep)
+    print(json.dumps(rep, indent=1))
+
+if __name__ == "__main__":
+    main()
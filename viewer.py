@@ -0,0 +1,154 @@
+import json, os, queue, selectors, socket, struct, threading, time
+import numpy as np
+from ring import SampleRing
+
+# Local viewer protocol between the headless daemon (radard.py) and GUIs attached to it,
+# over a Unix stream socket. Every message is a 5-byte header (kind, payload length)
+# followed by the payload:
+#   b"H"  hello, JSON: {"sensors": [...], "columns": [...], "config": {...}}; sent first
+#   b"S"  samples: u8 name length, name, u32 rows, then a (columns, rows) float64 block
+#   b"J"  a side-channel message (zone_change, error, shed, ...), JSON
+# The daemon never waits for a viewer: each client has a bounded send buffer, and a
+# client that lets it fill up is disconnected.
+
+DEFAULT_SOCKET = "captures/radard.sock"
+MSG = struct.Struct("<cI")
+_ROWS = struct.Struct("<I")
+
+def pack(kind, payload): return MSG.pack(kind, len(payload)) + payload
+
+def pack_samples(name, block):
+    n = name.encode()
+    return pack(b"S", bytes([len(n)]) + n + _ROWS.pack(block.shape[1]) + np.ascontiguousarray(block, dtype=np.float64).tobytes())
+
+def pack_json(obj): return pack(b"J", json.dumps(obj).encode())
+
+class ViewerServer(threading.Thread):
+    """Accepts viewers on a Unix socket; broadcast() queues bytes to all of them."""
+    def __init__(self, path=DEFAULT_SOCKET, hello=None, max_buffer=8 << 20):
+        super().__init__(daemon=True, name="viewer")
+        self.path = path; self.hello = pack(b"H", json.dumps(hello or {}).encode()); self.max_buffer = max_buffer
+        self.clients = {}; self._lock = threading.Lock(); self._stop_event = threading.Event()
+        self.dropped_clients = 0
+        d = os.path.dirname(path)
+        if d: os.makedirs(d, exist_ok=True)
+        try: os.unlink(path)  # stale socket from an unclean exit
+        except FileNotFoundError: pass
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM); self.sock.bind(path); self.sock.listen(4)
+        self.sock.setblocking(False)
+
+    def run(self):
+        sel = selectors.DefaultSelector(); sel.register(self.sock, selectors.EVENT_READ)
+        try:
+            while not self._stop_event.is_set():
+                for _ in sel.select(0.5):
+                    try: c, _ = self.sock.accept()
+                    except OSError: continue
+                    c.setblocking(False)
+                    with self._lock: self.clients[c] = bytearray(self.hello); self._flush(c)
+        finally: sel.close()
+
+    def _flush(self, c):
+        buf = self.clients[c]
+        try:
+            while buf:
+                k = c.send(buf)
+                if not k: break
+                del buf[:k]
+        except BlockingIOError: pass
+        except OSError: self._drop(c)
+
+    def _drop(self, c):
+        self.clients.pop(c, None)
+        try: c.close()
+        except OSError: pass
+
+    def broadcast(self, data):
+        with self._lock:
+            for c in list(self.clients):
+                buf = self.clients[c]
+                if len(buf) + len(data) > self.max_buffer: self._drop(c); self.dropped_clients += 1; continue
+                buf += data; self._flush(c)
+
+    def __len__(self): return len(self.clients)
+
+    def stop(self):
+        self._stop_event.set(); self.join(timeout=2.0)
+        with self._lock:
+            for c in list(self.clients): self._drop(c)
+        self.sock.close()
+        try: os.unlink(self.path)
+        except OSError: pass
+
+class RemoteManager:
+    """Viewer side: stands in for a MultiManager, filling local SampleRings and a side queue
+       from a daemon's socket, so the GUI's drain/plot path works unchanged."""
+    def __init__(self, path=DEFAULT_SOCKET, ring_capacity=1 << 16, timeout=2.0):
+        self.path = path; self.queue = queue.Queue(10000); self.spectra = {}; self.threads = []; self.ring_capacity = ring_capacity
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM); self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        kind, payload = self._read_msg()
+        if kind != b"H": raise ConnectionError(f"{path}: expected hello, got {kind!r}")
+        self.hello = json.loads(payload); self.columns = tuple(self.hello["columns"])
+        self.sensors_cfg = self.hello.get("sensors", []); self.config = self.hello.get("config", {})
+        self.rings = {s["name"]: SampleRing(ring_capacity, self.columns) for s in self.sensors_cfg}
+        self.received = 0; self.connected = True; self._stop_event = threading.Event(); self._thread = None
+
+    def _read_exact(self, n):
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk: raise ConnectionError("daemon closed the connection")
+            buf += chunk
+        return bytes(buf)
+
+    def _read_msg(self):
+        kind, n = MSG.unpack(self._read_exact(MSG.size))
+        return kind, self._read_exact(n)
+
+    def _messages(self):
+        # complete messages from a receive buffer; a timeout mid-message loses nothing
+        buf = bytearray()
+        while not self._stop_event.is_set():
+            try: chunk = self.sock.recv(1 << 18)
+            except socket.timeout: continue
+            if not chunk: raise ConnectionError("daemon closed the connection")
+            buf += chunk; i = 0
+            while len(buf) - i >= MSG.size:
+                kind, n = MSG.unpack_from(buf, i)
+                if len(buf) - i - MSG.size < n: break
+                yield kind, bytes(buf[i + MSG.size:i + MSG.size + n]); i += MSG.size + n
+            del buf[:i]
+
+    def _run(self):
+        self.sock.settimeout(0.5); ncols = len(self.columns)
+        try:
+            for kind, payload in self._messages():
+                if kind == b"S":
+                    k = payload[0]; name = payload[1:1+k].decode(); rows = _ROWS.unpack_from(payload, 1+k)[0]
+                    block = np.frombuffer(payload, dtype=np.float64, offset=5+k).reshape(ncols, rows)
+                    ring = self.rings.get(name)
+                    if ring is None:  # e.g. a node that joined an aggregating daemon after the hello
+                        ring = SampleRing(self.ring_capacity, self.columns); self.rings = {**self.rings, name: ring}
+                    ring.append(dict(zip(self.columns, block))); self.received += rows
+                elif kind == b"J":
+                    try: self.queue.put_nowait(json.loads(payload))
+                    except queue.Full: pass
+        except (ConnectionError, OSError) as e:
+            if not self._stop_event.is_set():
+                self.queue.put({"t": time.time(), "sensor": "daemon", "type": "error", "msg": f"viewer link lost: {e}"})
+        finally: self.connected = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="viewer-client"); self._thread.start()
+        return self.queue
+
+    def collect(self):
+        return {"sensors": {}, "gauges": {"viewer_rows": self.received, "viewer_connected": int(self.connected)}, "cpu": {}}
+
+    def stop(self):
+        self._stop_event.set()
+        try: self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError: pass
+        if self._thread: self._thread.join(timeout=2.0)
+        self.sock.close()